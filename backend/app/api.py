@@ -2,23 +2,48 @@
 API routes for PDF2AI backend.
 """
 
+import asyncio
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse, Response
 from datetime import datetime
 from app.config import settings
+from app.services.health import ReadinessProbe
+from app.utils.ollama_pool import AsyncPooledOllamaClient, EndpointPool
+from app.utils.metrics import CONTENT_TYPE, registry
 
 # Create API router
 api_router = APIRouter(prefix="/api")
 
+# Reachability of the configured Ollama models, checked at most every HEALTH_CHECK_TTL_SECONDS
+readiness = ReadinessProbe(
+    AsyncPooledOllamaClient(
+        EndpointPool(settings.OLLAMA_ENDPOINTS or [settings.OLLAMA_BASE_URL], model=settings.OLLAMA_MODEL,
+                     task_models=settings.OLLAMA_TASK_MODELS),
+        connect_timeout=settings.OLLAMA_CONNECT_TIMEOUT
+    ),
+    ttl_seconds=settings.HEALTH_CHECK_TTL_SECONDS
+)
+
 
 @api_router.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {
-        "status": "ok",
-        "message": "Backend is healthy and ready to serve requests",
+    """Readiness check: answers 503 unless the Ollama model is reachable."""
+    result = await readiness.check()
+    return JSONResponse(status_code=200 if result["ready"] else 503, content={
+        "status": "ok" if result["ready"] else "unavailable",
+        "message": ("Backend is healthy and ready to serve requests" if result["ready"]
+                    else "Backend is running but the model is not reachable"),
+        "ready": result["ready"],
+        "checks": result["checks"],
         "timestamp": datetime.utcnow().isoformat(),
         "version": settings.VERSION
-    }
+    })
+
+
+@api_router.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this process."""
+    return Response(await asyncio.to_thread(registry.render), media_type=CONTENT_TYPE)
 
 
 @api_router.get("/test")
@@ -32,6 +57,7 @@ async def test_connection():
         "available_endpoints": [
             "/api/health",
             "/api/test",
+            "/api/metrics",
             "/api/upload",  # Will be implemented later
             "/api/chat"     # Will be implemented later
         ],
@@ -3,7 +3,7 @@ Configuration settings for PDF2AI backend.
 """
 
 import os
-from typing import List
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -34,6 +34,62 @@ class Settings(BaseSettings):
     ALLOWED_FILE_TYPES: List[str] = [".pdf"]
     UPLOAD_DIR: str = "uploads"
     
+    # PDF Extraction Configuration
+    EXTRACTION_WORKERS: int = 0  # 0 = one worker per CPU
+    PDF_ENGINE: str = "auto"  # pypdf2, pypdf, pdfminer or pypdfium2; auto = calibrated engine, else pypdf2
+    PDF_FALLBACK_ENGINES: Optional[List[str]] = None  # Tried for pages with no text; None = every other installed engine
+    PDF_ENGINE_CALIBRATION_PATH: str = "cache/extraction_engine.json"
+    
+    # Extracted Text Cache Configuration
+    TEXT_CACHE_ENABLED: bool = True
+    TEXT_CACHE_PATH: str = "cache/text_cache.sqlite3"
+    TEXT_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # 512MB
+    
+    # LLM Response Cache Configuration
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "cache/llm_cache.sqlite3"
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60  # 7 days
+    LLM_CACHE_MAX_ENTRIES: int = 5000
+    
+    # Analysis History Configuration
+    HISTORY_ENABLED: bool = True
+    HISTORY_DB_PATH: str = "cache/history.sqlite3"
+    
+    # Start-up Warm-up Configuration (extraction workers and Ollama models, before readiness)
+    WARMUP_ENABLED: bool = True
+    WARMUP_TIMEOUT_SECONDS: float = 120.0  # Longest wait for the models to load
+    
+    # Map-Reduce Summarization Configuration
+    SUMMARY_CHUNK_TOKENS: int = 3000
+    SUMMARY_OVERLAP_TOKENS: int = 200
+    SUMMARY_PARALLELISM: int = 4
+    
+    # Background Job Queue Configuration
+    JOB_WORKERS: int = 4
+    JOB_MAX_BACKLOG: int = 100  # Submissions beyond this are rejected with 429
+    JOB_RESULT_TTL_SECONDS: int = 3600
+    MODEL_MAX_CONCURRENCY: Dict[str, int] = {}  # Per Ollama endpoint, e.g. {"gemma3": 2}; JSON in .env
+    DEFAULT_MODEL_CONCURRENCY: int = 2  # Per Ollama endpoint
+    
+    # Ollama Configuration
+    OLLAMA_BASE_URL: str = "http://localhost:11434"
+    OLLAMA_MODEL: str = "gemma3"
+    OLLAMA_TIMEOUT: float = 300.0
+    OLLAMA_CONNECT_TIMEOUT: float = 5.0
+    OLLAMA_RETRIES: int = 2
+    OLLAMA_KEEP_ALIVE: str = "30m"
+    OLLAMA_POOL_SIZE: int = 10  # Connections per endpoint
+    
+    # Ollama Endpoint Pool Configuration
+    OLLAMA_ENDPOINTS: List[str] = []  # e.g. ["http://gpu1:11434", "http://gpu2:11434"]; empty = OLLAMA_BASE_URL
+    OLLAMA_TASK_MODELS: Dict[str, str] = {}  # e.g. {"keywords": "gemma3:1b", "summary": "gemma3:12b"}
+    OLLAMA_CIRCUIT_FAILURES: int = 3  # Consecutive failures before an endpoint is taken out of rotation
+    OLLAMA_CIRCUIT_RESET_SECONDS: float = 30.0  # How long it stays out before a trial request
+    OLLAMA_HEALTH_CHECK_INTERVAL: float = 15.0  # Seconds between active endpoint checks; 0 = passive only
+    
+    # Health Check Configuration
+    HEALTH_CHECK_TTL_SECONDS: float = 5.0  # How long a model reachability check is reused
+    
     # AI Configuration (will be used later)
     OPENAI_API_KEY: str = ""
     ANTHROPIC_API_KEY: str = ""
@@ -0,0 +1,26 @@
+"""
+Pydantic models for structured model output.
+"""
+
+from typing import List
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class KeywordAnalysis(BaseModel):
+    """AI comparison of a CV's keywords against a job advert's."""
+    match_analysis: str = Field(description="Brief analysis of how well the CV matches the job requirements")
+    missing_critical: List[str] = Field(default_factory=list, description="Most important missing keywords")
+    recommendations: List[str] = Field(default_factory=list, description="Specific, actionable recommendations")
+    synonym_matches: List[str] = Field(default_factory=list,
+                                       description="Keywords that are similar but worded differently")
+    priority_additions: List[str] = Field(default_factory=list, description="Top 3 keywords to add immediately")
+
+    @field_validator("missing_critical", "recommendations", "synonym_matches", "priority_additions",
+                     mode="before")
+    @classmethod
+    def _split_string(cls, value):
+        # Models sometimes answer a list field with one comma-separated string
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(",") if item.strip()]
+        return value
@@ -0,0 +1,279 @@
+"""
+In-process background job queue for analysis requests.
+
+Jobs are submitted with a priority and run by a bounded pool of asyncio
+workers. A ``ModelLimiter`` caps the Ollama calls in flight per model,
+however they are made (queued jobs, direct and streamed requests, parallel
+map calls within one summary), so a burst of uploads cannot pile up on
+Ollama. Work is shed with ``QueueFull`` once the jobs queued plus the calls
+waiting for a model pass a threshold. Finished jobs are kept for a while so
+their status and results can be polled.
+"""
+
+import asyncio
+import itertools
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+# Job states
+QUEUED = "queued"
+PROCESSING = "processing"
+COMPLETED = "completed"
+ERROR = "error"
+FINISHED_STATES = (COMPLETED, ERROR)
+
+
+class QueueFull(Exception):
+    """Raised when the backlog is over its limit; maps to HTTP 429."""
+
+    def __init__(self, backlog: int, retry_after: int):
+        super().__init__(f"Analysis queue is full ({backlog} jobs and model calls waiting), retry in {retry_after}s")
+        self.backlog = backlog
+        self.retry_after = retry_after
+
+
+class ModelLimiter:
+    """Caps the Ollama calls in flight per model.
+
+    Wrap each call in ``async with limiter.slot(model)`` (or ``with
+    limiter.slot_sync(model)`` on a worker thread); callers wait for a free
+    slot, and ``waiting`` counts them for admission control. Thread callers
+    get their own slots with the same limits.
+    """
+
+    def __init__(self, model_concurrency: Optional[Dict[str, int]] = None, default_concurrency: int = 2):
+        self.model_concurrency = model_concurrency or {}
+        self.default_concurrency = default_concurrency
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._thread_semaphores: Dict[str, threading.Semaphore] = {}
+        self._active: Dict[str, int] = defaultdict(int)
+        self._waiting: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def limit(self, model: str) -> int:
+        return max(self.model_concurrency.get(model, self.default_concurrency), 1)
+
+    @property
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(self._waiting.values())
+
+    def _count(self, counter: Dict[str, int], model: str, change: int) -> None:
+        with self._lock:
+            counter[model] += change
+
+    @asynccontextmanager
+    async def slot(self, model: str) -> AsyncIterator[None]:
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.limit(model))
+        semaphore = self._semaphores[model]
+        self._count(self._waiting, model, 1)
+        try:
+            await semaphore.acquire()
+        finally:
+            self._count(self._waiting, model, -1)
+        self._count(self._active, model, 1)
+        try:
+            yield
+        finally:
+            self._count(self._active, model, -1)
+            semaphore.release()
+
+    @contextmanager
+    def slot_sync(self, model: str) -> Iterator[None]:
+        with self._lock:
+            if model not in self._thread_semaphores:
+                self._thread_semaphores[model] = threading.Semaphore(self.limit(model))
+            semaphore = self._thread_semaphores[model]
+        self._count(self._waiting, model, 1)
+        try:
+            semaphore.acquire()
+        finally:
+            self._count(self._waiting, model, -1)
+        self._count(self._active, model, 1)
+        try:
+            yield
+        finally:
+            self._count(self._active, model, -1)
+            semaphore.release()
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            models = sorted(set(self._active) | set(self._waiting))
+            return {model: {"limit": self.limit(model), "active": self._active[model], "waiting": self._waiting[model]}
+                    for model in models}
+
+
+@dataclass
+class AnalysisJob:
+    """A queued or running analysis and, once finished, its result."""
+    analysis_id: str
+    type: str
+    model: str
+    priority: int
+    run: Callable[["AnalysisJob"], Awaitable[dict]] = field(repr=False)
+    user_id: Optional[str] = None
+    status: str = QUEUED
+    progress: float = 0.0
+    stage: str = QUEUED
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    on_finish: Optional[Callable[[], None]] = field(default=None, repr=False)
+
+    def update(self, progress: Optional[float] = None, stage: Optional[str] = None) -> None:
+        """Record progress reported by the running job."""
+        if progress is not None:
+            self.progress = progress
+        if stage is not None:
+            self.stage = stage
+
+    def to_dict(self) -> dict:
+        return {
+            "analysis_id": self.analysis_id,
+            "type": self.type,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "priority": self.priority,
+            "model": self.model,
+            "results": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+class JobQueue:
+    """Priority queue of analysis jobs served by a bounded worker pool."""
+
+    def __init__(self, workers: int = 4, max_backlog: int = 100, limiter: Optional[ModelLimiter] = None,
+                 result_ttl_seconds: float = 3600, max_retained: int = 1000):
+        self.workers = workers
+        self.max_backlog = max_backlog
+        self.limiter = limiter
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_retained = max_retained
+        self.jobs: "OrderedDict[str, AnalysisJob]" = OrderedDict()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._running = 0
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def pending(self) -> int:
+        """Queued jobs plus Ollama calls waiting for their model, from any endpoint."""
+        return self.backlog + (self.limiter.waiting if self.limiter is not None else 0)
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued jobs are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def check_capacity(self) -> None:
+        """Raise QueueFull if new work would exceed the backlog limit."""
+        pending = self.pending
+        if pending >= self.max_backlog:
+            self.rejected += 1
+            # Rough guess: one backlog's worth of work spread over the workers, a few seconds each
+            raise QueueFull(pending, retry_after=max(1, 5 * pending // max(self.workers, 1)))
+
+    def submit(self, job_type: str, run: Callable[[AnalysisJob], Awaitable[dict]], model: str,
+               priority: int = 0, on_finish: Optional[Callable[[], None]] = None,
+               user_id: Optional[str] = None) -> AnalysisJob:
+        """Queue a job; lower ``priority`` values run first. Raises QueueFull when overloaded."""
+        if self._queue is None:
+            raise RuntimeError("JobQueue.start() has not been called")
+        self.check_capacity()
+        self._prune()
+        job = AnalysisJob(analysis_id=str(uuid.uuid4()), type=job_type, model=model,
+                          priority=priority, run=run, user_id=user_id, on_finish=on_finish)
+        self.jobs[job.analysis_id] = job
+        self._queue.put_nowait((priority, next(self._sequence), job))
+        self.submitted += 1
+        return job
+
+    def get(self, analysis_id: str, user_id: Optional[str] = None) -> Optional[AnalysisJob]:
+        """A retained job; with ``user_id``, only if that user submitted it."""
+        job = self.jobs.get(analysis_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            return None
+        return job
+
+    async def _worker(self) -> None:
+        # Jobs are not limited per model here: their Ollama calls each take a slot from the limiter
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: AnalysisJob) -> None:
+        job.status = PROCESSING
+        job.stage = PROCESSING
+        job.started_at = datetime.utcnow()
+        self._running += 1
+        try:
+            job.result = await job.run(job)
+            job.status = COMPLETED
+            job.progress = 100.0
+            self.completed += 1
+        except Exception as e:
+            job.status = ERROR
+            job.error = str(e)
+            self.failed += 1
+        finally:
+            self._running -= 1
+            job.stage = job.status
+            job.completed_at = datetime.utcnow()
+            if job.on_finish is not None:
+                job.on_finish()
+
+    def _prune(self) -> None:
+        """Forget finished jobs past their TTL, and the oldest ones past the retention cap."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.result_ttl_seconds)
+        for analysis_id, job in list(self.jobs.items()):
+            finished = job.status in FINISHED_STATES
+            if finished and (job.completed_at < cutoff or len(self.jobs) > self.max_retained):
+                del self.jobs[analysis_id]
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "backlog": self.backlog,
+            "waiting_calls": self.limiter.waiting if self.limiter is not None else 0,
+            "max_backlog": self.max_backlog,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "retained": len(self.jobs),
+            "models": self.limiter.stats() if self.limiter is not None else {}
+        }
@@ -0,0 +1,249 @@
+"""
+Batch ranking of CVs against job adverts.
+
+Each document is extracted and keyword-profiled once, however many pairs it
+takes part in; profiles are stored in the text cache under the document's
+content hash (and in the history store, which is never evicted) so a re-run
+skips straight to scoring. The cheap keyword-overlap
+score is computed for every CV/job pair, and only the best ``top_k`` pairs
+get the expensive AI analysis.
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import AbstractSet, Callable, Dict, List, Optional, Tuple
+
+from app.services.history_store import HistoryStore
+from app.services.keyword_extractor import KeywordIndex
+from app.services.semantic_index import VectorIndex
+from app.services.text_cache import TextCache, hash_file
+
+DOCUMENT_EXTENSIONS = (".pdf", ".txt", ".md")
+CSV_FIELDS = ["rank", "cv", "job", "semantic_score", "score", "matching", "job_keywords", "missing_keywords",
+              "match_analysis", "priority_additions"]
+
+
+@dataclass
+class DocumentProfile:
+    """Extracted text and keywords of one CV or job advert."""
+    path: str
+    kind: str
+    digest: str
+    text: str
+    keywords: List[str]
+    cached: bool = False
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+
+@dataclass
+class PairScore:
+    """Keyword-overlap score of one CV against one job advert.
+
+    ``score`` counts exact keyword matches only; ``semantic_score`` also
+    credits near matches (see semantic_index).
+    """
+    cv: DocumentProfile
+    job: DocumentProfile
+    score: float
+    matching: List[str]
+    missing: List[str]
+    semantic_score: float = 0.0
+    rank: int = 0
+    analysis: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "rank": self.rank,
+            "cv": self.cv.path,
+            "job": self.job.path,
+            "semantic_score": round(self.semantic_score, 1),
+            "score": round(self.score, 1),
+            "matching": self.matching,
+            "missing": self.missing,
+            "job_keywords": len(self.job.keywords),
+            "analysis": self.analysis
+        }
+
+
+@dataclass
+class BatchResult:
+    """Ranked pairs plus the profiles and stage timings behind them."""
+    pairs: List[PairScore]
+    cvs: List[DocumentProfile]
+    jobs: List[DocumentProfile]
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "cvs": [profile.path for profile in self.cvs],
+            "jobs": [profile.path for profile in self.jobs],
+            "timings": self.timings,
+            "ranking": [pair.to_dict() for pair in self.pairs]
+        }
+
+
+def list_documents(path: str) -> List[str]:
+    """Return ``path`` itself, or the PDF/text documents directly inside it when it is a directory."""
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(os.path.join(path, name) for name in os.listdir(path)
+                  if name.lower().endswith(DOCUMENT_EXTENSIONS) and os.path.isfile(os.path.join(path, name)))
+
+
+def match_score(cv_keywords: AbstractSet[str], job_keywords: AbstractSet[str]) -> Tuple[float, List[str], List[str]]:
+    """Percentage of job keywords found in the CV, with the matching and missing keywords."""
+    matching = cv_keywords & job_keywords
+    score = len(matching) / len(job_keywords) * 100 if job_keywords else 0.0
+    return score, sorted(matching), sorted(job_keywords - cv_keywords)
+
+
+class ProfileBuilder:
+    """Builds document profiles once per distinct document content.
+
+    ``load_text(path)`` returns a document's text and ``extract_keywords(text,
+    kind)`` its keywords; ``version`` identifies the keyword extractor so a
+    change of model or prompt budget does not reuse stale profiles. Keywords
+    are looked up in ``store`` (as ``keywords-{kind}`` artifacts), then in
+    ``cache``. Built profiles are added to ``index``, keyed by path, when one
+    is given.
+    """
+
+    def __init__(self, load_text: Callable[[str], str], extract_keywords: Callable[[str, str], List[str]],
+                 version: str, cache: Optional[TextCache] = None, index: Optional[KeywordIndex] = None,
+                 store: Optional[HistoryStore] = None):
+        self.load_text = load_text
+        self.extract_keywords = extract_keywords
+        self.version = version
+        self.cache = cache
+        self.index = index
+        self.store = store
+
+    def build(self, path: str, kind: str, digest: Optional[str] = None) -> DocumentProfile:
+        digest = digest or hash_file(path)
+        text = self.load_text(path)
+        stored = self.store.get_artifact(digest, f"keywords-{kind}", self.version) if self.store is not None else None
+        if stored:
+            return DocumentProfile(path, kind, digest, text, stored, cached=True)
+        key = TextCache.make_key(digest, f"profile-{kind}/{self.version}")
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached:
+            keywords = json.loads(cached[0])
+            if self.store is not None:
+                self.store.put_artifact(digest, f"keywords-{kind}", self.version, keywords)
+            return DocumentProfile(path, kind, digest, text, keywords, cached=True)
+        keywords = self.extract_keywords(text, kind) if text else []
+        if keywords:
+            if self.cache is not None:
+                self.cache.put(key, [json.dumps(keywords)])
+            if self.store is not None:
+                self.store.put_artifact(digest, f"keywords-{kind}", self.version, keywords)
+        return DocumentProfile(path, kind, digest, text, keywords)
+
+    def build_all(self, paths: List[Tuple[str, str]], workers: int = 4) -> List[DocumentProfile]:
+        """Profile ``(path, kind)`` pairs in parallel; identical documents are profiled once."""
+        digests = [hash_file(path) for path, _ in paths]
+        first: Dict[Tuple[str, str], int] = {}
+        for index, ((_, kind), digest) in enumerate(zip(paths, digests)):
+            first.setdefault((digest, kind), index)
+        unique = sorted(first.values())
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            built = dict(zip(unique, executor.map(lambda index: self.build(*paths[index], digests[index]), unique)))
+        profiles = []
+        for index, ((path, kind), digest) in enumerate(zip(paths, digests)):
+            profile = built[first[(digest, kind)]]
+            profiles.append(profile if profile.path == path else replace(profile, path=path, cached=True))
+        if self.index is not None:
+            for profile in profiles:
+                self.index.add(profile.path, profile.keywords)
+        return profiles
+
+
+def rank_pairs(cvs: List[DocumentProfile], jobs: List[DocumentProfile]) -> List[PairScore]:
+    """Score every CV/job pair and rank them, best semantic match first."""
+    # Keyword sets and vectors are built once per profile rather than once per pair
+    cv_sets = [(cv, frozenset(cv.keywords)) for cv in cvs if cv.text]
+    job_sets = [(job, frozenset(job.keywords)) for job in jobs if job.text]
+    job_vectors = VectorIndex()
+    for position, (job, _) in enumerate(job_sets):
+        job_vectors.add(str(position), job.keywords)
+    pairs = []
+    for cv, cv_set in cv_sets:
+        semantic_scores = job_vectors.match_scores(cv.keywords)
+        for position, (job, job_set) in enumerate(job_sets):
+            score, matching, missing = match_score(cv_set, job_set)
+            pairs.append(PairScore(cv, job, score, matching, missing,
+                                   semantic_score=semantic_scores.get(str(position), 0.0)))
+    pairs.sort(key=lambda pair: (-pair.semantic_score, -pair.score, pair.cv.path, pair.job.path))
+    for rank, pair in enumerate(pairs, 1):
+        pair.rank = rank
+    return pairs
+
+
+def rank_documents(cv_paths: List[str], job_paths: List[str], builder: ProfileBuilder,
+                   analyze: Optional[Callable[[PairScore], dict]] = None, top_k: int = 5,
+                   workers: int = 4) -> BatchResult:
+    """Profile, score and rank every CV against every job advert.
+
+    ``analyze(pair)`` is called, ``workers`` at a time, for the ``top_k``
+    best pairs only.
+    """
+    timings = {}
+    started = time.perf_counter()
+    profiles = builder.build_all([(path, "cv") for path in cv_paths] + [(path, "job") for path in job_paths],
+                                 workers=workers)
+    cvs, jobs = profiles[:len(cv_paths)], profiles[len(cv_paths):]
+    timings["profiling"] = time.perf_counter() - started
+
+    scoring_started = time.perf_counter()
+    pairs = rank_pairs(cvs, jobs)
+    timings["scoring"] = time.perf_counter() - scoring_started
+
+    if analyze is not None and top_k > 0:
+        analysis_started = time.perf_counter()
+        top = pairs[:top_k]
+        with ThreadPoolExecutor(max_workers=max(min(workers, len(top)), 1)) as executor:
+            for pair, analysis in zip(top, executor.map(analyze, top)):
+                pair.analysis = analysis
+        timings["analysis"] = time.perf_counter() - analysis_started
+    timings["total"] = time.perf_counter() - started
+    return BatchResult(pairs, cvs, jobs, timings)
+
+
+def write_json(result: BatchResult, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(result.to_dict(), file, indent=2)
+
+
+def write_csv(result: BatchResult, path: str) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for pair in result.pairs:
+            analysis = pair.analysis or {}
+            writer.writerow({
+                "rank": pair.rank,
+                "cv": pair.cv.path,
+                "job": pair.job.path,
+                "semantic_score": f"{pair.semantic_score:.1f}",
+                "score": f"{pair.score:.1f}",
+                "matching": len(pair.matching),
+                "job_keywords": len(pair.job.keywords),
+                "missing_keywords": "; ".join(pair.missing),
+                "match_analysis": analysis.get("match_analysis", ""),
+                "priority_additions": "; ".join(analysis.get("priority_additions", []))
+            })
+
+
+def write_result(result: BatchResult, path: str) -> None:
+    """Write the ranking as CSV or JSON, chosen by the file extension."""
+    if path.lower().endswith(".json"):
+        write_json(result, path)
+    else:
+        write_csv(result, path)
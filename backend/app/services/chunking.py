@@ -0,0 +1,115 @@
+"""
+Token-budgeted chunking of extracted PDF text.
+
+Text is split on page and paragraph boundaries and packed into chunks that
+fit a token budget, with an optional overlap carried between chunks. Token
+counts are approximated from character and word counts, which tracks
+Gemma-style subword tokenizers closely enough for budgeting.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Tuple, Union
+
+CHARS_PER_TOKEN = 4.0
+TOKENS_PER_WORD = 1.3
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class Chunk:
+    """A run of consecutive paragraphs that fits the token budget."""
+    index: int
+    text: str
+    first_page: int
+    last_page: int
+    tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of ``text``."""
+    if not text:
+        return 0
+    by_chars = len(text) / CHARS_PER_TOKEN
+    by_words = len(text.split()) * TOKENS_PER_WORD
+    return max(1, math.ceil(max(by_chars, by_words)))
+
+
+def _split_oversized(paragraph: str, max_tokens: int) -> List[str]:
+    """Split a paragraph that exceeds the budget on sentence, then word, boundaries."""
+    pieces, current = [], ""
+    for sentence in _SENTENCE_END.split(paragraph):
+        if estimate_tokens(sentence) > max_tokens:
+            words = sentence.split()
+            step = max(1, int(max_tokens / TOKENS_PER_WORD))
+            units = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        else:
+            units = [sentence]
+        for unit in units:
+            candidate = f"{current} {unit}".strip()
+            if current and estimate_tokens(candidate) > max_tokens:
+                pieces.append(current)
+                current = unit
+            else:
+                current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def iter_paragraphs(pages: Union[str, Iterable], max_tokens: int) -> Iterator[Tuple[int, str]]:
+    """Yield ``(page_no, paragraph)`` pairs, none larger than ``max_tokens``."""
+    if isinstance(pages, str):
+        pages = [(1, pages)]
+    for item in pages:
+        page_no, text = item if isinstance(item, tuple) else (item.page_no, item.text)
+        for paragraph in _PARAGRAPH_BREAK.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if estimate_tokens(paragraph) <= max_tokens:
+                yield page_no, paragraph
+            else:
+                for piece in _split_oversized(paragraph, max_tokens):
+                    yield page_no, piece
+
+
+def chunk_pages(pages: Union[str, Iterable], max_tokens: int = 3000,
+                overlap_tokens: int = 200) -> Iterator[Chunk]:
+    """Pack paragraphs from a page stream into chunks of at most ``max_tokens``.
+
+    Up to ``overlap_tokens`` worth of trailing paragraphs from each chunk are
+    repeated at the start of the next one to preserve context across cuts.
+    """
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    current: List[Tuple[int, str, int]] = []
+    size = 0
+    index = 0
+
+    def emit() -> Chunk:
+        return Chunk(index=index,
+                     text="\n\n".join(paragraph for _, paragraph, _ in current),
+                     first_page=current[0][0],
+                     last_page=current[-1][0],
+                     tokens=size)
+
+    for page_no, paragraph in iter_paragraphs(pages, max_tokens):
+        tokens = estimate_tokens(paragraph)
+        if current and size + tokens > max_tokens:
+            yield emit()
+            index += 1
+            carried, carried_size = [], 0
+            for entry in reversed(current):
+                if carried_size + entry[2] > overlap_tokens or carried_size + entry[2] + tokens > max_tokens:
+                    break
+                carried.insert(0, entry)
+                carried_size += entry[2]
+            current, size = carried, carried_size
+        current.append((page_no, paragraph, tokens))
+        size += tokens
+
+    if current:
+        yield emit()
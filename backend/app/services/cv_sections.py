@@ -0,0 +1,197 @@
+"""
+Section-level keyword profiles for incremental CV re-analysis.
+
+A CV is split into sections at the headings ``token_budget`` recognises and
+each section is fingerprinted by its whitespace-normalised text. Keywords
+are extracted per section and looked up by fingerprint, so after an edit
+only the sections that changed go back to the extractor; the rest come
+from the store. ``match_delta`` compares the merged profile with the one
+from the previous run against the same job advert.
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from app.services.token_budget import estimate_tokens, split_sections
+
+SECTIONS_VERSION = "sections-1"  # bump when splitting or fingerprinting changes
+# Sections worth less than this for matching (contact details, references, hobbies) are not profiled
+MIN_SECTION_WEIGHT = 0.5
+
+
+@dataclass
+class CVSection:
+    """A fingerprinted section; ``key`` tells apart repeated headings ("experience#2")."""
+    key: str
+    heading: str
+    digest: str
+    text: str
+    weight: float
+
+
+@dataclass
+class SectionChanges:
+    """How a CV's sections differ from a previous version's, by section key."""
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def any(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+@dataclass
+class SectionProfile:
+    """Per-section keywords of a CV, with which sections were extracted on this run (and whether in one call)."""
+    sections: List[CVSection]
+    keywords: Dict[str, List[str]]
+    extracted: List[str] = field(default_factory=list)
+    reused: List[str] = field(default_factory=list)
+    whole: bool = False
+
+    @property
+    def merged_keywords(self) -> List[str]:
+        """Every section's keywords once, the most valuable sections first."""
+        ordered = sorted(self.sections, key=lambda section: -section.weight)
+        return list(dict.fromkeys(keyword for section in ordered for keyword in self.keywords.get(section.key, [])))
+
+    def fingerprints(self) -> List[dict]:
+        """The section keys and digests, to diff the next version against."""
+        return [{"key": section.key, "digest": section.digest} for section in self.sections]
+
+
+@dataclass
+class MatchDelta:
+    """Keyword match score before and after a CV edit."""
+    previous_score: Optional[float]
+    score: Optional[float]
+    added_keywords: List[str]
+    removed_keywords: List[str]
+    newly_matched: List[str]
+    no_longer_matched: List[str]
+
+    @property
+    def change(self) -> Optional[float]:
+        if self.previous_score is None or self.score is None:
+            return None
+        return self.score - self.previous_score
+
+
+def section_digest(text: str) -> str:
+    """Fingerprint of a section's text; reflowed lines and spacing don't count as changes."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def fingerprint_sections(text: str) -> List[CVSection]:
+    """Split a CV into fingerprinted sections, in document order."""
+    sections, seen = [], {}
+    for section in split_sections(text):
+        seen[section.heading] = seen.get(section.heading, 0) + 1
+        key = section.heading or "(top)"
+        if seen[section.heading] > 1:
+            key = f"{key}#{seen[section.heading]}"
+        sections.append(CVSection(key, section.heading, section_digest(section.text), section.text, section.weight))
+    return sections
+
+
+def diff_sections(previous: Iterable[dict], current: Sequence[CVSection]) -> SectionChanges:
+    """Compare sections with the ``fingerprints()`` of a previous version."""
+    before = {item["key"]: item["digest"] for item in previous}
+    changes = SectionChanges()
+    for section in current:
+        if section.key not in before:
+            changes.added.append(section.key)
+        elif before[section.key] != section.digest:
+            changes.changed.append(section.key)
+        else:
+            changes.unchanged.append(section.key)
+    keys = {section.key for section in current}
+    changes.removed = [key for key in before if key not in keys]
+    return changes
+
+
+def _attribute(keywords: List[str], sections: Sequence[CVSection]) -> Dict[str, List[str]]:
+    """Split keywords of the whole CV between ``sections``: each goes to the first section that
+    mentions it, or to the most valuable section when none does."""
+    texts = [(section.key, " ".join(section.text.lower().split())) for section in sections]
+    fallback = max(sections, key=lambda section: section.weight).key
+    attributed: Dict[str, List[str]] = {section.key: [] for section in sections}
+    for keyword in keywords:
+        key = next((key for key, text in texts if keyword.lower() in text), fallback)
+        attributed[key].append(keyword)
+    return attributed
+
+
+def build_section_profile(text: str, extract: Callable[[CVSection], Optional[List[str]]],
+                          lookup: Optional[Callable[[str], Optional[List[str]]]] = None,
+                          store: Optional[Callable[[str, List[str]], None]] = None,
+                          workers: int = 4,
+                          extract_all: Optional[Callable[[str], Optional[List[str]]]] = None,
+                          max_tokens: Optional[int] = None) -> SectionProfile:
+    """Keywords for each profiled section of ``text``.
+
+    ``lookup(digest)`` returns keywords found for a section's fingerprint by
+    an earlier run; the other sections go to ``extract`` (concurrently, at
+    most ``workers`` at a time) and their keywords, even an empty list, are
+    handed to ``store(digest, keywords)``. An extractor returns None when it
+    got no answer, which is not stored. Low-value sections are skipped unless
+    the CV has nothing else.
+
+    When no section is known yet (a CV seen for the first time) and
+    ``extract_all`` is given, the whole text is extracted in one call instead
+    and its keywords are split between the sections that mention them. That
+    is only done when the text fits ``max_tokens``, the extractor's prompt
+    budget: sections cut from a longer text would be stored as having no
+    keywords.
+    """
+    sections = fingerprint_sections(text)
+    profiled = [section for section in sections if section.weight >= MIN_SECTION_WEIGHT] or sections
+    profile = SectionProfile(sections, {})
+    pending = []
+    for section in profiled:
+        keywords = lookup(section.digest) if lookup is not None else None
+        if keywords is not None:
+            profile.keywords[section.key] = keywords
+            profile.reused.append(section.key)
+        else:
+            pending.append(section)
+    whole = extract_all is not None and (max_tokens is None or estimate_tokens(text) <= max_tokens)
+    if whole and not profile.reused and len(pending) > 1:
+        keywords = extract_all(text)
+        profile.whole = True
+        attributed = _attribute(keywords or [], pending)
+        results = [attributed[section.key] if keywords is not None else None for section in pending]
+    elif pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+            results = list(executor.map(extract, pending))
+    else:
+        results = []
+    for section, keywords in zip(pending, results):
+        profile.keywords[section.key] = keywords or []
+        profile.extracted.append(section.key)
+        if store is not None and keywords is not None:
+            store(section.digest, keywords)
+    return profile
+
+
+def _match_score(cv_keywords: Iterable[str], job_keywords: Iterable[str]) -> Optional[float]:
+    job = set(job_keywords)
+    return len(set(cv_keywords) & job) / len(job) * 100 if job else None
+
+
+def match_delta(previous_keywords: Optional[Sequence[str]], keywords: Sequence[str],
+                job_keywords: Sequence[str]) -> MatchDelta:
+    """The match score change from ``previous_keywords`` to ``keywords`` against the same job keywords."""
+    previous, current, job = set(previous_keywords or ()), set(keywords), set(job_keywords)
+    return MatchDelta(
+        previous_score=_match_score(previous, job) if previous_keywords is not None else None,
+        score=_match_score(current, job),
+        added_keywords=sorted(current - previous),
+        removed_keywords=sorted(previous - current),
+        newly_matched=sorted((current - previous) & job),
+        no_longer_matched=sorted((previous - current) & job)
+    )
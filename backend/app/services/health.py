@@ -0,0 +1,79 @@
+"""
+Readiness checks for ``/api/health``.
+
+The backend is ready when at least one Ollama endpoint answers, every model
+the pool routes to is available on some endpoint, the analysis backlog
+has room for more work, and the start-up warm-up has finished. Endpoints are checked at most once per
+``ttl_seconds`` (concurrent probes share one check), so a tight
+health-check interval never turns into load on Ollama.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from app.services.analysis_service import JobQueue
+from app.services.warmup import WarmUp
+from app.utils.metrics import MetricsRegistry, registry as default_registry
+from app.utils.ollama_pool import AsyncPooledOllamaClient, has_model
+
+DEFAULT_TTL_SECONDS = 5.0
+
+
+class ReadinessProbe:
+    """Model reachability (cached briefly) plus job backlog."""
+
+    def __init__(self, client: AsyncPooledOllamaClient, queue: Optional[JobQueue] = None,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS, registry: MetricsRegistry = default_registry,
+                 warmup: Optional[WarmUp] = None):
+        self.client = client
+        self.queue = queue
+        self.warmup = warmup
+        self.ttl_seconds = ttl_seconds
+        self._lock = asyncio.Lock()
+        self._model_check: Optional[dict] = None
+        self._checked_at = 0.0
+        self._ready = registry.gauge("deepdfscan_ready", "1 when the model is reachable and the backlog has room")
+        self._model_ready = registry.gauge("deepdfscan_model_ready",
+                                           "1 when Ollama answers with every routed model available")
+
+    async def _check_model(self) -> dict:
+        async with self._lock:
+            if self._model_check is None or time.monotonic() - self._checked_at >= self.ttl_seconds:
+                started = time.perf_counter()
+                available = await self.client.list_models()
+                missing = [model for model in self.client.pool.models()
+                           if available is not None and not has_model(available, model)]
+                self._model_check = {
+                    "ok": available is not None and not missing,
+                    "reachable": available is not None,
+                    "url": self.client.base_url,
+                    "model": self.client.model,
+                    "task_models": self.client.pool.task_models,
+                    "endpoints": self.client.pool.stats(),
+                    "latency_seconds": round(time.perf_counter() - started, 4)
+                }
+                if missing:
+                    self._model_check["detail"] = f"Not pulled on any endpoint: {', '.join(missing)}"
+                self._checked_at = time.monotonic()
+            return dict(self._model_check, checked_seconds_ago=round(time.monotonic() - self._checked_at, 1))
+
+    async def check(self) -> dict:
+        """``{"ready": bool, "checks": {...}}`` with one entry per check."""
+        checks = {"model": await self._check_model()}
+        if self.queue is not None:
+            stats = self.queue.stats()
+            checks["backlog"] = {
+                "ok": stats["backlog"] + stats["waiting_calls"] < stats["max_backlog"],
+                "backlog": stats["backlog"],
+                "waiting_calls": stats["waiting_calls"],
+                "running": stats["running"],
+                "max_backlog": stats["max_backlog"],
+                "workers": stats["workers"]
+            }
+        if self.warmup is not None:
+            checks["warmup"] = self.warmup.status()
+        ready = all(check["ok"] for check in checks.values())
+        self._model_ready.set(checks["model"]["ok"])
+        self._ready.set(ready)
+        return {"ready": ready, "checks": checks}
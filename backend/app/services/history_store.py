@@ -0,0 +1,338 @@
+"""
+Persistent history of documents and analyses.
+
+A local SQLite database keeps what the caches may evict: uploaded
+documents (indexed by content hash, user and time), their extracted page
+text (searchable through an FTS5 index), reusable artifacts such as
+keyword profiles and summaries, and the results of every analysis. Page
+text and artifacts belong to the content hash, so the same file uploaded
+twice, or by two users, is extracted and analysed once.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pdf2ai", "history.sqlite3")
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+BRIEF_SUMMARY_CHARS = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    file_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    user_id TEXT NOT NULL DEFAULT '',
+    filename TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'pdf',
+    size INTEGER NOT NULL,
+    page_count INTEGER,
+    created_at REAL NOT NULL,
+    uploaded_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS documents_user_sha256 ON documents (user_id, sha256);
+CREATE INDEX IF NOT EXISTS documents_sha256 ON documents (sha256);
+CREATE INDEX IF NOT EXISTS documents_user_uploaded ON documents (user_id, uploaded_at);
+CREATE INDEX IF NOT EXISTS documents_uploaded ON documents (uploaded_at);
+
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    page_no INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    extracted_at REAL NOT NULL,
+    UNIQUE (sha256, page_no)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    text, content='pages', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS pages_fts_insert AFTER INSERT ON pages BEGIN
+    INSERT INTO pages_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_fts_delete AFTER DELETE ON pages BEGIN
+    INSERT INTO pages_fts (pages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    sha256 TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    version TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (sha256, kind, version)
+);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    analysis_id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    user_id TEXT NOT NULL DEFAULT '',
+    file_id TEXT,
+    sha256 TEXT,
+    filename TEXT,
+    summary TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    completed_at REAL
+);
+CREATE INDEX IF NOT EXISTS analyses_user_created ON analyses (user_id, created_at);
+CREATE INDEX IF NOT EXISTS analyses_created ON analyses (created_at);
+CREATE INDEX IF NOT EXISTS analyses_sha256 ON analyses (sha256);
+"""
+
+
+# Documents with the time their text was stored (NULL until it has been extracted)
+_DOCUMENT_SELECT = ("SELECT documents.*, (SELECT MAX(extracted_at) FROM pages WHERE pages.sha256 = documents.sha256) "
+                    "AS extracted_at FROM documents")
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.utcfromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+def _page_window(limit: int, offset: int) -> Tuple[int, int]:
+    return min(max(limit, 1), MAX_PAGE_SIZE), max(offset, 0)
+
+
+def fts_query(query: str) -> str:
+    """Quote every term of a free-text query so FTS5 syntax characters are matched literally.
+
+    Terms are ANDed; a trailing ``*`` on a term is kept as a prefix search.
+    """
+    terms = []
+    for term in query.split():
+        prefix = term.endswith("*") and len(term) > 1
+        term = term.rstrip("*") if prefix else term
+        terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class HistoryStore:
+    """SQLite store of documents, page text, artifacts and analysis results."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # -- Documents ---------------------------------------------------------
+
+    @staticmethod
+    def _document(row: sqlite3.Row) -> dict:
+        return {
+            "file_id": row["file_id"],
+            "sha256": row["sha256"],
+            "user_id": row["user_id"],
+            "filename": row["filename"],
+            "kind": row["kind"],
+            "size": row["size"],
+            "pages": row["page_count"],
+            "status": "completed" if row["extracted_at"] is not None else "uploaded",
+            "created_at": _iso(row["created_at"]),
+            "upload_timestamp": _iso(row["uploaded_at"]),
+            "extracted_at": _iso(row["extracted_at"])
+        }
+
+    def add_document(self, sha256: str, filename: str, size: int, page_count: Optional[int] = None,
+                     user_id: str = "", kind: str = "pdf") -> dict:
+        """Record a document, or refresh it if this user already has the same content."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT * FROM documents WHERE user_id = ? AND sha256 = ?",
+                               (user_id, sha256)).fetchone()
+            if row is None:
+                conn.execute("INSERT INTO documents (file_id, sha256, user_id, filename, kind, size, page_count, "
+                             "created_at, uploaded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (str(uuid.uuid4()), sha256, user_id, filename, kind, size, page_count, now, now))
+            else:
+                conn.execute("UPDATE documents SET filename = ?, uploaded_at = ?, "
+                             "page_count = COALESCE(?, page_count) WHERE file_id = ?",
+                             (filename, now, page_count, row["file_id"]))
+            row = conn.execute(f"{_DOCUMENT_SELECT} WHERE user_id = ? AND sha256 = ?", (user_id, sha256)).fetchone()
+        return self._document(row)
+
+    def get_document(self, file_id: str, user_id: Optional[str] = None) -> Optional[dict]:
+        """A document by id; with ``user_id``, only if it belongs to that user."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(f"{_DOCUMENT_SELECT} WHERE file_id = ?", (file_id,)).fetchone()
+        if row is None or (user_id is not None and row["user_id"] != user_id):
+            return None
+        return self._document(row)
+
+    def list_documents(self, user_id: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                       offset: int = 0) -> Tuple[List[dict], int]:
+        """Documents, most recently uploaded first, and the total count."""
+        limit, offset = _page_window(limit, offset)
+        where, params = ("WHERE user_id = ?", [user_id]) if user_id is not None else ("", [])
+        with self._lock, self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM documents {where}", params).fetchone()[0]
+            rows = conn.execute(f"{_DOCUMENT_SELECT} {where} ORDER BY uploaded_at DESC LIMIT ? OFFSET ?",
+                                params + [limit, offset]).fetchall()
+        return [self._document(row) for row in rows], total
+
+    def delete_document(self, file_id: str, user_id: Optional[str] = None) -> bool:
+        """Delete a document; its text and artifacts go too once no other document has the same content."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT sha256, user_id FROM documents WHERE file_id = ?", (file_id,)).fetchone()
+            if row is None or (user_id is not None and row["user_id"] != user_id):
+                return False
+            conn.execute("DELETE FROM documents WHERE file_id = ?", (file_id,))
+            if conn.execute("SELECT 1 FROM documents WHERE sha256 = ? LIMIT 1", (row["sha256"],)).fetchone() is None:
+                conn.execute("DELETE FROM pages WHERE sha256 = ?", (row["sha256"],))
+                conn.execute("DELETE FROM artifacts WHERE sha256 = ?", (row["sha256"],))
+            return True
+
+    # -- Page text ---------------------------------------------------------
+
+    def has_pages(self, sha256: str) -> bool:
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT 1 FROM pages WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone() is not None
+
+    def put_pages(self, sha256: str, pages: Iterable[Tuple[int, str]]) -> None:
+        """Store (or replace) extracted ``(page_no, text)`` pages of a document."""
+        rows = [(sha256, page_no, text, time.time()) for page_no, text in pages]
+        with self._lock, self._connect() as conn:
+            # Deleted explicitly rather than with INSERT OR REPLACE so the FTS delete trigger fires
+            conn.executemany("DELETE FROM pages WHERE sha256 = ? AND page_no = ?", [row[:2] for row in rows])
+            conn.executemany("INSERT INTO pages (sha256, page_no, text, extracted_at) VALUES (?, ?, ?, ?)", rows)
+
+    def get_pages(self, sha256: str) -> List[Tuple[int, str]]:
+        """Stored ``(page_no, text)`` pages of a document, in page order."""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("SELECT page_no, text FROM pages WHERE sha256 = ? ORDER BY page_no",
+                                (sha256,)).fetchall()
+        return [(row["page_no"], row["text"]) for row in rows]
+
+    def search(self, query: str, user_id: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+               offset: int = 0) -> List[dict]:
+        """Full-text search over extracted pages, best match first, with a highlighted snippet."""
+        match = fts_query(query)
+        if not match:
+            return []
+        limit, offset = _page_window(limit, offset)
+        where, params = ("AND documents.user_id = ?", [user_id]) if user_id is not None else ("", [])
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT documents.file_id, documents.filename, documents.user_id, pages.page_no, "
+                "snippet(pages_fts, 0, '[', ']', ' … ', 12) AS snippet, bm25(pages_fts) AS rank "
+                "FROM pages_fts JOIN pages ON pages.id = pages_fts.rowid "
+                "JOIN documents ON documents.sha256 = pages.sha256 "
+                f"WHERE pages_fts MATCH ? {where} ORDER BY rank LIMIT ? OFFSET ?",
+                [match] + params + [limit, offset]).fetchall()
+        return [{"file_id": row["file_id"], "filename": row["filename"], "user_id": row["user_id"],
+                 "page": row["page_no"], "snippet": row["snippet"], "score": round(-row["rank"], 4)}
+                for row in rows]
+
+    # -- Artifacts ---------------------------------------------------------
+
+    def put_artifact(self, sha256: str, kind: str, version: str, data: Any) -> None:
+        """Store a reusable result (keyword profile, summary, ...) for a document's content."""
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO artifacts (sha256, kind, version, data, created_at) "
+                         "VALUES (?, ?, ?, ?, ?)", (sha256, kind, version, json.dumps(data), time.time()))
+
+    def get_artifact(self, sha256: str, kind: str, version: str) -> Optional[Any]:
+        """A stored artifact; ``version`` must match exactly (model, prompt budget, ...)."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT data FROM artifacts WHERE sha256 = ? AND kind = ? AND version = ?",
+                               (sha256, kind, version)).fetchone()
+        return json.loads(row["data"]) if row is not None else None
+
+    # -- Analyses ----------------------------------------------------------
+
+    @staticmethod
+    def _analysis(row: sqlite3.Row, with_result: bool) -> dict:
+        analysis = {
+            "analysis_id": row["analysis_id"],
+            "type": row["type"],
+            "status": row["status"],
+            "user_id": row["user_id"],
+            "file_id": row["file_id"],
+            "filename": row["filename"],
+            "summary": row["summary"],
+            "error": row["error"],
+            "created_at": _iso(row["created_at"]),
+            "completed_at": _iso(row["completed_at"])
+        }
+        if with_result:
+            analysis["results"] = json.loads(row["result"]) if row["result"] else None
+        return analysis
+
+    def record_analysis(self, type: str, status: str, result: Optional[dict] = None,
+                        analysis_id: Optional[str] = None, user_id: str = "", file_id: Optional[str] = None,
+                        sha256: Optional[str] = None, filename: Optional[str] = None,
+                        summary: Optional[str] = None, error: Optional[str] = None,
+                        created_at: Optional[float] = None, completed_at: Optional[float] = None) -> str:
+        """Insert or update an analysis; returns its id. ``summary`` is kept brief for listings."""
+        analysis_id = analysis_id or str(uuid.uuid4())
+        now = time.time()
+        if summary and len(summary) > BRIEF_SUMMARY_CHARS:
+            summary = summary[:BRIEF_SUMMARY_CHARS - 1].rstrip() + "…"
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (analysis_id, type, status, user_id, file_id, sha256, filename, "
+                "summary, result, error, created_at, completed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (analysis_id, type, status, user_id, file_id, sha256, filename, summary,
+                 json.dumps(result) if result is not None else None, error, created_at or now,
+                 completed_at if completed_at is not None else now))
+        return analysis_id
+
+    def get_analysis(self, analysis_id: str, user_id: Optional[str] = None) -> Optional[dict]:
+        """An analysis with its result; with ``user_id``, only if it belongs to that user."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT * FROM analyses WHERE analysis_id = ?", (analysis_id,)).fetchone()
+        if row is None or (user_id is not None and row["user_id"] != user_id):
+            return None
+        return self._analysis(row, with_result=True)
+
+    def list_analyses(self, user_id: Optional[str] = None, type: Optional[str] = None,
+                      file_id: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                      offset: int = 0, filename: Optional[str] = None) -> Tuple[List[dict], int]:
+        """Analyses, newest first, without their full results, and the total count."""
+        limit, offset = _page_window(limit, offset)
+        conditions, params = [], []
+        for column, value in (("user_id", user_id), ("type", type), ("file_id", file_id), ("filename", filename)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock, self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM analyses {where}", params).fetchone()[0]
+            rows = conn.execute(f"SELECT * FROM analyses {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                                params + [limit, offset]).fetchall()
+        return [self._analysis(row, with_result=False) for row in rows], total
+
+    def stats(self) -> dict:
+        with self._lock, self._connect() as conn:
+            counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ("documents", "pages", "artifacts", "analyses")}
+        return dict(counts, path=self.path)
+
+
+def default_history_store() -> Optional[HistoryStore]:
+    """Build a store from HISTORY_* environment variables; None when disabled."""
+    if os.environ.get("HISTORY_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    return HistoryStore(os.environ.get("HISTORY_DB_PATH", DEFAULT_DB_PATH))
@@ -0,0 +1,424 @@
+"""
+Headless ingestion pipeline for folders and manifests of documents.
+
+Work items (a PDF to summarize, or a CV PDF to compare with a job advert)
+flow through a chain of stages (hash, extract, analyse, write). Each stage
+runs on its own pool of worker threads, and stages are linked by bounded
+queues: when a slow stage falls behind, the queue in front of it fills and
+the stages upstream block instead of piling up extracted text in memory.
+
+Finished items are appended to a ``Checkpoint`` file keyed by task, content
+digests and extractor version, so a restarted run skips them and a changed
+file is processed again. ``watch_directory`` polls a folder for new or
+changed files for a long-running ingester; ``read_manifest`` lists the work
+up front instead.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.batch_ranking import DOCUMENT_EXTENSIONS
+
+SUMMARIZE, COMPARE = "summarize", "compare"
+TASKS = (SUMMARIZE, COMPARE)
+JOB_EXTENSIONS = (".txt", ".md")
+CHECKPOINT_NAME = ".ingest-checkpoint.jsonl"
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_POLL_SECONDS = 2.0
+
+_DONE = object()  # end-of-input marker passed down the stage queues
+
+
+class ManifestError(ValueError):
+    """Raised when a manifest cannot be read or lists an invalid entry."""
+
+
+@dataclass
+class IngestItem:
+    """One unit of work, filled in stage by stage.
+
+    ``name`` is the stem of the result file; the digests, ``key`` and texts
+    are set by the hash and extract stages.
+    """
+    task: str
+    pdf: str
+    job: Optional[str] = None
+    name: Optional[str] = None
+    pdf_digest: Optional[str] = None
+    job_digest: Optional[str] = None
+    key: Optional[str] = None
+    text: str = ""
+    job_text: str = ""
+    result: Optional[dict] = None
+    started: float = field(default_factory=time.perf_counter)
+
+    def __post_init__(self):
+        if self.name is None:
+            stem = os.path.splitext(os.path.basename(self.pdf))[0]
+            if self.job is not None:
+                stem = f"{stem}__{os.path.splitext(os.path.basename(self.job))[0]}"
+            self.name = stem
+
+    @property
+    def label(self) -> str:
+        return f"{os.path.basename(self.pdf)} ↔ {os.path.basename(self.job)}" if self.job else os.path.basename(self.pdf)
+
+    def output_name(self) -> str:
+        return f"{self.name}.{self.task}.json"
+
+
+@dataclass
+class Stage:
+    """A pipeline step: ``func(item)`` returns the item for the next stage, or None to drop it."""
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+
+
+@dataclass
+class StageStats:
+    """Counters of one stage; ``blocked_seconds`` is time spent waiting for room downstream."""
+    name: str
+    workers: int
+    processed: int = 0
+    dropped: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    def utilisation(self, seconds: float) -> float:
+        """Share of the run its workers spent working; the busiest stage is the bottleneck."""
+        return self.busy_seconds / (seconds * self.workers) if seconds > 0 else 0.0
+
+    def to_dict(self, seconds: float) -> dict:
+        handled = self.processed + self.dropped + self.failed
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "skipped": self.dropped,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "avg_seconds": round(self.busy_seconds / handled, 3) if handled else 0.0,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "utilisation": round(self.utilisation(seconds), 3)
+        }
+
+
+@dataclass
+class PipelineStats:
+    """What a pipeline run did, per stage and overall."""
+    stages: List[StageStats]
+    fed: int = 0
+    seconds: float = 0.0
+    interrupted: bool = False
+
+    @property
+    def completed(self) -> int:
+        return self.stages[-1].processed if self.stages else 0
+
+    @property
+    def failed(self) -> int:
+        return sum(stage.failed for stage in self.stages)
+
+    @property
+    def skipped(self) -> int:
+        return sum(stage.dropped for stage in self.stages)
+
+    @property
+    def throughput(self) -> float:
+        """Items completed per second of wall-clock time."""
+        return self.completed / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "items": self.fed,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "seconds": round(self.seconds, 3),
+            "items_per_second": round(self.throughput, 3),
+            "interrupted": self.interrupted,
+            "stages": {stage.name: stage.to_dict(self.seconds) for stage in self.stages}
+        }
+
+
+class Pipeline:
+    """Runs items through ``stages``, each on its own worker threads, linked by queues of ``queue_size``.
+
+    An exception raised by a stage drops the item and is handed to
+    ``on_error(stage_name, item, error)``; the run carries on.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = DEFAULT_QUEUE_SIZE,
+                 on_error: Optional[Callable[[str, Any, Exception], None]] = None):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = max(queue_size, 1)
+        self.on_error = on_error
+
+    def run(self, source: Iterable[Any], stop: Optional[threading.Event] = None) -> PipelineStats:
+        """Feed every item of ``source`` through the stages and wait for them to finish.
+
+        Setting ``stop`` (or Ctrl-C) ends the run early: no new items are
+        taken, items already being worked on finish, and queued ones are
+        dropped, so a checkpointed run picks them up again on restart.
+        """
+        stop = stop or threading.Event()
+        stats = PipelineStats([StageStats(stage.name, max(stage.workers, 1)) for stage in self.stages])
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        remaining = [stage.workers for stage in stats.stages]
+        lock = threading.Lock()
+
+        def put(outbox: queue.Queue, item: Any, stage: Optional[StageStats]) -> None:
+            try:
+                outbox.put_nowait(item)
+            except queue.Full:
+                started = time.perf_counter()
+                outbox.put(item)
+                if stage is not None:
+                    with lock:
+                        stage.blocked_seconds += time.perf_counter() - started
+
+        def feed() -> None:
+            try:
+                for item in source:
+                    if stop.is_set():
+                        break
+                    put(queues[0], item, None)
+                    with lock:
+                        stats.fed += 1
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error("source", None, e)
+            finally:
+                for _ in range(stats.stages[0].workers):
+                    queues[0].put(_DONE)
+
+        def work(index: int) -> None:
+            stage, stage_stats = self.stages[index], stats.stages[index]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            while True:
+                item = inbox.get()
+                if item is _DONE:
+                    break
+                if stop.is_set():
+                    continue
+                started = time.perf_counter()
+                try:
+                    result = stage.func(item)
+                except Exception as e:
+                    with lock:
+                        stage_stats.failed += 1
+                        stage_stats.busy_seconds += time.perf_counter() - started
+                    if self.on_error is not None:
+                        self.on_error(stage.name, item, e)
+                    continue
+                with lock:
+                    stage_stats.busy_seconds += time.perf_counter() - started
+                    if result is None:
+                        stage_stats.dropped += 1
+                    else:
+                        stage_stats.processed += 1
+                if result is not None and outbox is not None:
+                    put(outbox, result, stage_stats)
+            # The last worker of a stage to finish tells every worker of the next one
+            with lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last and outbox is not None:
+                for _ in range(stats.stages[index + 1].workers):
+                    outbox.put(_DONE)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=feed, name="ingest-source", daemon=True)]
+        for index, stage in enumerate(stats.stages):
+            threads += [threading.Thread(target=work, args=(index,), name=f"ingest-{stage.name}-{number}", daemon=True)
+                        for number in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                try:
+                    thread.join(0.5)
+                except KeyboardInterrupt:
+                    stop.set()
+                    stats.interrupted = True
+        stats.seconds = time.perf_counter() - started
+        stats.interrupted = stats.interrupted or stop.is_set()
+        return stats
+
+
+class Checkpoint:
+    """Append-only JSON-lines record of finished items, keyed by ``IngestItem.key``.
+
+    Each line is flushed to disk as it is written; a line cut short by a
+    crash is ignored on the next load, and the next entry starts on a line
+    of its own.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done: Dict[str, dict] = {}
+        self._truncated = False
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    self._truncated = not line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("status") == "done":
+                        self._done[entry["key"]] = entry
+
+    def is_done(self, key: str) -> bool:
+        with self._lock:
+            return key in self._done
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._done)
+
+    def record(self, key: str, status: str = "done", **fields) -> None:
+        entry = dict(fields, key=key, status=status, at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(("\n" if self._truncated else "") + json.dumps(entry) + "\n")
+                self._truncated = False
+                file.flush()
+                os.fsync(file.fileno())
+            if status == "done":
+                self._done[key] = entry
+
+
+def write_json_atomic(path: str, data: dict) -> None:
+    """Write JSON through a temporary file, so readers never see a half-written result."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2)
+    os.replace(temporary, path)
+
+
+def is_job_advert(path: str) -> bool:
+    return path.lower().endswith(JOB_EXTENSIONS)
+
+
+class ItemPlanner:
+    """Turns documents as they turn up into work items.
+
+    For ``summarize`` every PDF is an item. For ``compare`` every PDF is a CV
+    and every text file a job advert, and each CV is paired with each job
+    advert, including ones that turn up later. A document seen again (a
+    changed file) is planned again; the checkpoint decides what is redone.
+    """
+
+    def __init__(self, task: str, jobs: Iterable[str] = ()):
+        if task not in TASKS:
+            raise ValueError(f"Unknown task '{task}' (expected one of: {', '.join(TASKS)})")
+        self.task = task
+        self.pdfs: List[str] = []
+        self.jobs: List[str] = list(jobs)
+
+    def plan(self, paths: Iterable[str]) -> List[IngestItem]:
+        items = []
+        for path in paths:
+            if path.lower().endswith(".pdf"):
+                if path not in self.pdfs:
+                    self.pdfs.append(path)
+                if self.task == SUMMARIZE:
+                    items.append(IngestItem(SUMMARIZE, path))
+                else:
+                    items += [IngestItem(COMPARE, path, job) for job in self.jobs]
+            elif self.task == COMPARE and is_job_advert(path):
+                if path not in self.jobs:
+                    self.jobs.append(path)
+                items += [IngestItem(COMPARE, pdf, path) for pdf in self.pdfs]
+        return items
+
+
+def read_manifest(path: str) -> List[IngestItem]:
+    """Items listed in a JSON list or JSON-lines file.
+
+    Each entry is ``{"pdf": ...}`` to summarize a PDF, or ``{"pdf": ...,
+    "job": ...}`` to compare a CV with a job advert; ``"task"`` and
+    ``"name"`` (the result file stem) are optional. Relative paths are
+    resolved against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    try:
+        with open(path, encoding="utf-8") as file:
+            content = file.read()
+    except OSError as e:
+        raise ManifestError(f"Could not read manifest {path}: {e}") from e
+    try:
+        stripped = content.lstrip()
+        entries = json.loads(content) if stripped.startswith("[") else \
+            [json.loads(line) for line in content.splitlines() if line.strip()]
+    except ValueError as e:
+        raise ManifestError(f"Manifest {path} is not valid JSON: {e}") from e
+
+    items = []
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict) or not entry.get("pdf"):
+            raise ManifestError(f"Manifest entry {number} needs a \"pdf\" path")
+        task = entry.get("task") or (COMPARE if entry.get("job") else SUMMARIZE)
+        if task not in TASKS or (task == COMPARE) != bool(entry.get("job")):
+            raise ManifestError(f"Manifest entry {number}: a comparison needs a \"job\", a summary none")
+        job = os.path.join(base, entry["job"]) if entry.get("job") else None
+        items.append(IngestItem(task, os.path.join(base, entry["pdf"]), job, name=entry.get("name")))
+    return items
+
+
+def scan_directory(path: str) -> List[str]:
+    """The documents directly inside ``path``, skipping hidden and temporary files."""
+    return sorted(os.path.join(path, name) for name in os.listdir(path)
+                  if name.lower().endswith(DOCUMENT_EXTENSIONS) and not name.startswith(".")
+                  and os.path.isfile(os.path.join(path, name)))
+
+
+def watch_directory(path: str, stop: threading.Event, interval: float = DEFAULT_POLL_SECONDS,
+                    idle_seconds: Optional[float] = None) -> Iterator[List[str]]:
+    """Yield batches of documents that are new or changed in ``path``, polling every ``interval`` seconds.
+
+    A file is only yielded once its size and modification time held still
+    for a whole poll, so one that is still being copied in waits. Stops when
+    ``stop`` is set, or after ``idle_seconds`` without anything new.
+    """
+    seen: Dict[str, Tuple[float, int]] = {}
+    pending: Dict[str, Tuple[float, int]] = {}
+    last_activity = time.monotonic()
+    while not stop.is_set():
+        ready = []
+        current = {}
+        for document in scan_directory(path):
+            try:
+                info = os.stat(document)
+            except OSError:
+                continue  # removed between listing and stat
+            current[document] = (info.st_mtime, info.st_size)
+        for document, signature in current.items():
+            if seen.get(document) == signature:
+                continue
+            if pending.get(document) == signature:
+                seen[document] = signature
+                ready.append(document)
+                del pending[document]
+            else:
+                pending[document] = signature
+        if ready or pending:
+            last_activity = time.monotonic()
+        if ready:
+            yield ready
+        elif idle_seconds is not None and time.monotonic() - last_activity >= idle_seconds:
+            return
+        stop.wait(interval)
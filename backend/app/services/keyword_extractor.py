@@ -0,0 +1,236 @@
+"""
+Local keyword extraction without a model call.
+
+Text is split into phrases, every 1-3 word n-gram is normalized through a
+synonym table, and candidates are scored by TF-IDF with a boost for terms
+in a skills lexicon. Document frequencies come from a ``KeywordIndex``, an
+inverted index of keywords to documents that also answers "which documents
+mention X" lookups. Output matches the lower-case keyword lists produced by
+the model, so either source can feed the same match scoring.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+EXTRACTOR_VERSION = "lexicon-2"  # bump when the lexicon, synonyms or scoring change
+MODES = ("fast", "ai", "hybrid")
+DEFAULT_MODE = "ai"
+DEFAULT_TOP_N = 40
+MAX_NGRAM = 3
+LEXICON_BOOST = 3.0
+
+SKILLS_LEXICON = frozenset(term.strip() for term in """
+    python, java, javascript, typescript, c++, c#, golang, rust, ruby, php, scala, kotlin, swift, perl, matlab,
+    sql, nosql, bash, powershell, html, css, sass, graphql, rest api, api, microservices, json, xml, yaml,
+    react, angular, vue, svelte, next.js, node.js, express, django, flask, fastapi, spring, spring boot,
+    rails, laravel, .net, asp.net, tailwind, bootstrap, jquery, redux, webpack,
+    postgresql, mysql, sqlite, oracle, mongodb, redis, elasticsearch, cassandra, dynamodb, snowflake, bigquery,
+    aws, azure, gcp, docker, kubernetes, terraform, ansible, jenkins, github actions, gitlab, ci/cd, devops,
+    linux, unix, git, nginx, kafka, rabbitmq, spark, hadoop, airflow, dbt, etl, data pipelines, data warehouse,
+    machine learning, deep learning, artificial intelligence, natural language processing, computer vision,
+    data science, data analysis, data engineering, data visualization, statistics, pandas, numpy,
+    scikit-learn, tensorflow, pytorch, keras, llm, generative ai, tableau, power bi, excel, looker,
+    unit testing, test automation, selenium, cypress, jest, pytest, tdd, bdd, qa,
+    agile, scrum, kanban, lean, prince2, itil, six sigma, waterfall, jira, confluence,
+    project management, product management, program management, stakeholder management, change management,
+    risk management, budget management, people management, team leadership, leadership, mentoring, coaching,
+    communication, presentation, negotiation, problem solving, critical thinking, collaboration, teamwork,
+    customer service, account management, business analysis, business development, requirements gathering,
+    process improvement, strategic planning, sales, marketing, digital marketing, seo, crm, salesforce, sap,
+    financial analysis, financial modelling, forecasting, budgeting, accounting, auditing, compliance,
+    cybersecurity, information security, penetration testing, networking, cloud computing, system design,
+    software development, software engineering, web development, mobile development, full stack, frontend,
+    backend, ui, ux, user research, figma, object oriented programming, design patterns, algorithms,
+    pmp, cissp, cpa, acca, aws certified, scrum master, product owner
+""".split(","))
+
+# Variant spellings mapped to the lexicon's canonical form
+SYNONYMS = {
+    "js": "javascript", "ecmascript": "javascript", "ts": "typescript",
+    "cpp": "c++", "c plus plus": "c++", "c sharp": "c#", "go lang": "golang",
+    "reactjs": "react", "react.js": "react", "vuejs": "vue", "vue.js": "vue", "angularjs": "angular",
+    "nodejs": "node.js", "node": "node.js", "nextjs": "next.js",
+    "dotnet": ".net", "net core": ".net", ".net core": ".net",
+    "postgres": "postgresql", "psql": "postgresql", "mongo": "mongodb", "ms sql": "sql", "t sql": "sql",
+    "k8s": "kubernetes", "amazon web services": "aws", "google cloud": "gcp", "google cloud platform": "gcp",
+    "microsoft azure": "azure", "ci cd": "ci/cd", "cicd": "ci/cd", "continuous integration": "ci/cd",
+    "ml": "machine learning", "ai": "artificial intelligence", "nlp": "natural language processing",
+    "sklearn": "scikit-learn", "scikit learn": "scikit-learn", "large language models": "llm",
+    "large language model": "llm", "llms": "llm", "genai": "generative ai", "gen ai": "generative ai",
+    "powerbi": "power bi", "ms excel": "excel", "microsoft excel": "excel",
+    "oop": "object oriented programming", "object oriented": "object oriented programming",
+    "apis": "api", "restful": "rest api", "restful api": "rest api", "restful apis": "rest api", "rest apis": "rest api",
+    "front end": "frontend", "back end": "backend", "fullstack": "full stack", "user experience": "ux",
+    "user interface": "ui",
+    "team lead": "team leadership", "leading teams": "team leadership", "people manager": "people management",
+    "stakeholder engagement": "stakeholder management",
+    "test driven development": "tdd", "behaviour driven development": "bdd", "behavior driven development": "bdd",
+    "quality assurance": "qa", "infosec": "information security", "cyber security": "cybersecurity",
+    "pen testing": "penetration testing", "financial modeling": "financial modelling",
+    "project manager": "project management", "product manager": "product management",
+}
+
+STOPWORDS = frozenset("""
+    a about above across after again against all also am an and any are as at be because been before being
+    below between both but by can could did do does doing down during each etc either else ever every few for
+    from further get got had has have having he her here hers him his how i if in into is it its itself just
+    least less like made make many may me more most much must my near need needs new no nor not now of off
+    often on once one only or other others our ours out over own part per please plus rather same she should
+    since so some such than that the their theirs them then there these they this those through to too under
+    until up upon us use used using very via was we well were what when where whether which while who whom
+    whose why will with within without would yet you your yours
+    able ability across including include includes strong good great excellent proven years year month months
+    work working worked role roles responsibilities responsible team teams company candidate candidates
+    looking seeking join within across various key skills skill experience experienced knowledge understanding
+    requirements required preferred desirable essential ideal ideally opportunity position based day days
+""".split())
+
+# Phrases break at punctuation, but not inside tokens like node.js, c++ or .net
+_PHRASE_SPLIT = re.compile(r"[,;:!?()\[\]{}<>|\"'•–—\n\t]|\.(?:\s|$)|\s[-/&]\s")
+_TOKEN = re.compile(r"(?:(?<![a-z0-9])\.)?[a-z][a-z0-9]*(?:[+#]+|(?:\.[a-z0-9]+)+)?")
+_MIN_TOKEN_LEN = 2
+
+
+def normalize(keyword: str) -> str:
+    """Canonical lower-case form of a keyword, with synonyms mapped onto the lexicon."""
+    keyword = " ".join(keyword.lower().replace("-", " ").split())
+    return SYNONYMS.get(keyword, keyword)
+
+
+def keyword_mode(mode: Optional[str] = None) -> str:
+    """Validated extraction mode; defaults to KEYWORD_MODE, then "ai"."""
+    mode = (mode or os.environ.get("KEYWORD_MODE", DEFAULT_MODE)).lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown keyword mode '{mode}' (expected one of {', '.join(MODES)})")
+    return mode
+
+
+class KeywordIndex:
+    """Thread-safe inverted index of keywords to the documents that contain them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._documents: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: str, keywords: Iterable[str]) -> None:
+        """Index (or re-index) a document's keywords."""
+        keywords = list(dict.fromkeys(normalize(keyword) for keyword in keywords))
+        with self._lock:
+            self._remove(doc_id)
+            self._documents[doc_id] = keywords
+            for keyword in keywords:
+                self._postings[keyword].add(doc_id)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        for keyword in self._documents.pop(doc_id, []):
+            postings = self._postings[keyword]
+            postings.discard(doc_id)
+            if not postings:
+                del self._postings[keyword]
+
+    def keywords(self, doc_id: str) -> List[str]:
+        with self._lock:
+            return list(self._documents.get(doc_id, []))
+
+    def lookup(self, keyword: str) -> Set[str]:
+        """Documents containing ``keyword`` (after normalization)."""
+        with self._lock:
+            return set(self._postings.get(normalize(keyword), ()))
+
+    def search(self, keywords: Iterable[str], match_all: bool = False) -> Dict[str, int]:
+        """Documents containing any (or all) of ``keywords``, with how many of them each contains."""
+        terms = {normalize(keyword) for keyword in keywords}
+        counts: Counter = Counter()
+        with self._lock:
+            for term in terms:
+                counts.update(self._postings.get(term, ()))
+        if match_all:
+            return {doc_id: count for doc_id, count in counts.items() if count == len(terms)}
+        return dict(counts)
+
+    def document_frequency(self, keyword: str) -> int:
+        with self._lock:
+            return len(self._postings.get(keyword, ()))
+
+    def idf(self, keyword: str) -> float:
+        """Smoothed inverse document frequency; 1.0 for every term while the index is empty."""
+        with self._lock:
+            documents = len(self._documents)
+            frequency = len(self._postings.get(keyword, ()))
+        return math.log((1 + documents) / (1 + frequency)) + 1.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"documents": len(self._documents), "keywords": len(self._postings)}
+
+
+def _phrases(text: str) -> Iterable[List[str]]:
+    for phrase in _PHRASE_SPLIT.split(text.lower()):
+        tokens = _TOKEN.findall(phrase)
+        if tokens:
+            yield tokens
+
+
+def _candidates(text: str) -> Tuple[Counter, Set[str]]:
+    """Count normalized 1-3 word n-grams that neither start nor end with a stopword.
+
+    Also returns the words that appear inside multi-word lexicon matches.
+    """
+    counts: Counter = Counter()
+    covered: Set[str] = set()
+    for tokens in _phrases(text):
+        for size in range(1, MAX_NGRAM + 1):
+            for start in range(len(tokens) - size + 1):
+                gram = tokens[start:start + size]
+                if gram[0] in STOPWORDS or gram[-1] in STOPWORDS:
+                    continue
+                phrase = SYNONYMS.get(" ".join(gram), " ".join(gram))
+                if phrase in SKILLS_LEXICON:
+                    counts[phrase] += 1
+                    if size > 1:
+                        covered.update(gram)
+                elif len(phrase) > _MIN_TOKEN_LEN:
+                    counts[phrase] += 1
+    return counts, covered
+
+
+def extract_keywords(text: str, top_n: int = DEFAULT_TOP_N, index: Optional[KeywordIndex] = None) -> List[str]:
+    """Return up to ``top_n`` keywords from ``text``, best first.
+
+    Lexicon skills found in the text always outrank other terms. Free-text
+    phrases of two or more words only count when they repeat, and words
+    already covered by a lexicon phrase are dropped. With an ``index`` the
+    term frequencies are weighted by its inverse document frequencies.
+    """
+    counts, covered = _candidates(text)
+    scored = []
+    for phrase, count in counts.items():
+        in_lexicon = phrase in SKILLS_LEXICON
+        words = phrase.count(" ") + 1
+        if not in_lexicon and (phrase in covered or (words > 1 and count < 2)):
+            continue
+        score = (1 + math.log(count)) * (index.idf(phrase) if index is not None else 1.0) * (1 + 0.5 * (words - 1))
+        if in_lexicon:
+            score *= LEXICON_BOOST
+        scored.append((not in_lexicon, -score, phrase))
+    scored.sort()
+    return [phrase for _, _, phrase in scored[:top_n]]
+
+
+def rank_missing(job_keywords: List[str], cv_keywords: Iterable[str]) -> List[str]:
+    """Job keywords absent from the CV after normalization, lexicon skills first, otherwise in job order."""
+    cv_terms = {normalize(keyword) for keyword in cv_keywords}
+    missing = [keyword for keyword in dict.fromkeys(job_keywords) if normalize(keyword) not in cv_terms]
+    return sorted(missing, key=lambda keyword: normalize(keyword) not in SKILLS_LEXICON)
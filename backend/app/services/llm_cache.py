@@ -0,0 +1,169 @@
+"""
+Response cache for LLM generations.
+
+Responses are keyed by a fingerprint of (model, prompt, generation options)
+and stored in a local SQLite database, so identical prompts are answered
+without re-running the model. Entries expire after a TTL and the least
+recently used entries are evicted once the cache holds too many.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, Optional, Union
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pdf2ai", "llm_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60  # 7 days
+DEFAULT_MAX_ENTRIES = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+"""
+
+
+def fingerprint(model: str, prompt: str, options: Optional[dict] = None,
+                format: Optional[Union[str, dict]] = None) -> str:
+    """Return a stable SHA-256 fingerprint of a generation request."""
+    request = {"model": model, "prompt": prompt, "options": options or {}}
+    if format:
+        request["format"] = format
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed TTL + LRU cache of model responses."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypasses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for ``key``, or None if missing or expired."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Store a response and evict expired and least recently used entries."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO responses (key, model, response, created, last_access) "
+                         "VALUES (?, ?, ?, ?, ?)", (key, model, response, now, now))
+            expired = conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)).rowcount
+            overflow = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute("DELETE FROM responses WHERE key IN "
+                             "(SELECT key FROM responses ORDER BY last_access LIMIT ?)", (overflow,))
+            self.evictions += expired + max(overflow, 0)
+
+    def discard(self, key: str) -> None:
+        """Drop a cached response, e.g. one that turned out to be unusable."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def get_or_generate(self, model: str, prompt: str, options: Optional[dict],
+                        generate: Callable[[], str], use_cache: bool = True,
+                        format: Optional[Union[str, dict]] = None) -> str:
+        """Return a cached response, or call ``generate`` and cache its non-empty result."""
+        if not use_cache:
+            self.bypasses += 1
+            return generate()
+        key = fingerprint(model, prompt, options, format)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        response = generate()
+        if response:
+            self.put(key, model, response)
+        return response
+
+    async def get_or_generate_async(self, model: str, prompt: str, options: Optional[dict],
+                                    generate: Callable[[], Awaitable[str]], use_cache: bool = True,
+                                    format: Optional[Union[str, dict]] = None) -> str:
+        """Async variant of :meth:`get_or_generate`; SQLite access runs off the event loop."""
+        if not use_cache:
+            self.bypasses += 1
+            return await generate()
+        key = fingerprint(model, prompt, options, format)
+        cached = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            return cached
+        response = await generate()
+        if response:
+            await asyncio.to_thread(self.put, key, model, response)
+        return response
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current cache usage."""
+        with self._lock, self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bypasses": self.bypasses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+def default_llm_cache() -> Optional[LLMCache]:
+    """Build a cache from LLM_CACHE_* environment variables; None when disabled."""
+    if os.environ.get("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    try:
+        ttl_seconds = float(os.environ.get("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        max_entries = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    except ValueError:
+        ttl_seconds, max_entries = DEFAULT_TTL_SECONDS, DEFAULT_MAX_ENTRIES
+    return LLMCache(os.environ.get("LLM_CACHE_PATH", DEFAULT_CACHE_PATH), ttl_seconds, max_entries)
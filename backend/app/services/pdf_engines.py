@@ -0,0 +1,399 @@
+"""
+Pluggable PDF text extraction engines.
+
+PyPDF2 is always available; pypdf, pdfminer.six (run with layout analysis
+off) and pypdfium2 are used when installed. An ``ExtractionPolicy`` names a
+primary engine and the fallbacks tried, page by page, when the primary
+returns no text (or fails) for a page, and for whole documents it cannot
+open. ``calibrate()`` times the installed
+engines on a sample corpus and picks the fastest one whose text yield is
+within a threshold of the best; with ``PDF_ENGINE=auto`` that choice is
+read back from the calibration file.
+"""
+
+import importlib
+import importlib.util
+import io
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.utils.lazy_import import lazy_import, preload
+
+metadata = lazy_import("importlib.metadata")
+
+DEFAULT_ENGINE = "pypdf2"
+DEFAULT_MIN_YIELD = 0.95
+DEFAULT_CALIBRATION_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pdf2ai", "extraction_engine.json")
+
+
+class EngineDocument:
+    """An open PDF; ``text(index)`` extracts one page (0-based)."""
+    page_count = 0
+
+    def text(self, index: int) -> str:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class _ReaderDocument(EngineDocument):
+    """PyPDF2 and pypdf share an API."""
+
+    def __init__(self, reader_class, pdf_path: str):
+        self._file = open(pdf_path, "rb")
+        try:
+            self._reader = reader_class(self._file)
+            self.page_count = len(self._reader.pages)
+        except Exception:
+            self._file.close()
+            raise
+
+    def text(self, index: int) -> str:
+        return self._reader.pages[index].extract_text() or ""
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _PdfminerDocument(EngineDocument):
+    """pdfminer.six with layout analysis off, which skips its slowest step."""
+
+    def __init__(self, pdf_path: str):
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfinterp import PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+
+        self._file = open(pdf_path, "rb")
+        try:
+            self._pages = list(PDFPage.create_pages(PDFDocument(PDFParser(self._file))))
+        except Exception:
+            self._file.close()
+            raise
+        self._resources = PDFResourceManager(caching=True)
+        self.page_count = len(self._pages)
+
+    def text(self, index: int) -> str:
+        from pdfminer.converter import TextConverter
+        from pdfminer.pdfinterp import PDFPageInterpreter
+
+        output = io.StringIO()
+        device = TextConverter(self._resources, output, laparams=None)
+        try:
+            PDFPageInterpreter(self._resources, device).process_page(self._pages[index])
+        finally:
+            device.close()
+        return output.getvalue()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _PdfiumDocument(EngineDocument):
+    def __init__(self, pdf_path: str):
+        import pypdfium2
+
+        self._document = pypdfium2.PdfDocument(pdf_path)
+        self.page_count = len(self._document)
+
+    def text(self, index: int) -> str:
+        page = self._document[index]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range().replace("\r\n", "\n")
+        finally:
+            textpage.close()
+            page.close()
+
+    def close(self) -> None:
+        self._document.close()
+
+
+@dataclass(frozen=True)
+class Engine:
+    """An extraction engine: the module it needs, its distribution (for the version) and an opener."""
+    name: str
+    module: str
+    distribution: str
+    submodules: Tuple[str, ...] = ()
+
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+
+    def warm_up(self) -> None:
+        """Import the engine's library now rather than while the first PDF waits."""
+        preload((self.module, *self.submodules))
+
+    @property
+    def version(self) -> str:
+        try:
+            return metadata.version(self.distribution)
+        except metadata.PackageNotFoundError:
+            return "unknown"
+
+    def open(self, pdf_path: str) -> EngineDocument:
+        if self.name in ("pypdf2", "pypdf"):
+            return _ReaderDocument(importlib.import_module(self.module).PdfReader, pdf_path)
+        if self.name == "pdfminer":
+            return _PdfminerDocument(pdf_path)
+        return _PdfiumDocument(pdf_path)
+
+
+# In order of preference when choosing fallbacks
+ENGINES: Dict[str, Engine] = {engine.name: engine for engine in (
+    Engine("pypdf2", "PyPDF2", "PyPDF2"),
+    Engine("pypdf", "pypdf", "pypdf"),
+    Engine("pypdfium2", "pypdfium2", "pypdfium2"),
+    Engine("pdfminer", "pdfminer", "pdfminer.six", ("pdfminer.converter", "pdfminer.pdfdocument",
+                                                   "pdfminer.pdfinterp", "pdfminer.pdfpage", "pdfminer.pdfparser")),
+)}
+
+
+def installed_engines() -> List[str]:
+    """Names of the engines whose library is installed, in order of preference."""
+    return [name for name, engine in ENGINES.items() if engine.available()]
+
+
+def get_engine(name: str) -> Engine:
+    engine = ENGINES.get(name)
+    if engine is None:
+        raise ValueError(f"Unknown PDF engine '{name}'; choose from {', '.join(ENGINES)}")
+    if not engine.available():
+        raise ValueError(f"PDF engine '{name}' is not installed (pip install {engine.distribution})")
+    return engine
+
+
+@dataclass(frozen=True)
+class ExtractionPolicy:
+    """The primary engine, then the fallbacks tried for pages it returns no text for."""
+    engines: Tuple[str, ...] = (DEFAULT_ENGINE,)
+
+    @property
+    def primary(self) -> str:
+        return self.engines[0]
+
+    @property
+    def version(self) -> str:
+        """Identifies the extraction output, for cache keys."""
+        return "+".join(f"{name}-{ENGINES[name].version}" for name in self.engines) + "/1"
+
+    @classmethod
+    def from_config(cls, engine: str = "auto", fallbacks: Optional[Sequence[str]] = None,
+                    calibration_path: str = DEFAULT_CALIBRATION_PATH) -> "ExtractionPolicy":
+        """Build a policy from configuration.
+
+        ``engine="auto"`` uses the calibrated engine, or PyPDF2 before any
+        calibration. ``fallbacks=None`` means every other installed engine;
+        engines that are not installed are skipped.
+        """
+        installed = installed_engines()
+        if engine == "auto":
+            engine = load_calibrated_engine(calibration_path) or DEFAULT_ENGINE
+            if engine not in installed:
+                engine = DEFAULT_ENGINE
+        get_engine(engine)
+        fallbacks = [name for name in (installed if fallbacks is None else fallbacks)
+                     if name != engine and name in installed]
+        return cls((engine, *dict.fromkeys(fallbacks)))
+
+    @classmethod
+    def from_env(cls) -> "ExtractionPolicy":
+        """Read PDF_ENGINE, PDF_FALLBACK_ENGINES (a JSON list; ``[]`` disables fallback) and
+        PDF_ENGINE_CALIBRATION_PATH."""
+        try:
+            fallbacks = json.loads(os.environ["PDF_FALLBACK_ENGINES"]) if os.environ.get("PDF_FALLBACK_ENGINES") else None
+        except ValueError:
+            fallbacks = None
+        return cls.from_config(os.environ.get("PDF_ENGINE", "auto"), fallbacks,
+                               os.environ.get("PDF_ENGINE_CALIBRATION_PATH", DEFAULT_CALIBRATION_PATH))
+
+    def open(self, pdf_path: str) -> "PolicyDocument":
+        return PolicyDocument(self, pdf_path)
+
+    def warm_up(self) -> None:
+        """Import the primary engine; fallbacks are imported by the first page that needs one, as they are opened."""
+        ENGINES[self.primary].warm_up()
+
+
+class PolicyDocument:
+    """A PDF opened with the first of a policy's engines that can read it; other engines are opened on first need."""
+
+    def __init__(self, policy: ExtractionPolicy, pdf_path: str):
+        self.policy = policy
+        self.pdf_path = pdf_path
+        self._documents: Dict[str, Optional[EngineDocument]] = {}
+        error = None
+        for name in policy.engines:
+            try:
+                self._documents[name] = ENGINES[name].open(pdf_path)
+            except Exception as e:
+                self._documents[name] = None  # This engine cannot read the file; stop trying it
+                error = error or e
+                continue
+            self.engine = name
+            self.page_count = self._documents[name].page_count
+            break
+        else:
+            raise error
+
+    def _document(self, name: str) -> Optional[EngineDocument]:
+        if name not in self._documents:
+            try:
+                self._documents[name] = ENGINES[name].open(self.pdf_path)
+            except Exception:
+                self._documents[name] = None  # This engine cannot read the file; stop trying it
+        return self._documents[name]
+
+    def extract(self, index: int) -> Tuple[str, str]:
+        """``(text, engine)`` for a page from the first engine that returns any text.
+
+        If none does, the opening engine's (empty) text, or its error if it failed.
+        """
+        error = None
+        try:
+            text = self._documents[self.engine].text(index)
+        except Exception as e:
+            text, error = "", e
+        if text.strip():
+            return text, self.engine
+        for name in self.policy.engines:
+            document = None if name == self.engine else self._document(name)
+            if document is None or index >= document.page_count:
+                continue
+            try:
+                fallback = document.text(index)
+            except Exception:
+                continue
+            if fallback.strip():
+                return fallback, name
+        if error is not None:
+            raise error
+        return text, self.engine
+
+    def close(self) -> None:
+        for document in self._documents.values():
+            if document is not None:
+                document.close()
+
+    def __enter__(self) -> "PolicyDocument":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@dataclass
+class EngineBenchmark:
+    """One engine's speed and text yield over a calibration corpus."""
+    engine: str
+    version: str
+    pages: int = 0
+    seconds: float = 0.0
+    characters: int = 0
+    empty_pages: int = 0
+    errors: int = 0
+    text_yield: float = 0.0  # Characters relative to the best engine on each document
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class Calibration:
+    engine: str
+    min_yield: float
+    documents: List[str]
+    results: List[EngineBenchmark] = field(default_factory=list)
+    calibrated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        for result, benchmark in zip(data["results"], self.results):
+            result["pages_per_second"] = round(benchmark.pages_per_second, 2)
+        return data
+
+
+def _extract_all(engine: Engine, pdf_path: str) -> Tuple[List[str], float, int]:
+    """Every page's text with one engine, the time taken and the number of failed pages."""
+    began = time.perf_counter()
+    texts, errors = [], 0
+    document = engine.open(pdf_path)
+    try:
+        for index in range(document.page_count):
+            try:
+                texts.append(document.text(index))
+            except Exception:
+                texts.append("")
+                errors += 1
+    finally:
+        document.close()
+    return texts, time.perf_counter() - began, errors
+
+
+def calibrate(pdf_paths: Sequence[str], engines: Optional[Sequence[str]] = None,
+              min_yield: float = DEFAULT_MIN_YIELD, rounds: int = 1) -> Calibration:
+    """Benchmark engines on ``pdf_paths`` and choose the fastest that meets ``min_yield``.
+
+    Text yield is an engine's non-whitespace character count relative to
+    the best engine on the same document, averaged over the corpus. The
+    fastest time of ``rounds`` runs is kept. If no engine meets the
+    threshold the highest-yielding one is chosen.
+    """
+    names = [name for name in (engines or installed_engines()) if ENGINES[name].available()]
+    results = {name: EngineBenchmark(name, ENGINES[name].version) for name in names}
+    yields: Dict[str, List[float]] = {name: [] for name in names}
+    for pdf_path in pdf_paths:
+        characters = {}
+        for name in names:
+            best = None
+            for _ in range(max(rounds, 1)):
+                try:
+                    texts, seconds, errors = _extract_all(ENGINES[name], pdf_path)
+                except Exception:
+                    texts, seconds, errors = [], 0.0, 1
+                best = (texts, seconds, errors) if best is None or seconds < best[1] else best
+            texts, seconds, errors = best
+            result = results[name]
+            result.pages += len(texts)
+            result.seconds += seconds
+            result.errors += errors
+            result.empty_pages += sum(not text.strip() for text in texts)
+            characters[name] = sum(len("".join(text.split())) for text in texts)
+            result.characters += characters[name]
+        most = max(characters.values(), default=0)
+        for name in names:
+            yields[name].append(characters[name] / most if most else 1.0)
+    for name in names:
+        results[name].text_yield = round(sum(yields[name]) / len(yields[name]), 4) if yields[name] else 0.0
+
+    ranked = list(results.values())
+    qualified = [result for result in ranked if result.text_yield >= min_yield and result.pages]
+    if qualified:
+        chosen = max(qualified, key=lambda result: result.pages_per_second)
+    else:
+        chosen = max(ranked, key=lambda result: result.text_yield, default=EngineBenchmark(DEFAULT_ENGINE, ""))
+    return Calibration(chosen.engine, min_yield, list(pdf_paths), ranked)
+
+
+def save_calibration(calibration: Calibration, path: str = DEFAULT_CALIBRATION_PATH) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(calibration.to_dict(), file, indent=2)
+
+
+def load_calibrated_engine(path: str = DEFAULT_CALIBRATION_PATH) -> Optional[str]:
+    """The engine chosen by the last calibration saved at ``path``, if any."""
+    try:
+        with open(path, encoding="utf-8") as file:
+            engine = json.load(file).get("engine")
+    except (OSError, ValueError, AttributeError):
+        return None
+    return engine if engine in ENGINES else None
@@ -0,0 +1,302 @@
+"""
+PDF text extraction engine shared by the CLI and the FastAPI backend.
+
+Page ranges are sharded across a process pool and joined back together in
+page order. Every page is timed so slow pages can be spotted. Pages can also
+be consumed lazily as a stream, so callers can stop early or ask for a range
+without holding the whole document in memory. Which library extracts the
+text is set by an ``ExtractionPolicy`` (see ``pdf_engines``).
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.services.pdf_engines import ExtractionPolicy
+from app.services.text_cache import TextCache, hash_file
+from app.utils.lazy_import import lazy_import
+from app.utils.metrics import observe_stage, registry
+
+process = lazy_import("concurrent.futures.process")
+
+# Documents smaller than this are extracted inline; process start-up would cost more than it saves
+MIN_PAGES_PER_SHARD = 8
+
+_executor: Optional["process.ProcessPoolExecutor"] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+FALLBACK_PAGES = registry.counter("deepdfscan_extraction_fallback_pages_total",
+                                  "Pages whose text came from a fallback extraction engine", ("engine",))
+
+
+@dataclass
+class PageResult:
+    """Extracted text and timing for a single page (1-based page number)."""
+    page_no: int
+    text: str
+    seconds: float
+    engine: str = ""
+
+
+@dataclass
+class ExtractionResult:
+    """Per-page extraction results in page order."""
+    pages: List[PageResult]
+    total_seconds: float
+    workers: int
+    cached: bool = False
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @property
+    def text(self) -> str:
+        """Full document text, one newline-terminated block per page."""
+        return "".join(page.text + "\n" for page in self.pages)
+
+    def slowest_pages(self, limit: int = 5) -> List[PageResult]:
+        """Return the slowest pages, slowest first."""
+        return sorted(self.pages, key=lambda page: page.seconds, reverse=True)[:limit]
+
+
+def default_workers() -> int:
+    """Worker count from EXTRACTION_WORKERS, falling back to the CPU count."""
+    try:
+        workers = int(os.environ.get("EXTRACTION_WORKERS", "0"))
+    except ValueError:
+        workers = 0
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+@lru_cache(maxsize=1)
+def default_policy() -> ExtractionPolicy:
+    """Extraction policy from PDF_ENGINE, PDF_FALLBACK_ENGINES and PDF_ENGINE_CALIBRATION_PATH."""
+    return ExtractionPolicy.from_env()
+
+
+def get_executor(workers: int) -> "process.ProcessPoolExecutor":
+    """Return the shared process pool, recreating it if the worker count changed."""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = process.ProcessPoolExecutor(max_workers=workers)
+            _executor_workers = workers
+        return _executor
+
+
+def shutdown_executor() -> None:
+    """Shut down the shared process pool, if one was started."""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+        _executor = None
+        _executor_workers = 0
+
+
+def _warm_worker(policy: ExtractionPolicy) -> None:
+    """Import the primary extraction engine in a worker process."""
+    policy.warm_up()
+
+
+def warm_up(workers: Optional[int] = None, policy: Optional[ExtractionPolicy] = None) -> dict:
+    """Import the primary extraction engine and start every worker of the process pool.
+
+    The engine is imported here first, so forked workers start with it
+    loaded. Meant to run before the first PDF arrives (e.g. at server
+    start-up) rather than while it waits.
+    """
+    began = time.perf_counter()
+    workers = workers or default_workers()
+    policy = policy or default_policy()
+    policy.warm_up()
+    if workers > 1:
+        # One task per worker starts the whole pool (processes are otherwise started on demand)
+        executor = get_executor(workers)
+        for future in [executor.submit(_warm_worker, policy) for _ in range(workers)]:
+            future.result()
+    return {"engine": policy.primary, "workers": workers if workers > 1 else 0,
+            "seconds": round(time.perf_counter() - began, 3)}
+
+
+def count_pages(pdf_path: str, policy: Optional[ExtractionPolicy] = None) -> int:
+    """Return the number of pages in a PDF, read by the first of the policy's engines that can open it."""
+    with (policy or default_policy()).open(pdf_path) as document:
+        return document.page_count
+
+
+def plan_shards(page_count: int, workers: int,
+                min_pages: int = MIN_PAGES_PER_SHARD) -> List[Tuple[int, int]]:
+    """Split ``[0, page_count)`` into contiguous ``(start, end)`` ranges, one per worker."""
+    if page_count <= 0:
+        return []
+    shard_size = max(min_pages, math.ceil(page_count / max(workers, 1)))
+    return [(start, min(start + shard_size, page_count))
+            for start in range(0, page_count, shard_size)]
+
+
+def _iter_shard(pdf_path: str, start: int, end: int, policy: ExtractionPolicy) -> Iterator[PageResult]:
+    """Lazily extract pages ``start`` to ``end`` (0-based, exclusive)."""
+    with policy.open(pdf_path) as document:
+        for index in range(start, min(end, document.page_count)):
+            began = time.perf_counter()
+            text, engine = document.extract(index)
+            yield PageResult(index + 1, text, time.perf_counter() - began, engine)
+
+
+def _extract_shard(pdf_path: str, start: int, end: int, policy: ExtractionPolicy) -> List[PageResult]:
+    """Extract a shard of pages. Runs inside a worker process."""
+    return list(_iter_shard(pdf_path, start, end, policy))
+
+
+def iter_page_results(pdf_path: str, start: int = 1, end: Optional[int] = None,
+                      workers: Optional[int] = 1,
+                      min_pages_per_shard: int = MIN_PAGES_PER_SHARD,
+                      cache: Optional[TextCache] = None,
+                      digest: Optional[str] = None,
+                      policy: Optional[ExtractionPolicy] = None) -> Iterator[PageResult]:
+    """Yield pages ``start`` to ``end`` (1-based, inclusive) in page order.
+
+    With one worker pages are extracted one at a time as they are consumed. With
+    more, at most ``workers`` shards are in flight at once, which keeps memory
+    bounded while still using the process pool.
+
+    When a ``cache`` is given it is checked first (keyed by ``digest``, or the
+    file's SHA-256); a fully consumed whole-document stream is stored on a miss.
+    The cache key includes the policy's engines, so changing engine re-extracts.
+    """
+    policy = policy or default_policy()
+    if cache is None:
+        yield from _iter_uncached(pdf_path, start, end, workers, min_pages_per_shard, policy)
+        return
+
+    key = TextCache.make_key(digest or hash_file(pdf_path), policy.version)
+    cached = cache.get(key)
+    if cached is not None:
+        last = min(end or len(cached), len(cached))
+        for index in range(max(start, 1) - 1, last):
+            yield PageResult(index + 1, cached[index], 0.0)
+        return
+
+    texts = []
+    for page in _iter_uncached(pdf_path, start, end, workers, min_pages_per_shard, policy):
+        texts.append(page.text)
+        yield page
+    if start <= 1 and end is None:
+        cache.put(key, texts)
+
+
+def _iter_uncached(pdf_path: str, start: int, end: Optional[int], workers: Optional[int],
+                   min_pages_per_shard: int, policy: ExtractionPolicy) -> Iterator[PageResult]:
+    # Pages are timed where they are extracted (maybe a worker process) and recorded here
+    for page in _iter_extracted(pdf_path, start, end, workers, min_pages_per_shard, policy):
+        observe_stage("extract_page", page.seconds)
+        if page.engine != policy.primary:
+            FALLBACK_PAGES.inc(engine=page.engine)
+        yield page
+
+
+def _iter_extracted(pdf_path: str, start: int, end: Optional[int], workers: Optional[int],
+                    min_pages_per_shard: int, policy: ExtractionPolicy) -> Iterator[PageResult]:
+    workers = workers or default_workers()
+    page_count = count_pages(pdf_path, policy)
+    first = max(start, 1) - 1
+    last = min(end or page_count, page_count)
+    shards = [(first + shard_start, first + shard_end)
+              for shard_start, shard_end in plan_shards(last - first, workers, min_pages_per_shard)]
+
+    if len(shards) <= 1 or workers <= 1:
+        for shard_start, shard_end in shards:
+            yield from _iter_shard(pdf_path, shard_start, shard_end, policy)
+        return
+
+    executor = get_executor(workers)
+    remaining = iter(shards)
+    pending = deque(executor.submit(_extract_shard, pdf_path, *shard, policy)
+                    for shard in [next(remaining) for _ in range(min(workers, len(shards)))])
+    try:
+        while pending:
+            # Shards are awaited in submission order, so pages come back in page order
+            results = pending.popleft().result()
+            shard = next(remaining, None)
+            if shard is not None:
+                pending.append(executor.submit(_extract_shard, pdf_path, *shard, policy))
+            yield from results
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def iter_pages(pdf_path: str, start: int = 1, end: Optional[int] = None,
+               workers: Optional[int] = 1, cache: Optional[TextCache] = None,
+               policy: Optional[ExtractionPolicy] = None) -> Iterator[Tuple[int, str]]:
+    """Lazily yield ``(page_no, text)`` for pages ``start`` to ``end`` (1-based, inclusive)."""
+    for page in iter_page_results(pdf_path, start, end, workers=workers, cache=cache, policy=policy):
+        yield page.page_no, page.text
+
+
+def join_pages(pages: Union[str, Iterable], max_chars: Optional[int] = None) -> str:
+    """Join a page stream into text, stopping once ``max_chars`` characters have been read.
+
+    Accepts plain text, ``(page_no, text)`` pairs as yielded by :func:`iter_pages`,
+    or :class:`PageResult` objects.
+    """
+    if isinstance(pages, str):
+        return pages if max_chars is None else pages[:max_chars]
+
+    parts = []
+    size = 0
+    for item in pages:
+        text = item[1] if isinstance(item, tuple) else getattr(item, "text", item)
+        parts.append(text + "\n")
+        size += len(text) + 1
+        if max_chars is not None and size >= max_chars:
+            break
+    if hasattr(pages, "close"):
+        # Release the open PDF (and any in-flight shards) when stopping early
+        pages.close()
+
+    text = "".join(parts)
+    return text if max_chars is None else text[:max_chars]
+
+
+def extract_pages(pdf_path: str, workers: Optional[int] = None,
+                  min_pages_per_shard: int = MIN_PAGES_PER_SHARD,
+                  cache: Optional[TextCache] = None,
+                  digest: Optional[str] = None,
+                  policy: Optional[ExtractionPolicy] = None) -> ExtractionResult:
+    """Extract every page of a PDF, sharding page ranges across the process pool.
+
+    A ``cache`` hit skips extraction entirely.
+    """
+    began = time.perf_counter()
+    workers = workers or default_workers()
+    policy = policy or default_policy()
+
+    key = None
+    if cache is not None:
+        key = TextCache.make_key(digest or hash_file(pdf_path), policy.version)
+        cached = cache.get(key)
+        if cached is not None:
+            return ExtractionResult(pages=[PageResult(page_no, text, 0.0) for page_no, text in enumerate(cached, 1)],
+                                    total_seconds=time.perf_counter() - began,
+                                    workers=0,
+                                    cached=True)
+
+    pages = list(_iter_uncached(pdf_path, 1, None, workers, min_pages_per_shard, policy))
+    if key is not None:
+        cache.put(key, [page.text for page in pages])
+    shard_count = len(plan_shards(len(pages), workers, min_pages_per_shard))
+
+    return ExtractionResult(pages=pages,
+                            total_seconds=time.perf_counter() - began,
+                            workers=min(workers, max(shard_count, 1)))
@@ -0,0 +1,201 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same key (a file hash or a prompt fingerprint)
+share one execution: the first caller runs the work and everyone who
+arrives while it is in flight gets the same result or exception. Nothing
+is remembered once the call finishes; that is the caches' job.
+
+``StreamFlight`` does the same for iterators (a page stream), replaying
+items to the callers who joined as the first caller's stream produces them.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls made from threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        """Run ``func`` unless a call for ``key`` is already in flight, in which case wait for its result."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": in_flight}
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Coalesce concurrent identical coroutine calls on one event loop.
+
+    The shared work runs in its own task, so one caller being cancelled
+    (a client disconnecting) does not cancel it for the others; it is only
+    cancelled when every caller waiting on it has gone.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Flight] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Await ``func()`` unless a call for ``key`` is already in flight, in which case await that one."""
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = self._calls[key] = _Flight(asyncio.ensure_future(func()))
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+def _close(iterator: Iterator) -> None:
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+
+class _Broadcast:
+    def __init__(self):
+        self.items: List = []
+        self.done = False
+        self.abandoned = False
+        self.error: Optional[BaseException] = None
+        self.changed = threading.Condition()
+
+
+class StreamFlight:
+    """Coalesce concurrent identical streams consumed from threads.
+
+    The first caller's iterator does the work; everyone who arrives while it
+    is in flight replays its items as they are produced, rather than waiting
+    for the end. If the first caller stops early, a caller who has replayed
+    everything so far carries on with its own iterator, skipping those items.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams: Dict[str, _Broadcast] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def stream(self, key: str, func: Callable[[], Iterable[T]]) -> Iterator[T]:
+        """Iterate ``func()`` unless a stream for ``key`` is already in flight, in which case follow that one.
+
+        The stream joins or starts a flight when it is first advanced.
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            leader = broadcast is None
+            if leader:
+                broadcast = self._streams[key] = _Broadcast()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        yield from self._lead(key, broadcast, func) if leader else self._follow(broadcast, func)
+
+    def _lead(self, key: str, broadcast: _Broadcast, func: Callable[[], Iterable[T]]) -> Iterator[T]:
+        finished = False
+        items = iter(func())
+        try:
+            for item in items:
+                with broadcast.changed:
+                    broadcast.items.append(item)
+                    broadcast.changed.notify_all()
+                yield item
+            finished = True
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            broadcast.error = e
+            raise
+        finally:
+            _close(items)
+            with self._lock:
+                del self._streams[key]
+            with broadcast.changed:
+                broadcast.done = True
+                broadcast.abandoned = not finished and broadcast.error is None
+                broadcast.changed.notify_all()
+
+    def _follow(self, broadcast: _Broadcast, func: Callable[[], Iterable[T]]) -> Iterator[T]:
+        replayed = 0
+        while True:
+            with broadcast.changed:
+                while replayed >= len(broadcast.items) and not broadcast.done:
+                    broadcast.changed.wait()
+                if replayed < len(broadcast.items):
+                    item = broadcast.items[replayed]
+                elif broadcast.error is not None:
+                    raise broadcast.error
+                elif broadcast.abandoned:
+                    break
+                else:
+                    return
+            replayed += 1
+            yield item
+        # The first caller stopped early; carry on with our own stream
+        items = iter(func())
+        try:
+            for position, item in enumerate(items):
+                if position >= replayed:
+                    yield item
+        finally:
+            _close(items)
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._streams)
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": in_flight}
@@ -0,0 +1,199 @@
+"""
+Structured (JSON) output from the model.
+
+Generations ask Ollama for JSON constrained to a pydantic model's schema.
+Whatever comes back is still treated as untrusted: JSON is pulled out of
+code fences and surrounding prose, truncated output is closed off, and the
+result is validated against the model. Only when that fails is the model
+re-prompted, with the validation error, up to a fixed retry budget. Every
+attempt is counted so the parse-failure rate can be watched.
+"""
+
+import json
+import os
+import re
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple, Type, TypeVar, Union
+
+from app.utils.metrics import span
+
+if TYPE_CHECKING:  # pydantic is only needed once a schema is passed in
+    from pydantic import BaseModel
+
+DEFAULT_RETRIES = 1
+
+M = TypeVar("M", bound="BaseModel")
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class StructuredOutputError(Exception):
+    """Raised when no valid structured output was produced within the retry budget."""
+
+
+def structured_retries() -> int:
+    """Re-prompts allowed after an unparseable response (STRUCTURED_OUTPUT_RETRIES)."""
+    return int(os.environ.get("STRUCTURED_OUTPUT_RETRIES", DEFAULT_RETRIES))
+
+
+def output_format(schema: Type["BaseModel"]) -> Optional[Union[str, dict]]:
+    """Ollama ``format`` for ``schema`` per STRUCTURED_OUTPUT_FORMAT.
+
+    "schema" (default) sends the JSON schema, "json" asks for any JSON
+    (for Ollama versions before schema support), "none" sends nothing.
+    """
+    mode = os.environ.get("STRUCTURED_OUTPUT_FORMAT", "schema").lower()
+    if mode == "none":
+        return None
+    if mode == "json":
+        return "json"
+    return schema.model_json_schema()
+
+
+def _balanced_end(text: str, start: int) -> Tuple[int, list, bool]:
+    """Scan a JSON value from ``start``; return its end index (-1 if truncated), open brackets and string state."""
+    stack, in_string, escaped = [], False, False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return index, [], False
+    return -1, stack, in_string
+
+
+def _close_truncated(text: str, stack: list, in_string: bool) -> str:
+    """Close a JSON value that was cut off mid-generation."""
+    if in_string:
+        text += '"'
+    text = text.rstrip()
+    # Drop a dangling separator or a key that never got its value
+    text = re.sub(r'(,|,?\s*"[^"]*"\s*:)\s*$', "", text)
+    return text + "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def extract_json(text: str) -> Tuple[Any, bool]:
+    """Parse JSON out of a model response.
+
+    Returns the parsed value and whether it needed repair (fences, prose,
+    trailing commas or truncation). Raises ValueError when there is no
+    JSON to be had.
+    """
+    stripped = text.strip()
+    try:
+        return json.loads(stripped), False
+    except ValueError:
+        pass
+
+    fenced = _FENCE.search(stripped)
+    candidate = fenced.group(1) if fenced else stripped
+    starts = [index for index in (candidate.find("{"), candidate.find("[")) if index != -1]
+    if not starts:
+        raise ValueError("No JSON object found in the response")
+    start = min(starts)
+    end, stack, in_string = _balanced_end(candidate, start)
+    if end == -1:
+        candidate = _close_truncated(candidate[start:], stack, in_string)
+    else:
+        candidate = candidate[start:end + 1]
+    candidate = _TRAILING_COMMA.sub(r"\1", candidate)
+    return json.loads(candidate), True
+
+
+class StructuredOutputStats:
+    """Thread-safe counters for structured generations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.attempts = 0
+        self.clean = 0
+        self.repaired = 0
+        self.parse_failures = 0
+        self.retries = 0
+        self.failures = 0
+
+    def record(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    @property
+    def parse_failure_rate(self) -> float:
+        """Share of generations that could not be parsed and validated."""
+        return self.parse_failures / self.attempts if self.attempts else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "attempts": self.attempts,
+                "clean": self.clean,
+                "repaired": self.repaired,
+                "parse_failures": self.parse_failures,
+                "parse_failure_rate": self.parse_failure_rate,
+                "retries": self.retries,
+                "failures": self.failures
+            }
+
+
+def _retry_prompt(prompt: str, error: str) -> str:
+    return (f"{prompt}\n\nYour previous reply could not be used: {error}\n"
+            "Reply with only the JSON object, no code fences or explanations.")
+
+
+def generate_structured(generate: Callable[[str, Optional[Union[str, dict]]], str], prompt: str,
+                        schema: Type[M], retries: Optional[int] = None,
+                        stats: Optional[StructuredOutputStats] = None,
+                        on_invalid: Optional[Callable[[str, Optional[Union[str, dict]]], None]] = None) -> M:
+    """Generate and validate a ``schema`` instance.
+
+    ``generate(prompt, format)`` runs one generation. An empty response is
+    treated as the model being unavailable and is not retried.
+    ``on_invalid(prompt, format)`` is told about each unusable response, so
+    a caching caller can drop it rather than replay it next time.
+    """
+    retries = structured_retries() if retries is None else retries
+    stats = stats or StructuredOutputStats()
+    stats.record(requests=1)
+    format = output_format(schema)
+    attempt_prompt = prompt
+    for attempt in range(retries + 1):
+        if attempt:
+            stats.record(retries=1)
+        response = generate(attempt_prompt, format)
+        if not response:
+            stats.record(failures=1)
+            raise StructuredOutputError("The model returned no response")
+        stats.record(attempts=1)
+        try:
+            with span("json_parse"):
+                data, repaired = extract_json(response)
+                result = schema.model_validate(data)
+        except ValueError as e:  # includes pydantic's ValidationError
+            stats.record(parse_failures=1)
+            if on_invalid is not None:
+                on_invalid(attempt_prompt, format)
+            attempt_prompt = _retry_prompt(prompt, " ".join(str(e).split())[:500])
+            continue
+        if repaired:
+            stats.record(repaired=1)
+        else:
+            stats.record(clean=1)
+        return result
+    stats.record(failures=1)
+    raise StructuredOutputError(f"No valid {schema.__name__} after {retries + 1} attempt(s)")
@@ -0,0 +1,260 @@
+"""
+Map-reduce summarization for documents larger than the model context.
+
+The text is split into token-budgeted chunks, each chunk is summarized
+concurrently with bounded parallelism, and the partial summaries are reduced
+recursively until they fit into a single final prompt. Documents that fit in
+one chunk are summarized with a single call, exactly as before. A streaming
+variant reports progress per chunk and relays the final prompt's tokens as
+they are generated.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import aclosing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.services.chunking import Chunk, chunk_pages, estimate_tokens
+from app.utils.metrics import observe_stage
+
+DEFAULT_CHUNK_TOKENS = 3000
+DEFAULT_OVERLAP_TOKENS = 200
+DEFAULT_PARALLELISM = 4
+# Guard against a model that never shrinks its input
+MAX_REDUCE_LEVELS = 5
+
+SUMMARY_PROMPT = "Summarize the following text concisely and clearly:\n\n{text}"
+MAP_PROMPT = ("Summarize the following excerpt (pages {first_page}-{last_page}) of a longer document "
+              "concisely and clearly. Keep key facts, figures, names and conclusions:\n\n{text}")
+REDUCE_PROMPT = ("The following are summaries of consecutive sections of one document. "
+                 "Combine them into a single concise and clear summary:\n\n{text}")
+
+
+@dataclass
+class SummaryConfig:
+    """Chunking and parallelism settings for map-reduce summarization."""
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS
+    parallelism: int = DEFAULT_PARALLELISM
+
+    @classmethod
+    def from_env(cls) -> "SummaryConfig":
+        """Read SUMMARY_CHUNK_TOKENS / SUMMARY_OVERLAP_TOKENS / SUMMARY_PARALLELISM."""
+        return cls(
+            chunk_tokens=int(os.environ.get("SUMMARY_CHUNK_TOKENS", DEFAULT_CHUNK_TOKENS)),
+            overlap_tokens=int(os.environ.get("SUMMARY_OVERLAP_TOKENS", DEFAULT_OVERLAP_TOKENS)),
+            parallelism=int(os.environ.get("SUMMARY_PARALLELISM", DEFAULT_PARALLELISM))
+        )
+
+    def version(self, model: str, start_page: int = 1, end_page: Optional[int] = None) -> str:
+        """Identifies a stored summary: the model, chunking and page range it was produced with."""
+        return f"{model}/{self.chunk_tokens}-{self.overlap_tokens}/pages-{start_page}-{end_page or 'end'}"
+
+
+@dataclass
+class SummaryResult:
+    """Final summary plus per-stage timings (seconds)."""
+    summary: str
+    chunks: int
+    reduce_levels: int
+    timings: Dict[str, float] = field(default_factory=dict)
+    prompt_tokens: int = 0
+
+
+def _chunk(pages: Union[str, Iterable], config: SummaryConfig) -> List[Chunk]:
+    """Chunk text or a page stream, recording the chunking time as the ``prompt_build`` stage.
+
+    Time spent waiting for a lazily extracted page is left out; that is
+    extraction, which is recorded per page.
+    """
+    waiting = [0.0]
+
+    def timed(iterable: Iterable) -> Iterator:
+        iterator = iter(iterable)
+        while True:
+            began = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                waiting[0] += time.perf_counter() - began
+            yield item
+
+    began = time.perf_counter()
+    chunks = list(chunk_pages(pages if isinstance(pages, str) else timed(pages),
+                              config.chunk_tokens, config.overlap_tokens))
+    observe_stage("prompt_build", time.perf_counter() - began - waiting[0])
+    return chunks
+
+
+def _map_prompts(chunks: List[Chunk]) -> List[str]:
+    return [MAP_PROMPT.format(first_page=chunk.first_page, last_page=chunk.last_page, text=chunk.text)
+            for chunk in chunks]
+
+
+def _reduce_groups(summaries: List[str], max_tokens: int) -> List[str]:
+    """Pack consecutive partial summaries into reduce prompts that fit the budget."""
+    groups, current, size = [], [], 0
+    for summary in summaries:
+        tokens = estimate_tokens(summary)
+        if current and size + tokens > max_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(summary)
+        size += tokens
+    if current:
+        groups.append(current)
+    return [REDUCE_PROMPT.format(text="\n\n".join(group)) for group in groups]
+
+
+def _counting(generate: Callable, counter: List[int]) -> Callable:
+    """Wrap ``generate`` so the estimated tokens of every prompt are added to ``counter``."""
+    def wrapper(prompt: str):
+        counter[0] += estimate_tokens(prompt)
+        return generate(prompt)
+    return wrapper
+
+
+def summarize_map_reduce(pages: Union[str, Iterable], generate: Callable[[str], str],
+                         config: SummaryConfig = SummaryConfig()) -> SummaryResult:
+    """Summarize text or a page stream, fanning chunk prompts out over a thread pool."""
+    prompt_tokens = [0]
+    generate = _counting(generate, prompt_tokens)
+    began = time.perf_counter()
+    chunks = _chunk(pages, config)
+    timings = {"chunk": time.perf_counter() - began}
+
+    if len(chunks) <= 1:
+        stage = time.perf_counter()
+        summary = generate(SUMMARY_PROMPT.format(text=chunks[0].text if chunks else ""))
+        timings["summarize"] = time.perf_counter() - stage
+        timings["total"] = time.perf_counter() - began
+        return SummaryResult(summary, len(chunks), 0, timings, prompt_tokens[0])
+
+    with ThreadPoolExecutor(max_workers=max(config.parallelism, 1)) as executor:
+        stage = time.perf_counter()
+        summaries = list(executor.map(generate, _map_prompts(chunks)))
+        timings["map"] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        levels = 0
+        while levels < MAX_REDUCE_LEVELS:
+            levels += 1
+            prompts = _reduce_groups(summaries, config.chunk_tokens)
+            summaries = list(executor.map(generate, prompts))
+            if len(summaries) == 1:
+                break
+        timings["reduce"] = time.perf_counter() - stage
+
+    timings["total"] = time.perf_counter() - began
+    return SummaryResult("\n\n".join(summaries), len(chunks), levels, timings, prompt_tokens[0])
+
+
+async def summarize_map_reduce_async(pages: Union[str, Iterable], generate: Callable[[str], Awaitable[str]],
+                                     config: SummaryConfig = SummaryConfig()) -> SummaryResult:
+    """Async variant of :func:`summarize_map_reduce`; chunking (and extraction) runs on a worker thread."""
+    prompt_tokens = [0]
+    generate = _counting(generate, prompt_tokens)
+    began = time.perf_counter()
+    chunks = await asyncio.to_thread(_chunk, pages, config)
+    timings = {"chunk": time.perf_counter() - began}
+
+    if len(chunks) <= 1:
+        stage = time.perf_counter()
+        summary = await generate(SUMMARY_PROMPT.format(text=chunks[0].text if chunks else ""))
+        timings["summarize"] = time.perf_counter() - stage
+        timings["total"] = time.perf_counter() - began
+        return SummaryResult(summary, len(chunks), 0, timings, prompt_tokens[0])
+
+    semaphore = asyncio.Semaphore(max(config.parallelism, 1))
+
+    async def bounded(prompt: str) -> str:
+        async with semaphore:
+            return await generate(prompt)
+
+    stage = time.perf_counter()
+    summaries = list(await asyncio.gather(*(bounded(prompt) for prompt in _map_prompts(chunks))))
+    timings["map"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    levels = 0
+    while levels < MAX_REDUCE_LEVELS:
+        levels += 1
+        summaries = list(await asyncio.gather(*(bounded(prompt)
+                                                for prompt in _reduce_groups(summaries, config.chunk_tokens))))
+        if len(summaries) == 1:
+            break
+    timings["reduce"] = time.perf_counter() - stage
+
+    timings["total"] = time.perf_counter() - began
+    return SummaryResult("\n\n".join(summaries), len(chunks), levels, timings, prompt_tokens[0])
+
+
+async def stream_map_reduce(pages: Union[str, Iterable], generate: Callable[[str], Awaitable[str]],
+                            stream_generate: Callable[[str], AsyncIterator[str]],
+                            config: SummaryConfig = SummaryConfig()) -> AsyncIterator[Tuple[str, dict]]:
+    """Map-reduce summarization as a stream of ``(event, data)`` pairs.
+
+    Emits ``progress`` events as chunks and reduce groups complete, ``token``
+    events for the final prompt's output, and a closing ``done`` event
+    carrying the full :class:`SummaryResult`.
+    """
+    prompt_tokens = [0]
+    generate = _counting(generate, prompt_tokens)
+    began = time.perf_counter()
+    chunks = await asyncio.to_thread(_chunk, pages, config)
+    timings = {"chunk": time.perf_counter() - began}
+    yield "progress", {"stage": "chunked", "chunks": len(chunks)}
+
+    semaphore = asyncio.Semaphore(max(config.parallelism, 1))
+
+    async def bounded(index: int, prompt: str) -> Tuple[int, str]:
+        async with semaphore:
+            return index, await generate(prompt)
+
+    levels = 0
+    if len(chunks) <= 1:
+        final_prompt = SUMMARY_PROMPT.format(text=chunks[0].text if chunks else "")
+    else:
+        stage = time.perf_counter()
+        summaries = [""] * len(chunks)
+        tasks = [asyncio.ensure_future(bounded(i, prompt)) for i, prompt in enumerate(_map_prompts(chunks))]
+        try:
+            for done, task in enumerate(asyncio.as_completed(tasks), 1):
+                index, summary = await task
+                summaries[index] = summary
+                yield "progress", {"stage": "map", "completed": done, "total": len(chunks)}
+        finally:
+            for task in tasks:
+                task.cancel()
+        timings["map"] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        prompts = _reduce_groups(summaries, config.chunk_tokens)
+        while len(prompts) > 1 and levels < MAX_REDUCE_LEVELS - 1:
+            levels += 1
+            results = await asyncio.gather(*(bounded(i, prompt) for i, prompt in enumerate(prompts)))
+            summaries = [summary for _, summary in results]
+            yield "progress", {"stage": "reduce", "level": levels, "groups": len(summaries)}
+            prompts = _reduce_groups(summaries, config.chunk_tokens)
+        levels += 1
+        final_prompt = prompts[0] if len(prompts) == 1 else REDUCE_PROMPT.format(text="\n\n".join(summaries))
+        timings["reduce"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    yield "progress", {"stage": "generating"}
+    prompt_tokens[0] += estimate_tokens(final_prompt)
+    parts = []
+    # aclosing() makes an early exit close the model stream, which stops the generation
+    async with aclosing(stream_generate(final_prompt)) as tokens:
+        async for token in tokens:
+            parts.append(token)
+            yield "token", {"text": token}
+    timings["summarize" if len(chunks) <= 1 else "final"] = time.perf_counter() - stage
+    timings["total"] = time.perf_counter() - began
+
+    yield "done", {"result": SummaryResult("".join(parts), len(chunks), levels, timings, prompt_tokens[0])}
@@ -0,0 +1,142 @@
+"""
+Content-addressed cache of extracted PDF text.
+
+Entries are keyed by the SHA-256 of the PDF bytes plus the extractor version
+and stored page by page in a local SQLite database. The least recently used
+documents are evicted once the cache grows past its size cap.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pdf2ai", "text_cache.sqlite3")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    page_count INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_last_access ON documents (last_access);
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT NOT NULL,
+    page_no INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (key, page_no)
+);
+"""
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TextCache:
+    """SQLite-backed LRU cache of per-page PDF text."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(digest: str, version: str) -> str:
+        return f"{digest}:{version}"
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return the cached page texts for ``key``, or None on a miss."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT page_count FROM documents WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE documents SET last_access = ? WHERE key = ?", (time.time(), key))
+            pages = conn.execute("SELECT text FROM pages WHERE key = ? ORDER BY page_no", (key,)).fetchall()
+            self.hits += 1
+            return [text for (text,) in pages]
+
+    def put(self, key: str, pages: List[str]) -> None:
+        """Store the page texts for ``key`` and evict old entries past the size cap."""
+        size = sum(len(text.encode("utf-8")) for text in pages)
+        if size > self.max_bytes:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            conn.execute("INSERT OR REPLACE INTO documents (key, size, page_count, last_access) VALUES (?, ?, ?, ?)",
+                         (key, size, len(pages), time.time()))
+            conn.executemany("INSERT INTO pages (key, page_no, text) VALUES (?, ?, ?)",
+                             [(key, page_no, text) for page_no, text in enumerate(pages, 1)])
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM documents ORDER BY last_access").fetchall():
+            conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        """Remove every cached document."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM pages")
+            conn.execute("DELETE FROM documents")
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current cache usage."""
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM documents").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
+
+def default_text_cache() -> Optional[TextCache]:
+    """Build a cache from TEXT_CACHE_* environment variables; None when disabled."""
+    if os.environ.get("TEXT_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    try:
+        max_bytes = int(os.environ.get("TEXT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    except ValueError:
+        max_bytes = DEFAULT_MAX_BYTES
+    return TextCache(os.environ.get("TEXT_CACHE_PATH", DEFAULT_CACHE_PATH), max_bytes)
@@ -0,0 +1,169 @@
+"""
+Token-budget-aware text selection for LLM prompts.
+
+Instead of slicing a fixed number of characters off the front of a document,
+the text is split into sections at recognised headings (skills, experience,
+requirements, ...), each section is scored by how useful it is for keyword
+analysis, and the highest-value sections are packed into the token budget.
+Selected sections are emitted in their original document order.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.services.chunking import TOKENS_PER_WORD, estimate_tokens
+
+# Relative value of a section for keyword extraction and CV/job matching
+HEADING_WEIGHTS: Dict[str, float] = {
+    "technical skills": 3.0,
+    "key skills": 3.0,
+    "skills": 3.0,
+    "competencies": 3.0,
+    "technologies": 3.0,
+    "tech stack": 3.0,
+    "requirements": 3.0,
+    "what you'll need": 3.0,
+    "qualifications": 2.5,
+    "certifications": 2.5,
+    "methodologies": 2.5,
+    "tools": 2.5,
+    "responsibilities": 2.0,
+    "experience": 2.0,
+    "work experience": 2.0,
+    "employment": 2.0,
+    "strengths": 2.0,
+    "about the role": 2.0,
+    "summary": 1.5,
+    "profile": 1.5,
+    "education": 1.2,
+    "projects": 1.2,
+    "languages": 0.8,
+    "benefits": 0.4,
+    "interests": 0.3,
+    "hobbies": 0.2,
+    "references": 0.1,
+    "contact": 0.1
+}
+DEFAULT_WEIGHT = 1.0
+# Don't bother squeezing in a truncated section smaller than this
+MIN_PARTIAL_TOKENS = 40
+
+DEFAULT_KEYWORD_PROMPT_TOKENS = 1000
+DEFAULT_ANALYSIS_PROMPT_TOKENS = 1200
+
+_HEADINGS = sorted(HEADING_WEIGHTS, key=len, reverse=True)
+_ALTERNATION = "|".join(re.escape(heading) for heading in _HEADINGS)
+# A heading on its own line (any case), or an ALL-CAPS heading run into the text as PyPDF2 often produces
+_OWN_LINE_HEADING = re.compile(rf"(?im)^[ \t]*({_ALTERNATION})[ \t]*:?[ \t]*$")
+_INLINE_HEADING = re.compile(rf"(?<![A-Za-z])({'|'.join(re.escape(h.upper()) for h in _HEADINGS)})(?![a-z])")
+
+
+@dataclass
+class Section:
+    """A span of text under one heading."""
+    heading: str
+    text: str
+    start: int
+    weight: float
+    tokens: int
+
+
+@dataclass
+class BudgetedText:
+    """Text selected to fit a token budget, with accounting."""
+    text: str
+    tokens: int
+    source_tokens: int
+    sections: List[str] = field(default_factory=list)
+
+    @property
+    def truncated(self) -> bool:
+        return self.tokens < self.source_tokens
+
+
+def split_sections(text: str) -> List[Section]:
+    """Split text into sections at recognised headings."""
+    boundaries = {}
+    for pattern in (_OWN_LINE_HEADING, _INLINE_HEADING):
+        for match in pattern.finditer(text):
+            boundaries.setdefault(match.start(1), match.group(1).lower())
+
+    starts = sorted(boundaries)
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+        boundaries.setdefault(0, "")
+
+    sections = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        span = text[start:end].strip()
+        if span:
+            heading = boundaries[start]
+            sections.append(Section(heading, span, start, HEADING_WEIGHTS.get(heading, DEFAULT_WEIGHT),
+                                    estimate_tokens(span)))
+    return sections
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` on a word boundary so it fits ``max_tokens``."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    count = int(max_tokens / TOKENS_PER_WORD)
+    while count > 0 and estimate_tokens(" ".join(words[:count])) > max_tokens:
+        count = int(count * 0.9)
+    return " ".join(words[:count])
+
+
+def select_text(text: str, max_tokens: int,
+                weights: Optional[Dict[str, float]] = None) -> BudgetedText:
+    """Pack the highest-value sections of ``text`` into ``max_tokens``."""
+    source_tokens = estimate_tokens(text)
+    if source_tokens <= max_tokens:
+        return BudgetedText(text, source_tokens, source_tokens)
+
+    sections = split_sections(text)
+    if weights:
+        for section in sections:
+            section.weight = weights.get(section.heading, section.weight)
+
+    remaining = max_tokens
+    chosen = []
+    for section in sorted(sections, key=lambda s: (-s.weight, s.start)):
+        if remaining <= 0:
+            break
+        if section.tokens <= remaining:
+            chosen.append((section, section.text))
+            remaining -= section.tokens
+        elif remaining >= MIN_PARTIAL_TOKENS:
+            partial = truncate_to_tokens(section.text, remaining)
+            chosen.append((section, partial))
+            remaining -= estimate_tokens(partial)
+
+    chosen.sort(key=lambda item: item[0].start)
+    selected = "\n\n".join(span for _, span in chosen)
+    return BudgetedText(selected, estimate_tokens(selected), source_tokens,
+                        [section.heading or "(untitled)" for section, _ in chosen])
+
+
+def select_keywords(keywords: List[str], max_tokens: int) -> List[str]:
+    """Return the leading keywords that fit ``max_tokens`` as a comma-separated list."""
+    selected, used = [], 0
+    for keyword in keywords:
+        tokens = estimate_tokens(keyword) + 1
+        if used + tokens > max_tokens:
+            break
+        selected.append(keyword)
+        used += tokens
+    return selected
+
+
+def keyword_prompt_tokens() -> int:
+    """Token budget for keyword-extraction prompts (KEYWORD_PROMPT_TOKENS)."""
+    return int(os.environ.get("KEYWORD_PROMPT_TOKENS", DEFAULT_KEYWORD_PROMPT_TOKENS))
+
+
+def analysis_prompt_tokens() -> int:
+    """Token budget for CV/job analysis prompts (ANALYSIS_PROMPT_TOKENS)."""
+    return int(os.environ.get("ANALYSIS_PROMPT_TOKENS", DEFAULT_ANALYSIS_PROMPT_TOKENS))
@@ -0,0 +1,91 @@
+"""
+Start-up warm-up for the backend.
+
+Heavy dependencies are imported lazily so the server starts listening
+quickly; this pays the remaining first-request costs in the background
+right after start-up: the extraction engine is imported and the process
+pool's workers started, then every routed model is loaded on every
+Ollama endpoint (and kept resident for ``OLLAMA_KEEP_ALIVE``). Readiness
+waits for it, so an autoscaled instance only takes traffic once its first
+request would not pay for model loading.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from app.services import pdf_service
+from app.services.pdf_engines import ExtractionPolicy
+from app.utils.lazy_import import preload
+from app.utils.metrics import MetricsRegistry, registry as default_registry
+from app.utils.ollama_pool import AsyncPooledOllamaClient
+
+DEFAULT_TIMEOUT_SECONDS = 120.0
+
+# Imported lazily by the Ollama clients
+CLIENT_MODULES = ("httpx", "requests")
+
+PENDING, RUNNING, DONE = "pending", "running", "done"
+
+
+class WarmUp:
+    """Runs the warm-up once and reports its progress to the readiness check.
+
+    A warm-up that fails or times out still finishes: readiness then falls
+    back to the regular model check rather than staying unready.
+    """
+
+    def __init__(self, client: AsyncPooledOllamaClient, workers: Optional[int] = None,
+                 policy: Optional[ExtractionPolicy] = None, timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+                 registry: MetricsRegistry = default_registry):
+        self.client = client
+        self.workers = workers
+        self.policy = policy
+        self.timeout_seconds = timeout_seconds
+        self.state = PENDING
+        self.started_at: Optional[float] = None
+        self.seconds: Optional[float] = None
+        self.extraction: Optional[dict] = None
+        self.models: list = []
+        self.error: Optional[str] = None
+        self._seconds = registry.gauge("deepdfscan_warmup_seconds", "Time spent warming up at start-up", ("part",))
+
+    @property
+    def finished(self) -> bool:
+        return self.state == DONE
+
+    async def run(self) -> None:
+        self.state = RUNNING
+        self.started_at = time.perf_counter()
+        try:
+            await asyncio.to_thread(preload, CLIENT_MODULES)
+            self.extraction = await asyncio.to_thread(pdf_service.warm_up, self.workers, self.policy)
+            self._seconds.set(self.extraction["seconds"], part="extraction")
+
+            started = time.perf_counter()
+            await self.client.check_endpoints()
+            self.models = await asyncio.wait_for(self.client.preload(), self.timeout_seconds)
+            self._seconds.set(time.perf_counter() - started, part="models")
+        except asyncio.TimeoutError:
+            self.error = f"Model preload did not finish within {self.timeout_seconds:.0f}s"
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.seconds = time.perf_counter() - self.started_at
+            self._seconds.set(self.seconds, part="total")
+            self.state = DONE
+
+    def status(self) -> dict:
+        """The readiness check entry: ok once the warm-up has finished, however it went."""
+        status = {"ok": self.finished, "state": self.state}
+        if self.state == RUNNING:
+            status["running_seconds"] = round(time.perf_counter() - self.started_at, 1)
+        if self.seconds is not None:
+            status["seconds"] = round(self.seconds, 3)
+        if self.extraction is not None:
+            status["extraction"] = self.extraction
+        if self.models:
+            status["models"] = self.models
+        if self.error:
+            status["detail"] = self.error
+        return status
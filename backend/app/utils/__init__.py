@@ -0,0 +1 @@
+# PDF2AI Backend Utilities
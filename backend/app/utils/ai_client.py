@@ -0,0 +1,321 @@
+"""
+Ollama clients shared by the CLI and the FastAPI backend.
+
+Both keep a pooled keep-alive HTTP connection to the Ollama API with explicit
+timeouts and retries, and ask Ollama to keep the model resident between
+calls. The synchronous client falls back to the ``ollama run`` subprocess only
+when the API cannot be reached; the asyncio client is used by the backend so
+generations never block the event loop.
+
+Every generation is timed into the ``llm_total`` stage (and ``llm_first_token``
+when it can be known), and every failure is counted by kind. requests and
+httpx are imported lazily, and sessions are opened on first use, so
+building a client costs nothing until it is called.
+"""
+
+import json
+import threading
+import time
+from typing import AsyncIterator, List, Optional, Union
+
+from app.utils.lazy_import import lazy_import
+from app.utils.metrics import OLLAMA_ERRORS, observe_stage
+
+httpx = lazy_import("httpx")
+requests = lazy_import("requests")
+subprocess = lazy_import("subprocess")
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+DEFAULT_MODEL = "gemma3"
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_RETRIES = 2
+DEFAULT_KEEP_ALIVE = "30m"
+DEFAULT_POOL_SIZE = 10
+
+
+class OllamaError(Exception):
+    """Raised when a generation fails.
+
+    ``kind`` is one of unreachable, timeout, http, invalid_response,
+    subprocess or unavailable; ``status`` is the HTTP status, when there was one.
+    """
+
+    def __init__(self, message: str, kind: str = "http", status: Optional[int] = None):
+        super().__init__(message)
+        self.kind = kind
+        self.status = status
+
+
+def _failure(kind: str, message: str, status: Optional[int] = None) -> OllamaError:
+    """Count a failed call by kind (unreachable, timeout, http, invalid_response, subprocess)."""
+    OLLAMA_ERRORS.inc(kind=kind)
+    return OllamaError(message, kind=kind, status=status)
+
+
+def _status(error: Exception) -> Optional[int]:
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _record_generation(body: dict, started: float) -> None:
+    """Time a non-streamed generation; Ollama's own durations (ns) give its time to first token."""
+    observe_stage("llm_total", time.perf_counter() - started)
+    if "prompt_eval_duration" in body:
+        observe_stage("llm_first_token", (body.get("load_duration", 0) + body["prompt_eval_duration"]) / 1e9)
+
+
+def build_payload(model: str, prompt: str, options: Optional[dict], keep_alive: Optional[str],
+                  stream: bool = False, format: Optional[Union[str, dict]] = None) -> dict:
+    """Build an ``/api/generate`` request body.
+
+    ``format`` is passed through to Ollama: ``"json"`` or a JSON schema
+    constrains the output to valid JSON.
+    """
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": stream
+    }
+    if options:
+        payload["options"] = options
+    if format:
+        payload["format"] = format
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    return payload
+
+
+def preload_payload(model: str, keep_alive: Optional[str]) -> dict:
+    """An ``/api/generate`` body with no prompt, which makes Ollama load the model and return at once."""
+    payload = {"model": model, "stream": False}
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    return payload
+
+
+class OllamaClient:
+    """Synchronous Ollama client backed by a pooled ``requests.Session``."""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, model: str = DEFAULT_MODEL,
+                 timeout: float = DEFAULT_TIMEOUT, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, keep_alive: Optional[str] = DEFAULT_KEEP_ALIVE,
+                 pool_size: int = DEFAULT_POOL_SIZE, subprocess_fallback: bool = False):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.keep_alive = keep_alive
+        self.subprocess_fallback = subprocess_fallback
+        self.retries = retries
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> "requests.Session":
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._open_session()
+            return self._session
+
+    def _open_session(self) -> "requests.Session":
+        from urllib3.util.retry import Retry
+
+        retry = Retry(total=self.retries, connect=self.retries, read=0, backoff_factor=0.5,
+                      status_forcelist=(502, 503, 504), allowed_methods=frozenset(["GET", "POST"]))
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def generate(self, prompt: str, model: Optional[str] = None, options: Optional[dict] = None,
+                 format: Optional[Union[str, dict]] = None) -> str:
+        """Run a non-streaming generation and return the response text."""
+        model = model or self.model
+        payload = build_payload(model, prompt, options, self.keep_alive, format=format)
+        started = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                         timeout=(self.connect_timeout, self.timeout))
+            response.raise_for_status()
+            body = response.json()
+            text = body["response"]
+        except requests.exceptions.ConnectionError as e:
+            error = _failure("unreachable", f"Ollama API unreachable at {self.base_url}: {e}")
+            if self.subprocess_fallback:
+                return self._generate_subprocess(prompt, model)
+            raise error from e
+        except requests.exceptions.Timeout as e:
+            raise _failure("timeout", str(e)) from e
+        except requests.exceptions.RequestException as e:
+            raise _failure("http", str(e), _status(e)) from e
+        except (KeyError, ValueError) as e:
+            raise _failure("invalid_response", str(e)) from e
+        _record_generation(body, started)
+        return text
+
+    def _generate_subprocess(self, prompt: str, model: str) -> str:
+        """Fallback: run the model through the ``ollama`` CLI (which cannot constrain the output format)."""
+        try:
+            result = subprocess.run(['ollama', 'run', model], input=prompt.encode(),
+                                    capture_output=True, timeout=self.timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise _failure("subprocess", f"ollama subprocess failed: {e}") from e
+        if result.returncode != 0:
+            raise _failure("subprocess", f"ollama subprocess failed: {result.stderr.decode().strip()}")
+        return result.stdout.decode().strip()
+
+    def preload(self, model: Optional[str] = None) -> bool:
+        """Load ``model`` into memory (kept for ``keep_alive``) so the first real call skips the load.
+
+        Best-effort: returns whether it worked rather than raising.
+        """
+        try:
+            response = self.session.post(f"{self.base_url}/api/generate",
+                                         json=preload_payload(model or self.model, self.keep_alive),
+                                         timeout=(self.connect_timeout, self.timeout))
+            response.raise_for_status()
+            return bool(response.json().get("done", True))
+        except (requests.exceptions.RequestException, ValueError, AttributeError):
+            return False
+
+    def is_available(self) -> bool:
+        """Return True if the Ollama API answers."""
+        return self.list_models() is not None
+
+    def list_models(self) -> Optional[List[str]]:
+        """Names of the locally available models, or None if the Ollama API does not answer."""
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=self.connect_timeout)
+            response.raise_for_status()
+            return [model.get("name", "") for model in response.json().get("models", [])]
+        except (requests.exceptions.RequestException, ValueError, AttributeError):
+            return None
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class AsyncOllamaClient:
+    """Asyncio Ollama client backed by a pooled ``httpx.AsyncClient``.
+
+    The underlying client is created on first use so it binds to the running
+    event loop.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, model: str = DEFAULT_MODEL,
+                 timeout: float = DEFAULT_TIMEOUT, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, keep_alive: Optional[str] = DEFAULT_KEEP_ALIVE,
+                 pool_size: int = DEFAULT_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.keep_alive = keep_alive
+        self.pool_size = pool_size
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                transport=httpx.AsyncHTTPTransport(retries=self.retries)
+            )
+        return self._client
+
+    async def generate(self, prompt: str, model: Optional[str] = None, options: Optional[dict] = None,
+                       format: Optional[Union[str, dict]] = None) -> str:
+        """Run a non-streaming generation and return the response text."""
+        payload = build_payload(model or self.model, prompt, options, self.keep_alive, format=format)
+        started = time.perf_counter()
+        try:
+            response = await self.client.post("/api/generate", json=payload)
+            response.raise_for_status()
+            body = response.json()
+            text = body["response"]
+        except httpx.ConnectError as e:
+            raise _failure("unreachable", f"Ollama API unreachable at {self.base_url}: {e}") from e
+        except httpx.TimeoutException as e:
+            raise _failure("timeout", str(e)) from e
+        except httpx.HTTPError as e:
+            raise _failure("http", str(e), _status(e)) from e
+        except (KeyError, ValueError) as e:
+            raise _failure("invalid_response", str(e)) from e
+        _record_generation(body, started)
+        return text
+
+    async def stream_generate(self, prompt: str, model: Optional[str] = None,
+                              options: Optional[dict] = None) -> AsyncIterator[str]:
+        """Yield response tokens as Ollama produces them.
+
+        Closing the iterator early (e.g. when the HTTP client disconnects)
+        closes the connection, which makes Ollama stop generating.
+        """
+        payload = build_payload(model or self.model, prompt, options, self.keep_alive, stream=True)
+        started = time.perf_counter()
+        first_token = True
+        try:
+            async with self.client.stream("POST", "/api/generate", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise _failure("http", chunk["error"])
+                    if chunk.get("response"):
+                        if first_token:
+                            observe_stage("llm_first_token", time.perf_counter() - started)
+                            first_token = False
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        observe_stage("llm_total", time.perf_counter() - started)
+                        break
+        except httpx.ConnectError as e:
+            raise _failure("unreachable", f"Ollama API unreachable at {self.base_url}: {e}") from e
+        except httpx.TimeoutException as e:
+            raise _failure("timeout", str(e)) from e
+        except httpx.HTTPError as e:
+            raise _failure("http", str(e), _status(e)) from e
+        except ValueError as e:
+            raise _failure("invalid_response", str(e)) from e
+
+    async def preload(self, model: Optional[str] = None) -> bool:
+        """Load ``model`` into memory (kept for ``keep_alive``) so the first real call skips the load.
+
+        Best-effort: returns whether it worked rather than raising.
+        """
+        try:
+            response = await self.client.post("/api/generate",
+                                              json=preload_payload(model or self.model, self.keep_alive))
+            response.raise_for_status()
+            return bool(response.json().get("done", True))
+        except (httpx.HTTPError, ValueError, AttributeError):
+            return False
+
+    async def is_available(self) -> bool:
+        """Return True if the Ollama API answers."""
+        return await self.list_models() is not None
+
+    async def list_models(self) -> Optional[List[str]]:
+        """Names of the locally available models, or None if the Ollama API does not answer."""
+        try:
+            response = await self.client.get("/api/tags", timeout=self.connect_timeout)
+            response.raise_for_status()
+            return [model.get("name", "") for model in response.json().get("models", [])]
+        except (httpx.HTTPError, ValueError, AttributeError):
+            return None
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
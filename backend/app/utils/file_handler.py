@@ -0,0 +1,96 @@
+"""
+Streamed upload handling.
+
+Uploads are copied in fixed-size chunks to a uniquely named temporary file
+under ``UPLOAD_DIR``, hashed on the fly so the digest can be used as a cache
+key, and aborted as soon as the size cap is exceeded. The temporary file is
+always removed when the request is done with it.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+from fastapi import UploadFile
+
+from app.utils.metrics import span
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class UploadError(Exception):
+    """Base class for rejected uploads."""
+    status_code = 400
+
+
+class UploadTooLarge(UploadError):
+    """Raised when an upload exceeds the size cap."""
+    status_code = 413
+
+
+class UnsupportedFileType(UploadError):
+    """Raised when an upload's extension is not allowed."""
+    status_code = 415
+
+
+@dataclass
+class StoredUpload:
+    """An upload written to disk."""
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+
+def check_file_type(filename: Optional[str], allowed_types: List[str]) -> None:
+    """Raise UnsupportedFileType unless ``filename`` has an allowed extension."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in allowed_types:
+        raise UnsupportedFileType(f"Unsupported file type '{extension or filename}'. "
+                                  f"Allowed: {', '.join(allowed_types)}")
+
+
+async def save_upload(upload: UploadFile, upload_dir: str, max_size: int,
+                      chunk_size: int = CHUNK_SIZE) -> StoredUpload:
+    """Stream ``upload`` to a unique file under ``upload_dir``, hashing as it goes."""
+    if upload.size is not None and upload.size > max_size:
+        raise UploadTooLarge(f"File exceeds the maximum size of {max_size} bytes")
+
+    os.makedirs(upload_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=".pdf", dir=upload_dir)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with span("upload"), os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(f"File exceeds the maximum size of {max_size} bytes")
+                digest.update(chunk)
+                await asyncio.to_thread(buffer.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return StoredUpload(path=path, filename=upload.filename or os.path.basename(path),
+                        size=size, sha256=digest.hexdigest())
+
+
+@asynccontextmanager
+async def stored_upload(upload: UploadFile, upload_dir: str, max_size: int,
+                        allowed_types: Optional[List[str]] = None) -> AsyncIterator[StoredUpload]:
+    """Save ``upload`` for the duration of the ``async with`` block, then delete it."""
+    if allowed_types:
+        check_file_type(upload.filename, allowed_types)
+    stored = await save_upload(upload, upload_dir, max_size)
+    try:
+        yield stored
+    finally:
+        if os.path.exists(stored.path):
+            os.remove(stored.path)
@@ -0,0 +1,51 @@
+"""
+Deferred imports for heavy dependencies.
+
+``lazy_import("numpy")`` returns a stand-in for the module straight away
+and imports the real one on first attribute access, so modules that need
+PyPDF2, numpy, requests or httpx somewhere can be imported without paying
+for them. CLI commands and API requests that never touch a dependency
+never load it; ``preload()`` loads them up front when a process would
+rather pay before its first request (see the backend's warm-up).
+
+The import itself goes through ``importlib.import_module``, so first use
+from several threads at once is safe (unlike ``importlib.util.LazyLoader``
+before Python 3.12). A missing module is only reported on first use.
+"""
+
+import importlib
+import sys
+from types import ModuleType
+from typing import Iterable, List
+
+
+class _LazyModule(ModuleType):
+    """Stands in for a module until one of its attributes is used."""
+
+    def __getattr__(self, attr: str):
+        module = self.__dict__.get("_module")
+        if module is None:
+            module = self.__dict__["_module"] = importlib.import_module(self.__name__)
+        return getattr(module, attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Module ``name``, imported when one of its attributes is first used.
+
+    Already-imported modules are returned as they are.
+    """
+    return sys.modules.get(name) or _LazyModule(name)
+
+
+def preload(names: Iterable[str]) -> List[str]:
+    """Import modules now; returns the ones that are not installed."""
+    missing = []
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            missing.append(name)
+    return missing
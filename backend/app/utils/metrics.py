@@ -0,0 +1,280 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Counters, gauges and histograms live in a process-wide ``registry`` that
+``/api/metrics`` renders; the CLI reads the same metrics to print stage
+timings. ``span(stage)`` times a block of work into the shared
+``deepdfscan_stage_seconds`` histogram, so the pipeline's stages (upload,
+page extraction, prompt build, LLM first token and total, JSON parse) are
+measured the same way wherever they run. Everything is thread-safe and
+has no dependencies, so instrumenting hot paths costs a lock and a dict
+lookup.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """Yield ``(suffix, label names, label values, value)`` for rendering."""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in sorted(items):
+            yield "", self.labelnames, key, value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, values, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels) -> None:
+        """Mirror a count kept elsewhere (e.g. a cache's hit counter) at collection time."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (made cumulative when rendered), then sum and count
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def totals(self) -> Dict[LabelKey, Tuple[int, float]]:
+        """``(count, sum)`` per label set."""
+        with self._lock:
+            return {key: (series[2], series[1]) for key, series in self._values.items()}
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, (list(series[0]), series[1], series[2])) for key, series in self._values.items()]
+        bucket_names = self.labelnames + ("le",)
+        for key, (counts, total, count) in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", bucket_names, key + (_format_value(bound),), cumulative
+            yield "_bucket", bucket_names, key + ("+Inf",), count
+            yield "_sum", self.labelnames, key, total
+            yield "_count", self.labelnames, key, count
+
+
+class MetricsRegistry:
+    """Named metrics plus callbacks that refresh gauges just before rendering."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def on_collect(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` before every render, e.g. to copy cache stats into gauges."""
+        with self._lock:
+            self._collectors.append(callback)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collect in collectors:
+            collect()
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry shared by the CLI and the backend
+registry = MetricsRegistry()
+
+# The instrumented stages, in pipeline order
+PIPELINE_STAGES = ("upload", "extract_page", "prompt_build", "llm_first_token", "llm_total", "json_parse")
+
+STAGE_SECONDS = registry.histogram("deepdfscan_stage_seconds", "Time spent in each pipeline stage", ("stage",))
+OLLAMA_ERRORS = registry.counter("deepdfscan_ollama_errors_total", "Failed Ollama API calls by kind", ("kind",))
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record a duration that was measured elsewhere (e.g. in a worker process)."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+class Span:
+    """A timed block; ``seconds`` is set when the block exits."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = time.perf_counter()
+        self.seconds: Optional[float] = None
+
+
+@contextmanager
+def span(stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[Span]:
+    """Time the enclosed block into the stage histogram (and ``timings[stage]``, if given).
+
+    Failed blocks are recorded too: the time was spent either way.
+    """
+    current = Span(stage)
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - current.started
+        observe_stage(stage, current.seconds)
+        if timings is not None:
+            timings[stage] = current.seconds
+
+
+def stage_totals() -> Dict[str, Tuple[int, float]]:
+    """``(count, total seconds)`` per stage recorded in this process."""
+    return {key[0]: totals for key, totals in STAGE_SECONDS.totals().items()}
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware counting in-flight and completed HTTP requests.
+
+    A request stays in flight until its response body is finished, so
+    long-lived streams are counted for their whole duration. Requests are
+    labelled with the route template rather than the raw path.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.in_flight = registry.gauge("deepdfscan_http_requests_in_flight", "HTTP requests being served")
+        self.requests = registry.counter("deepdfscan_http_requests_total", "Completed HTTP requests",
+                                         ("method", "route", "status"))
+        self.latency = registry.histogram("deepdfscan_http_request_seconds", "HTTP request duration",
+                                          ("method", "route"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        self.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight.dec()
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            self.requests.inc(method=scope["method"], route=route, status=status[0])
+            self.latency.observe(time.perf_counter() - started, method=scope["method"], route=route)
@@ -0,0 +1,498 @@
+"""
+Load-balanced pool of Ollama endpoints.
+
+Generations go to the endpoint with the fewest requests outstanding (ties
+go to the faster one, then round-robin), so adding an Ollama host adds
+throughput without code changes. Endpoints are health-checked two ways:
+
+* passively: an endpoint that fails ``failure_threshold`` requests in a row
+  (unreachable, timed out or answering 5xx) has its circuit opened and gets
+  no traffic for ``reset_seconds``; then a single trial request decides
+  whether it is closed again or stays open;
+* actively: ``check_endpoints()`` asks every endpoint for its model list,
+  which closes or opens circuits and records which models each host has, so
+  requests for a model only go to hosts that have it. The backend runs it
+  every ``OLLAMA_HEALTH_CHECK_INTERVAL`` seconds.
+
+A request that fails on one endpoint fails over to the next (a stream only
+until its first token). ``task_models`` routes tasks (keywords, summary,
+analysis) to their own models, e.g. a small model for keyword extraction
+and a larger one for summaries.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Collection, Dict, List, Optional, Set, Tuple, Union
+
+from app.utils.ai_client import (DEFAULT_BASE_URL, DEFAULT_CONNECT_TIMEOUT, DEFAULT_KEEP_ALIVE, DEFAULT_MODEL,
+                                 DEFAULT_POOL_SIZE, DEFAULT_RETRIES, DEFAULT_TIMEOUT, AsyncOllamaClient,
+                                 OllamaClient, OllamaError)
+from app.utils.metrics import MetricsRegistry, registry as default_registry
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_SECONDS = 30.0
+DEFAULT_HEALTH_CHECK_INTERVAL = 15.0
+LATENCY_SMOOTHING = 0.3
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def has_model(available: Collection[str], model: str) -> bool:
+    # Ollama lists "gemma3:latest" for a model pulled as "gemma3"
+    return any(name == model or name.split(":", 1)[0] == model for name in available)
+
+
+def is_endpoint_fault(error: OllamaError) -> bool:
+    """Whether a failure says the endpoint is unhealthy (rather than the request being bad)."""
+    if error.kind in ("unreachable", "timeout", "invalid_response"):
+        return True
+    return error.kind == "http" and error.status is not None and error.status >= 500
+
+
+def should_fail_over(error: OllamaError) -> bool:
+    """Whether another endpoint might succeed: the endpoint is unhealthy, or lacks the model (404)."""
+    return is_endpoint_fault(error) or error.status == 404
+
+
+class CircuitBreaker:
+    """Closed until ``failure_threshold`` consecutive failures, then open for ``reset_seconds``.
+
+    After that it is half-open: one trial request is let through, and its
+    outcome closes or re-opens the circuit. Not thread-safe by itself; the
+    pool calls it under its lock.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_seconds: float = DEFAULT_RESET_SECONDS):
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def available(self) -> bool:
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = HALF_OPEN
+            self._trial_in_flight = False
+        return self.state == CLOSED or (self.state == HALF_OPEN and not self._trial_in_flight)
+
+    def acquired(self) -> None:
+        if self.state == HALF_OPEN:
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def abandoned(self) -> None:
+        """The request ended without an outcome; a half-open circuit may try again."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+@dataclass
+class Endpoint:
+    """One Ollama host and what the pool knows about it."""
+    url: str
+    breaker: CircuitBreaker
+    outstanding: int = 0
+    latency: Optional[float] = None  # Smoothed seconds per completed request
+    models: Optional[Set[str]] = None  # From the last active check; None until checked
+    requests: int = 0
+    errors: int = 0
+    checked_at: Optional[float] = None
+    last_error: Optional[str] = field(default=None, repr=False)
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or has_model(self.models, model)
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "state": self.breaker.state,
+            "outstanding": self.outstanding,
+            "latency_seconds": round(self.latency, 4) if self.latency is not None else None,
+            "models": sorted(self.models) if self.models is not None else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_failures": self.breaker.failures,
+            "last_error": self.last_error,
+            "checked_seconds_ago": round(time.monotonic() - self.checked_at, 1) if self.checked_at else None
+        }
+
+
+class EndpointPool:
+    """Routing state shared by the synchronous and asyncio pooled clients."""
+
+    def __init__(self, urls: List[str], model: str = DEFAULT_MODEL, task_models: Optional[Dict[str, str]] = None,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_seconds: float = DEFAULT_RESET_SECONDS,
+                 registry: MetricsRegistry = default_registry):
+        urls = list(dict.fromkeys(url.rstrip("/") for url in urls if url)) or [DEFAULT_BASE_URL]
+        self.endpoints = [Endpoint(url, CircuitBreaker(failure_threshold, reset_seconds)) for url in urls]
+        self.model = model
+        self.task_models = dict(task_models or {})
+        self._lock = threading.Lock()
+        self._turn = 0
+        self._outstanding = registry.gauge("deepdfscan_ollama_endpoint_outstanding",
+                                           "Requests in flight per Ollama endpoint", ("endpoint",))
+        self._up = registry.gauge("deepdfscan_ollama_endpoint_up",
+                                  "1 while an Ollama endpoint's circuit is closed", ("endpoint",))
+        self._requests = registry.counter("deepdfscan_ollama_endpoint_requests_total",
+                                          "Requests per Ollama endpoint by outcome", ("endpoint", "outcome"))
+        self.failovers = registry.counter("deepdfscan_ollama_failovers_total",
+                                          "Requests retried on another Ollama endpoint")
+        for endpoint in self.endpoints:
+            self._up.set(1, endpoint=endpoint.url)
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def model_for(self, task: Optional[str] = None) -> str:
+        """The model serving ``task`` (keywords, summary, analysis, ...), else the default model."""
+        return self.task_models.get(task, self.model) if task else self.model
+
+    def models(self) -> List[str]:
+        """Every model the pool is configured to route to."""
+        return sorted({self.model, *self.task_models.values()})
+
+    def acquire(self, model: str, exclude: Collection[str] = ()) -> Optional[Endpoint]:
+        """Pick the least-loaded available endpoint for ``model``, or None if none is left.
+
+        Endpoints known to lack the model are only used when no endpoint is known to have it.
+        """
+        with self._lock:
+            candidates = [(index, endpoint) for index, endpoint in enumerate(self.endpoints)
+                          if endpoint.url not in exclude and endpoint.breaker.available()]
+            candidates = [item for item in candidates if item[1].serves(model)] or candidates
+            if not candidates:
+                return None
+            count = len(self.endpoints)
+            index, endpoint = min(candidates, key=lambda item: (item[1].outstanding, item[1].latency or 0.0,
+                                                                (item[0] - self._turn) % count))
+            self._turn = (index + 1) % count
+            endpoint.breaker.acquired()
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            self._outstanding.set(endpoint.outstanding, endpoint=endpoint.url)
+        return endpoint
+
+    def release(self, endpoint: Endpoint, seconds: Optional[float] = None,
+                error: Optional[OllamaError] = None) -> None:
+        """Return an endpoint after a request; ``seconds`` for a success, ``error`` for a failure.
+
+        With neither (the caller gave up, e.g. a cancelled stream) the endpoint's health is unchanged.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            self._outstanding.set(endpoint.outstanding, endpoint=endpoint.url)
+            if error is not None:
+                endpoint.errors += 1
+                endpoint.last_error = str(error)
+                if is_endpoint_fault(error):
+                    endpoint.breaker.record_failure()
+                else:
+                    endpoint.breaker.record_success()  # It answered; the request was the problem
+                self._requests.inc(endpoint=endpoint.url, outcome="error")
+            elif seconds is not None:
+                endpoint.breaker.record_success()
+                endpoint.latency = seconds if endpoint.latency is None else \
+                    LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * endpoint.latency
+                self._requests.inc(endpoint=endpoint.url, outcome="success")
+            else:
+                endpoint.breaker.abandoned()
+            self._up.set(endpoint.breaker.state == CLOSED, endpoint=endpoint.url)
+
+    def record_check(self, endpoint: Endpoint, models: Optional[List[str]]) -> None:
+        """Apply an active check's result: the endpoint's model list, or None if it did not answer."""
+        with self._lock:
+            endpoint.checked_at = time.monotonic()
+            if models is None:
+                endpoint.last_error = "health check failed"
+                endpoint.breaker.record_failure()
+            else:
+                endpoint.models = set(models)
+                endpoint.breaker.record_success()
+            self._up.set(endpoint.breaker.state == CLOSED, endpoint=endpoint.url)
+
+    def available_models(self) -> Optional[List[str]]:
+        """Models on endpoints that answered their last check; None if none has answered."""
+        with self._lock:
+            checked = [endpoint for endpoint in self.endpoints
+                       if endpoint.models is not None and endpoint.breaker.state == CLOSED]
+            return sorted(set().union(*(endpoint.models for endpoint in checked))) if checked else None
+
+    def preload_targets(self, models: Optional[Collection[str]] = None) -> List[Tuple[Endpoint, str]]:
+        """``(endpoint, model)`` pairs worth warming: endpoints not circuit-open, with models they serve."""
+        with self._lock:
+            return [(endpoint, model) for endpoint in self.endpoints if endpoint.breaker.state != OPEN
+                    for model in (models or self.models()) if endpoint.serves(model)]
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            return [endpoint.to_dict() for endpoint in self.endpoints]
+
+
+def _no_endpoint(pool: EndpointPool, model: str) -> OllamaError:
+    return OllamaError(f"No Ollama endpoint available for model '{model}' ({len(pool.endpoints)} configured, "
+                       f"all failed or circuit-open)", kind="unavailable")
+
+
+class PooledOllamaClient:
+    """Synchronous client spreading generations over an ``EndpointPool``.
+
+    When every endpoint is unreachable it can fall back to the ``ollama run``
+    subprocess, like ``OllamaClient``.
+    """
+
+    def __init__(self, pool: EndpointPool, timeout: float = DEFAULT_TIMEOUT,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 keep_alive: Optional[str] = DEFAULT_KEEP_ALIVE, pool_size: int = DEFAULT_POOL_SIZE,
+                 subprocess_fallback: bool = False):
+        self.pool = pool
+        self.subprocess_fallback = subprocess_fallback
+        self.clients = {url: OllamaClient(url, pool.model, timeout=timeout, connect_timeout=connect_timeout,
+                                          retries=retries, keep_alive=keep_alive, pool_size=pool_size)
+                        for url in pool.urls}
+
+    @property
+    def model(self) -> str:
+        return self.pool.model
+
+    @property
+    def base_url(self) -> str:
+        return ", ".join(self.pool.urls)
+
+    def model_for(self, task: Optional[str] = None) -> str:
+        return self.pool.model_for(task)
+
+    def generate(self, prompt: str, model: Optional[str] = None, options: Optional[dict] = None,
+                 format: Optional[Union[str, dict]] = None, task: Optional[str] = None) -> str:
+        """Run a non-streaming generation on the best endpoint, failing over to the others."""
+        model = model or self.pool.model_for(task)
+        tried: Set[str] = set()
+        last_error: Optional[OllamaError] = None
+        while (endpoint := self.pool.acquire(model, tried)) is not None:
+            if tried:
+                self.pool.failovers.inc()
+            tried.add(endpoint.url)
+            started = time.perf_counter()
+            try:
+                text = self.clients[endpoint.url].generate(prompt, model=model, options=options, format=format)
+            except OllamaError as e:
+                self.pool.release(endpoint, error=e)
+                if not should_fail_over(e):
+                    raise
+                last_error = e
+                continue
+            except BaseException:
+                self.pool.release(endpoint)
+                raise
+            self.pool.release(endpoint, time.perf_counter() - started)
+            return text
+        if self.subprocess_fallback and (last_error is None or last_error.kind == "unreachable"):
+            return self.clients[self.pool.urls[0]]._generate_subprocess(prompt, model)
+        raise last_error or _no_endpoint(self.pool, model)
+
+    def check_endpoints(self) -> List[dict]:
+        """Actively check every endpoint (in parallel) and return the pool's state."""
+        with ThreadPoolExecutor(max_workers=len(self.pool.endpoints)) as executor:
+            results = list(executor.map(lambda endpoint: self.clients[endpoint.url].list_models(),
+                                        self.pool.endpoints))
+        for endpoint, models in zip(self.pool.endpoints, results):
+            self.pool.record_check(endpoint, models)
+        return self.pool.stats()
+
+    def list_models(self) -> Optional[List[str]]:
+        """Models available on any endpoint, or None if no endpoint answers."""
+        self.check_endpoints()
+        return self.pool.available_models()
+
+    def preload(self, models: Optional[Collection[str]] = None) -> List[dict]:
+        """Load the routed models (or ``models``) on every endpoint that is up and has them."""
+        targets = self.pool.preload_targets(models)
+        if not targets:
+            return []
+
+        def load(target):
+            endpoint, model = target
+            started = time.perf_counter()
+            loaded = self.clients[endpoint.url].preload(model)
+            return _preload_result(endpoint, model, loaded, started)
+
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            return list(executor.map(load, targets))
+
+    def is_available(self) -> bool:
+        return self.list_models() is not None
+
+    def close(self) -> None:
+        for client in self.clients.values():
+            client.close()
+
+
+class AsyncPooledOllamaClient:
+    """Asyncio client spreading generations and streams over an ``EndpointPool``."""
+
+    def __init__(self, pool: EndpointPool, timeout: float = DEFAULT_TIMEOUT,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 keep_alive: Optional[str] = DEFAULT_KEEP_ALIVE, pool_size: int = DEFAULT_POOL_SIZE):
+        self.pool = pool
+        self.clients = {url: AsyncOllamaClient(url, pool.model, timeout=timeout, connect_timeout=connect_timeout,
+                                               retries=retries, keep_alive=keep_alive, pool_size=pool_size)
+                        for url in pool.urls}
+
+    @property
+    def model(self) -> str:
+        return self.pool.model
+
+    @property
+    def base_url(self) -> str:
+        return ", ".join(self.pool.urls)
+
+    def model_for(self, task: Optional[str] = None) -> str:
+        return self.pool.model_for(task)
+
+    async def generate(self, prompt: str, model: Optional[str] = None, options: Optional[dict] = None,
+                       format: Optional[Union[str, dict]] = None, task: Optional[str] = None) -> str:
+        """Run a non-streaming generation on the best endpoint, failing over to the others."""
+        model = model or self.pool.model_for(task)
+        tried: Set[str] = set()
+        last_error: Optional[OllamaError] = None
+        while (endpoint := self.pool.acquire(model, tried)) is not None:
+            if tried:
+                self.pool.failovers.inc()
+            tried.add(endpoint.url)
+            started = time.perf_counter()
+            try:
+                text = await self.clients[endpoint.url].generate(prompt, model=model, options=options, format=format)
+            except OllamaError as e:
+                self.pool.release(endpoint, error=e)
+                if not should_fail_over(e):
+                    raise
+                last_error = e
+                continue
+            except BaseException:
+                self.pool.release(endpoint)
+                raise
+            self.pool.release(endpoint, time.perf_counter() - started)
+            return text
+        raise last_error or _no_endpoint(self.pool, model)
+
+    async def stream_generate(self, prompt: str, model: Optional[str] = None, options: Optional[dict] = None,
+                              task: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield response tokens from the best endpoint; fails over only until the first token."""
+        model = model or self.pool.model_for(task)
+        tried: Set[str] = set()
+        last_error: Optional[OllamaError] = None
+        while (endpoint := self.pool.acquire(model, tried)) is not None:
+            if tried:
+                self.pool.failovers.inc()
+            tried.add(endpoint.url)
+            started = time.perf_counter()
+            streamed = False
+            try:
+                async with aclosing(self.clients[endpoint.url].stream_generate(prompt, model, options)) as tokens:
+                    async for token in tokens:
+                        streamed = True
+                        yield token
+            except OllamaError as e:
+                self.pool.release(endpoint, error=e)
+                if streamed or not should_fail_over(e):
+                    raise
+                last_error = e
+                continue
+            except BaseException:
+                # Closed or cancelled by the consumer: not the endpoint's fault
+                self.pool.release(endpoint)
+                raise
+            self.pool.release(endpoint, time.perf_counter() - started)
+            return
+        raise last_error or _no_endpoint(self.pool, model)
+
+    async def check_endpoints(self) -> List[dict]:
+        """Actively check every endpoint (concurrently) and return the pool's state."""
+        results = await asyncio.gather(*(self.clients[endpoint.url].list_models()
+                                         for endpoint in self.pool.endpoints))
+        for endpoint, models in zip(self.pool.endpoints, results):
+            self.pool.record_check(endpoint, models)
+        return self.pool.stats()
+
+    async def list_models(self) -> Optional[List[str]]:
+        """Models available on any endpoint, or None if no endpoint answers."""
+        await self.check_endpoints()
+        return self.pool.available_models()
+
+    async def is_available(self) -> bool:
+        return await self.list_models() is not None
+
+    async def preload(self, models: Optional[Collection[str]] = None) -> List[dict]:
+        """Load the routed models (or ``models``) on every endpoint that is up and has them, concurrently."""
+
+        async def load(endpoint, model):
+            started = time.perf_counter()
+            loaded = await self.clients[endpoint.url].preload(model)
+            return _preload_result(endpoint, model, loaded, started)
+
+        return list(await asyncio.gather(*(load(endpoint, model)
+                                           for endpoint, model in self.pool.preload_targets(models))))
+
+    async def run_health_checks(self, interval: float = DEFAULT_HEALTH_CHECK_INTERVAL) -> None:
+        """Check every endpoint each ``interval`` seconds until cancelled."""
+        while True:
+            await self.check_endpoints()
+            await asyncio.sleep(interval)
+
+    async def aclose(self) -> None:
+        for client in self.clients.values():
+            await client.aclose()
+
+
+def _preload_result(endpoint: Endpoint, model: str, loaded: bool, started: float) -> dict:
+    return {"endpoint": endpoint.url, "model": model, "loaded": loaded,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def _json_env(name: str, default):
+    try:
+        return json.loads(os.environ[name]) if os.environ.get(name) else default
+    except ValueError:
+        return default
+
+
+def default_pool_client(subprocess_fallback: bool = True) -> PooledOllamaClient:
+    """Build a pooled client from OLLAMA_* environment variables.
+
+    OLLAMA_ENDPOINTS (a JSON list of URLs) replaces OLLAMA_BASE_URL when set;
+    OLLAMA_TASK_MODELS is a JSON object of task -> model.
+    """
+    pool = EndpointPool(
+        _json_env("OLLAMA_ENDPOINTS", []) or [os.environ.get("OLLAMA_BASE_URL", DEFAULT_BASE_URL)],
+        model=os.environ.get("OLLAMA_MODEL", DEFAULT_MODEL),
+        task_models=_json_env("OLLAMA_TASK_MODELS", {}),
+        failure_threshold=int(os.environ.get("OLLAMA_CIRCUIT_FAILURES", DEFAULT_FAILURE_THRESHOLD)),
+        reset_seconds=float(os.environ.get("OLLAMA_CIRCUIT_RESET_SECONDS", DEFAULT_RESET_SECONDS))
+    )
+    return PooledOllamaClient(
+        pool,
+        timeout=float(os.environ.get("OLLAMA_TIMEOUT", DEFAULT_TIMEOUT)),
+        connect_timeout=float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+        retries=int(os.environ.get("OLLAMA_RETRIES", DEFAULT_RETRIES)),
+        keep_alive=os.environ.get("OLLAMA_KEEP_ALIVE", DEFAULT_KEEP_ALIVE),
+        pool_size=int(os.environ.get("OLLAMA_POOL_SIZE", DEFAULT_POOL_SIZE)),
+        subprocess_fallback=subprocess_fallback
+    )
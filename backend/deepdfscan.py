@@ -2,40 +2,222 @@
 PDF text extraction and summarization using Ollama/Gemma3.
 """
 
-import PyPDF2
-import requests
-import os
-from typing import Optional
+import asyncio
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple, Union
+from app.config import settings
+from app.services.analysis_service import ModelLimiter
+from app.services.history_store import HistoryStore
+from app.services.pdf_engines import ExtractionPolicy
+from app.services.pdf_service import PageResult, iter_page_results
+from app.services.summarization import (SummaryConfig, SummaryResult, stream_map_reduce, summarize_map_reduce,
+                                        summarize_map_reduce_async)
+from app.services.llm_cache import fingerprint
+from app.services.single_flight import AsyncSingleFlight, SingleFlight, StreamFlight
+from app.services.text_cache import TextCache, hash_file
+from app.services.llm_cache import LLMCache
+from app.utils.ollama_pool import AsyncPooledOllamaClient, EndpointPool, PooledOllamaClient
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from a PDF file."""
+# Extraction engine, plus fallbacks for pages it returns no text for
+extraction_policy = ExtractionPolicy.from_config(settings.PDF_ENGINE, settings.PDF_FALLBACK_ENGINES,
+                                                 settings.PDF_ENGINE_CALIBRATION_PATH)
+
+# Extracted text cache shared by every request in this process
+text_cache = TextCache(settings.TEXT_CACHE_PATH, settings.TEXT_CACHE_MAX_BYTES) if settings.TEXT_CACHE_ENABLED else None
+
+# Model response cache, keyed by (model, prompt, options) fingerprint
+llm_cache = LLMCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_TTL_SECONDS,
+                     settings.LLM_CACHE_MAX_ENTRIES) if settings.LLM_CACHE_ENABLED else None
+
+# Documents, extracted text, summaries and analysis results, kept across restarts
+history_store = HistoryStore(settings.HISTORY_DB_PATH) if settings.HISTORY_ENABLED else None
+
+# Concurrent identical extractions (by file hash and page range) and prompts (by fingerprint) run once
+extraction_flights = StreamFlight()
+llm_flights = SingleFlight()
+async_llm_flights = AsyncSingleFlight()
+
+# Final-answer streams in flight; an identical stream waits for the first one's full response
+stream_flights: Dict[str, asyncio.Future] = {}
+
+# Chunk size, overlap and parallelism for map-reduce summarization
+summary_config = SummaryConfig(
+    chunk_tokens=settings.SUMMARY_CHUNK_TOKENS,
+    overlap_tokens=settings.SUMMARY_OVERLAP_TOKENS,
+    parallelism=settings.SUMMARY_PARALLELISM
+)
+
+# Ollama endpoints (OLLAMA_ENDPOINTS, else OLLAMA_BASE_URL) with health and load shared by both clients;
+# each request goes to the healthy endpoint with the fewest requests in flight
+ollama_pool = EndpointPool(
+    settings.OLLAMA_ENDPOINTS or [settings.OLLAMA_BASE_URL],
+    model=settings.OLLAMA_MODEL,
+    task_models=settings.OLLAMA_TASK_MODELS,
+    failure_threshold=settings.OLLAMA_CIRCUIT_FAILURES,
+    reset_seconds=settings.OLLAMA_CIRCUIT_RESET_SECONDS
+)
+
+# Pooled keep-alive clients to the Ollama API
+ollama_client = PooledOllamaClient(
+    ollama_pool,
+    timeout=settings.OLLAMA_TIMEOUT,
+    connect_timeout=settings.OLLAMA_CONNECT_TIMEOUT,
+    retries=settings.OLLAMA_RETRIES,
+    keep_alive=settings.OLLAMA_KEEP_ALIVE,
+    pool_size=settings.OLLAMA_POOL_SIZE
+)
+
+# Non-blocking client used by the FastAPI request handlers
+async_ollama_client = AsyncPooledOllamaClient(
+    ollama_pool,
+    timeout=settings.OLLAMA_TIMEOUT,
+    connect_timeout=settings.OLLAMA_CONNECT_TIMEOUT,
+    retries=settings.OLLAMA_RETRIES,
+    keep_alive=settings.OLLAMA_KEEP_ALIVE,
+    pool_size=settings.OLLAMA_POOL_SIZE
+)
+
+# Ollama calls in flight per model, whichever endpoint or request path makes them (cache hits and coalesced
+# calls don't count); the limits are per Ollama endpoint, so adding an endpoint raises them
+model_limiter = ModelLimiter(
+    {model: limit * len(ollama_pool.endpoints) for model, limit in settings.MODEL_MAX_CONCURRENCY.items()},
+    default_concurrency=settings.DEFAULT_MODEL_CONCURRENCY * len(ollama_pool.endpoints)
+)
+
+def stream_pages_from_pdf(pdf_path: str, start: int = 1, end: Optional[int] = None,
+                          digest: Optional[str] = None) -> Iterator[PageResult]:
+    """Lazily yield extracted pages ``start`` to ``end`` (1-based, inclusive), checking the text cache first.
+
+    Concurrent streams of the same content and page range share one extraction:
+    the later ones replay the first one's pages as they are extracted.
+    """
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+        digest = digest or hash_file(pdf_path)
+        yield from extraction_flights.stream(f"{digest}:{start}:{end}", lambda: iter_page_results(
+            pdf_path, start, end, workers=settings.EXTRACTION_WORKERS or None, cache=text_cache, digest=digest,
+            policy=extraction_policy))
     except Exception as e:
         raise Exception(f"Error extracting text from PDF: {str(e)}")
 
-def call_gemma3(prompt: str) -> str:
-    """Call Gemma3 model through Ollama API."""
+def _flight_key(model: str, prompt: str, options: Optional[dict], use_cache: bool,
+                format: Optional[Union[str, dict]] = None) -> str:
+    # Cache-bypassing calls only coalesce with each other, so they never get a cached answer
+    key = fingerprint(model, prompt, options, format)
+    return key if use_cache else f"{key}:fresh"
+
+def _generate(prompt: str, model: str, options: Optional[dict],
+              format: Optional[Union[str, dict]] = None) -> str:
+    try:
+        with model_limiter.slot_sync(model):
+            return ollama_client.generate(prompt, model=model, options=options, format=format)
+    except Exception as e:
+        raise Exception(f"Error calling Gemma3: {str(e)}")
+
+def call_gemma3(prompt: str, options: Optional[dict] = None, use_cache: bool = True,
+                task: Optional[str] = None, format: Optional[Union[str, dict]] = None) -> str:
+    """Call Gemma3 model through Ollama API, answering repeated prompts from the response cache.
+
+    Identical prompts already in flight are not sent again; their callers share the response.
+    ``task`` picks the model from OLLAMA_TASK_MODELS; ``format`` ("json" or a
+    JSON schema) constrains the answer to JSON.
+    """
+    model = ollama_client.model_for(task)
+
+    def generate() -> str:
+        if llm_cache is None:
+            return _generate(prompt, model, options, format)
+        return llm_cache.get_or_generate(model, prompt, options,
+                                         lambda: _generate(prompt, model, options, format),
+                                         use_cache=use_cache, format=format)
+
+    return llm_flights.do(_flight_key(model, prompt, options, use_cache, format), generate)
+
+async def _generate_async(prompt: str, model: str, options: Optional[dict],
+                          format: Optional[Union[str, dict]] = None) -> str:
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "gemma3",
-                "prompt": prompt,
-                "stream": False
-            }
-        )
-        response.raise_for_status()
-        return response.json()["response"]
+        async with model_limiter.slot(model):
+            return await async_ollama_client.generate(prompt, model=model, options=options, format=format)
     except Exception as e:
         raise Exception(f"Error calling Gemma3: {str(e)}")
 
-def summarize_text(text: str) -> str:
-    """AI summarization using Ollama/Gemma3."""
-    prompt = f"Summarize the following text concisely and clearly:\n\n{text}"
-    return call_gemma3(prompt) 
\ No newline at end of file
+async def call_gemma3_async(prompt: str, options: Optional[dict] = None, use_cache: bool = True,
+                             task: Optional[str] = None, format: Optional[Union[str, dict]] = None) -> str:
+    """Non-blocking variant of call_gemma3 for use inside the event loop."""
+    model = async_ollama_client.model_for(task)
+
+    async def generate() -> str:
+        if llm_cache is None:
+            return await _generate_async(prompt, model, options, format)
+        return await llm_cache.get_or_generate_async(model, prompt, options,
+                                                     lambda: _generate_async(prompt, model, options, format),
+                                                     use_cache=use_cache, format=format)
+
+    return await async_llm_flights.do(_flight_key(model, prompt, options, use_cache, format), generate)
+
+async def stream_gemma3_async(prompt: str, options: Optional[dict] = None, use_cache: bool = True,
+                              task: Optional[str] = None) -> AsyncIterator[str]:
+    """Yield Gemma3 response tokens as they are generated.
+
+    A cached response is replayed as a single token; a fully streamed
+    response is cached, a cancelled one is not. While an identical stream
+    is in flight this waits for it and replays its response the same way.
+    """
+    model = async_ollama_client.model_for(task)
+    key = fingerprint(model, prompt, options)
+    flight_key = _flight_key(model, prompt, options, use_cache)
+    while (in_flight := stream_flights.get(flight_key)) is not None:
+        response = await asyncio.shield(in_flight)
+        if response is not None:
+            yield response
+            return
+        # The first stream was cancelled or failed; go round again and generate our own
+    if llm_cache is not None and use_cache:
+        cached = await asyncio.to_thread(llm_cache.get, key)
+        if cached is not None:
+            yield cached
+            return
+    done = stream_flights[flight_key] = asyncio.get_running_loop().create_future()
+    parts, response = [], None
+    try:
+        async with model_limiter.slot(model), \
+                aclosing(async_ollama_client.stream_generate(prompt, model=model, options=options)) as tokens:
+            async for token in tokens:
+                parts.append(token)
+                yield token
+        response = "".join(parts)
+    except Exception as e:
+        raise Exception(f"Error calling Gemma3: {str(e)}")
+    finally:
+        del stream_flights[flight_key]
+        done.set_result(response)
+    if llm_cache is not None and parts:
+        await asyncio.to_thread(llm_cache.put, key, model, response)
+
+def summary_version(start_page: int = 1, end_page: Optional[int] = None) -> str:
+    """Version of a stored summary of these pages, as produced by this backend."""
+    return summary_config.version(ollama_client.model_for("summary"), start_page, end_page)
+
+def summarize_document(text: Union[str, Iterable], use_cache: bool = True) -> SummaryResult:
+    """Map-reduce summarization with per-stage timings. Accepts text or a page stream."""
+    return summarize_map_reduce(text, lambda prompt: call_gemma3(prompt, use_cache=use_cache, task="summary"),
+                                summary_config)
+
+def summarize_text(text: Union[str, Iterable], use_cache: bool = True) -> str:
+    """AI summarization using Ollama/Gemma3. Accepts text or a page stream."""
+    return summarize_document(text, use_cache=use_cache).summary
+
+async def summarize_document_async(text: Union[str, Iterable], use_cache: bool = True) -> SummaryResult:
+    """Non-blocking map-reduce summarization; page streams are extracted off the event loop."""
+    return await summarize_map_reduce_async(
+        text, lambda prompt: call_gemma3_async(prompt, use_cache=use_cache, task="summary"), summary_config)
+
+async def summarize_text_async(text: Union[str, Iterable], use_cache: bool = True) -> str:
+    """Non-blocking AI summarization. Accepts text or a page stream."""
+    return (await summarize_document_async(text, use_cache=use_cache)).summary
+
+def stream_summary_async(text: Union[str, Iterable], use_cache: bool = True) -> AsyncIterator[Tuple[str, dict]]:
+    """Map-reduce summarization as ``(event, data)`` pairs with the final summary streamed token by token."""
+    return stream_map_reduce(text,
+                             lambda prompt: call_gemma3_async(prompt, use_cache=use_cache, task="summary"),
+                             lambda prompt: stream_gemma3_async(prompt, use_cache=use_cache, task="summary"),
+                             summary_config)
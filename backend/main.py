@@ -2,19 +2,57 @@
 FastAPI backend for PDF2AI application.
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+import asyncio
+import json
 import os
+import threading
+import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
-from deepdfscan import extract_text_from_pdf, summarize_text
-from typing import Optional
+from app.config import settings
+from app.services.analysis_service import AnalysisJob, JobQueue, QueueFull
+from app.services.health import ReadinessProbe
+from app.services.pdf_service import count_pages, shutdown_executor
+from app.services.summarization import SummaryResult
+from app.services.warmup import WarmUp
+from app.utils.file_handler import StoredUpload, UploadError, check_file_type, save_upload, stored_upload
+from app.utils.metrics import CONTENT_TYPE, RequestMetricsMiddleware, registry
+from deepdfscan import (async_llm_flights, async_ollama_client, extraction_flights, extraction_policy, history_store,
+                        llm_cache, model_limiter,
+                        llm_flights, ollama_client, ollama_pool, stream_pages_from_pdf, stream_summary_async,
+                        summarize_document_async, summary_version, text_cache)
+from typing import Dict, List, Optional, Tuple
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the job workers, endpoint health checks and warm-up; stop them all on shutdown.
+    
+    The warm-up runs in the background, so the server answers at once while
+    /api/health stays unready until the extraction workers and models are loaded.
+    """
+    job_queue.start()
+    if settings.OLLAMA_HEALTH_CHECK_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(
+            async_ollama_client.run_health_checks(settings.OLLAMA_HEALTH_CHECK_INTERVAL)))
+    if warmup is not None:
+        background_tasks.append(asyncio.create_task(warmup.run()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await job_queue.stop()
+    await async_ollama_client.aclose()
+    await asyncio.to_thread(shutdown_executor)
 
 # Create FastAPI application
 app = FastAPI(
     title="PDF2AI",
     description="PDF to AI Summary API",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -26,6 +64,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# In-flight and completed request counts for /api/metrics
+app.add_middleware(RequestMetricsMiddleware)
+
+# Endpoints that accept file uploads; oversized bodies are rejected before they are read
+UPLOAD_PATHS = {"/api/summarize", "/api/summarize/stream", "/api/analyze/summarize"}
+# Allowance for multipart boundaries and headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+@app.middleware("http")
+async def enforce_upload_size(request: Request, call_next):
+    """Reject uploads whose declared Content-Length exceeds MAX_FILE_SIZE."""
+    if request.method == "POST" and request.url.path in UPLOAD_PATHS:
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() \
+                and int(content_length) > settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+            return JSONResponse(status_code=413,
+                                content={"detail": f"File exceeds the maximum size of {settings.MAX_FILE_SIZE} bytes"})
+    return await call_next(request)
+
+# Background analysis jobs with admission control; every endpoint that calls Ollama is shed with 429
+# once the queued jobs plus the model calls waiting on the per-model limits pass JOB_MAX_BACKLOG
+job_queue = JobQueue(
+    workers=settings.JOB_WORKERS,
+    max_backlog=settings.JOB_MAX_BACKLOG,
+    limiter=model_limiter,
+    result_ttl_seconds=settings.JOB_RESULT_TTL_SECONDS
+)
+
+# Extraction workers and Ollama models loaded at start-up, before the first request needs them
+warmup = WarmUp(async_ollama_client, workers=settings.EXTRACTION_WORKERS or None, policy=extraction_policy,
+                timeout_seconds=settings.WARMUP_TIMEOUT_SECONDS) if settings.WARMUP_ENABLED else None
+
+# Ollama reachability (checked at most every HEALTH_CHECK_TTL_SECONDS), backlog and warm-up, for /api/health
+readiness = ReadinessProbe(async_ollama_client, job_queue, ttl_seconds=settings.HEALTH_CHECK_TTL_SECONDS,
+                           warmup=warmup)
+
+# Periodic active checks of the Ollama endpoints (OLLAMA_HEALTH_CHECK_INTERVAL) and the warm-up
+background_tasks: List[asyncio.Task] = []
+
 @app.get("/")
 async def root():
     """Root endpoint for health check."""
@@ -37,13 +114,19 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "message": "PDF2AI Backend is running!",
+    """Readiness check: Ollama reachable with the model pulled, and room in the job backlog.
+    
+    Answers 503 when not ready, so load balancers stop routing work here.
+    """
+    result = await readiness.check()
+    return JSONResponse(status_code=200 if result["ready"] else 503, content={
+        "status": "healthy" if result["ready"] else "unavailable",
+        "message": "PDF2AI Backend is running!" if result["ready"] else "PDF2AI Backend is not ready",
+        "ready": result["ready"],
+        "checks": result["checks"],
         "timestamp": datetime.utcnow().isoformat(),
         "version": "0.1.0"
-    }
+    })
 
 @app.get("/api/test")
 async def test_connection():
@@ -53,41 +136,498 @@ async def test_connection():
         "backend": "PDF2AI",
         "timestamp": datetime.utcnow().isoformat(),
         "version": "0.1.0",
-        "available_endpoints": ["/", "/api/health", "/api/test", "/api/summarize"],
+        "available_endpoints": ["/", "/api/health", "/api/test", "/api/summarize", "/api/summarize/stream", "/api/analyze/summarize",
+                                "/api/analysis/{analysis_id}", "/api/analysis/history", "/api/pdfs", "/api/pdfs/{file_id}",
+                                "/api/search", "/api/queue", "/api/cache", "/api/metrics"],
         "cors_origins": ["http://localhost:3000"]
     }
 
+@app.get("/api/cache")
+async def cache_stats():
+    """Cache hit/miss counters and usage."""
+    return {
+        "text_cache": text_cache.stats() if text_cache else None,
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "history": history_store.stats() if history_store else None,
+        "coalescing": {
+            "extraction": extraction_flights.stats(),
+            "llm": llm_flights.stats(),
+            "llm_async": async_llm_flights.stats()
+        },
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+# Cache, coalescing and queue figures are copied into the registry whenever metrics are scraped
+cache_hits = registry.counter("deepdfscan_cache_hits_total", "Cache hits", ("cache",))
+cache_misses = registry.counter("deepdfscan_cache_misses_total", "Cache misses", ("cache",))
+cache_hit_ratio = registry.gauge("deepdfscan_cache_hit_ratio", "Cache hits per lookup", ("cache",))
+cache_entries = registry.gauge("deepdfscan_cache_entries", "Entries in the cache", ("cache",))
+coalesced_calls = registry.counter("deepdfscan_coalesced_total", "Calls answered by an identical call in flight",
+                                   ("flight",))
+queue_backlog = registry.gauge("deepdfscan_job_queue_backlog", "Analysis jobs waiting to run")
+queue_running = registry.gauge("deepdfscan_job_queue_running", "Analysis jobs running")
+queue_rejected = registry.counter("deepdfscan_job_queue_rejected_total", "Analysis jobs rejected with 429")
+streams_in_flight = registry.gauge("deepdfscan_summary_streams_in_flight", "Summary streams being generated")
+
+def collect_runtime_metrics() -> None:
+    for name, cache in (("text", text_cache), ("llm", llm_cache)):
+        if cache is not None:
+            stats = cache.stats()
+            cache_hits.set_total(stats["hits"], cache=name)
+            cache_misses.set_total(stats["misses"], cache=name)
+            cache_hit_ratio.set(stats["hit_ratio"], cache=name)
+            cache_entries.set(stats["entries"], cache=name)
+    for name, flights in (("extraction", extraction_flights), ("llm", llm_flights), ("llm_async", async_llm_flights)):
+        coalesced_calls.set_total(flights.stats()["coalesced"], flight=name)
+    stats = job_queue.stats()
+    queue_backlog.set(stats["backlog"])
+    queue_running.set(stats["running"])
+    queue_rejected.set_total(stats["rejected"])
+    streams_in_flight.set(len(active_streams))
+
+registry.on_collect(collect_runtime_metrics)
+
+@app.get("/api/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms, cache hit ratios, queue depth,
+    in-flight requests and Ollama errors."""
+    return Response(await asyncio.to_thread(registry.render), media_type=CONTENT_TYPE)
+
+class PageTiming(BaseModel):
+    page: int
+    seconds: float
+
 class SummaryResponse(BaseModel):
     summary: str
     status: str
     progress: Optional[float] = None
+    pages: Optional[int] = None
+    extraction_seconds: Optional[float] = None
+    page_timings: Optional[List[PageTiming]] = None
+    chunks: Optional[int] = None
+    stage_timings: Optional[Dict[str, float]] = None
+    prompt_tokens: Optional[int] = None
+    cached: Optional[bool] = None  # True when a stored summary of the same content was reused
+
+def build_summary_response(result: SummaryResult, page_timings: List[PageTiming]) -> SummaryResponse:
+    """Assemble a SummaryResponse from a summarization result and its page timings."""
+    return SummaryResponse(
+        summary=result.summary,
+        status="success",
+        progress=100.0,
+        pages=len(page_timings),
+        extraction_seconds=sum(timing.seconds for timing in page_timings),
+        page_timings=page_timings,
+        chunks=result.chunks,
+        stage_timings=result.timings,
+        prompt_tokens=result.prompt_tokens
+    )
+
+async def extract_with_progress(upload: StoredUpload, start_page: int, end_page: Optional[int]):
+    """Yield ``(page, progress)`` as each page is extracted on a worker thread; progress runs 0-30%."""
+    total = await asyncio.to_thread(count_pages, upload.path)
+    expected = max(min(end_page or total, total) - max(start_page, 1) + 1, 1)
+    pages_iter = stream_pages_from_pdf(upload.path, start_page, end_page, digest=upload.sha256)
+    # Held while a page is extracted on a worker thread; the generator can only be closed in between
+    step_lock = threading.Lock()
+    
+    def step():
+        with step_lock:
+            return next(pages_iter, None)
+    
+    def close():
+        with step_lock:
+            pages_iter.close()
+    
+    extracted = 0
+    try:
+        while (page := await asyncio.to_thread(step)) is not None:
+            extracted += 1
+            yield page, round(30.0 * extracted / expected, 1)
+    finally:
+        if step_lock.acquire(blocking=False):
+            try:
+                pages_iter.close()
+            finally:
+                step_lock.release()
+        else:
+            # Cancelled mid-page (e.g. the client disconnected): close once the worker thread returns
+            threading.Thread(target=close, name="close-page-stream", daemon=True).start()
+
+def request_user(request: Request) -> str:
+    """The caller's user id, from the X-User-Id header (empty for anonymous callers)."""
+    return request.headers.get("x-user-id", "")
+
+async def remember_upload(upload: StoredUpload, user_id: str) -> Optional[dict]:
+    """Record an upload in the history; returns its document record (None when history is off)."""
+    if history_store is None:
+        return None
+    page_count = await asyncio.to_thread(count_pages, upload.path)
+    return await asyncio.to_thread(history_store.add_document, upload.sha256, upload.filename, upload.size,
+                                   page_count, user_id)
+
+async def stored_summary(upload: StoredUpload, start_page: int, end_page: Optional[int],
+                         use_cache: bool) -> Optional[SummaryResponse]:
+    """A summary of the same content and page range from the history, if one was stored."""
+    if history_store is None or not use_cache:
+        return None
+    data = await asyncio.to_thread(history_store.get_artifact, upload.sha256, "summary",
+                                   summary_version(start_page, end_page))
+    return SummaryResponse(**dict(data, cached=True)) if data is not None else None
+
+async def record_summary(document: Optional[dict], response: SummaryResponse, pages: List[Tuple[int, str]],
+                         start_page: int, end_page: Optional[int], analysis_id: Optional[str] = None) -> None:
+    """Store a summary's page text, the summary itself (for reuse) and the analysis in the history."""
+    if history_store is None or document is None:
+        return
+    
+    def record():
+        if pages:
+            history_store.put_pages(document["sha256"], pages)
+        if not response.cached:
+            history_store.put_artifact(document["sha256"], "summary", summary_version(start_page, end_page),
+                                       response.model_dump(exclude={"cached"}))
+        history_store.record_analysis("summarize", "completed", response.model_dump(), analysis_id=analysis_id,
+                                      user_id=document["user_id"], file_id=document["file_id"],
+                                      sha256=document["sha256"], filename=document["filename"],
+                                      summary=response.summary)
+    await asyncio.to_thread(record)
+
+def summary_progress(event: str, data: dict) -> Optional[float]:
+    """Map a summarization event onto the 30-100% progress range."""
+    if event == "progress" and data["stage"] == "map":
+        return round(30.0 + 60.0 * data["completed"] / data["total"], 1)
+    if event == "progress" and data["stage"] == "generating":
+        return 90.0
+    return None
 
 @app.post("/api/summarize", response_model=SummaryResponse)
-async def summarize_pdf(file: UploadFile = File(...)):
+async def summarize_pdf(request: Request, file: UploadFile = File(...), start_page: int = 1,
+                        end_page: Optional[int] = None, use_cache: bool = True):
     try:
-        # Save the uploaded file temporarily
-        temp_path = f"temp_{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        job_queue.check_capacity()
+        # Stream the upload to a unique temporary file (hashed on the fly, removed afterwards)
+        async with stored_upload(file, settings.UPLOAD_DIR, settings.MAX_FILE_SIZE,
+                                 settings.ALLOWED_FILE_TYPES) as upload:
+            document = await remember_upload(upload, request_user(request))
+            response = await stored_summary(upload, start_page, end_page, use_cache)
+            if response is not None:
+                await record_summary(document, response, [], start_page, end_page)
+                return response
+            
+            # Stream pages from the PDF into the summary prompt (30% progress)
+            page_timings, page_texts = [], []
+            def pages():
+                for page in stream_pages_from_pdf(upload.path, start_page, end_page, digest=upload.sha256):
+                    page_timings.append(PageTiming(page=page.page_no, seconds=page.seconds))
+                    page_texts.append((page.page_no, page.text))
+                    yield page
+            
+            # Generate summary (70% progress); extraction runs on a worker thread, the LLM calls are non-blocking
+            result = await summarize_document_async(pages(), use_cache=use_cache)
+            response = build_summary_response(result, page_timings)
+            await record_summary(document, response, page_texts, start_page, end_page)
         
-        # Extract text from PDF (30% progress)
-        text = extract_text_from_pdf(temp_path)
-        
-        # Generate summary (70% progress)
-        summary = summarize_text(text)
-        
-        # Clean up temporary file
-        os.remove(temp_path)
-        
-        return SummaryResponse(
-            summary=summary,
-            status="success",
-            progress=100.0
-        )
+        return response
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Cancellation flags for in-flight summary streams, keyed by stream id
+active_streams: Dict[str, asyncio.Event] = {}
+
+def format_sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def relay_events(events, queue: asyncio.Queue) -> None:
+    """Drive an async event stream into ``queue``, ending with a ``None`` sentinel.
+    
+    Runs as its own task so cancelling it unwinds the stream (and closes the
+    Ollama connection) cleanly.
+    """
+    try:
+        async for item in events:
+            await queue.put(item)
+    except Exception as e:
+        await queue.put(("error", {"detail": str(e)}))
+    finally:
+        queue.put_nowait(None)
+
+async def get_unless_cancelled(queue: asyncio.Queue, cancelled: asyncio.Event):
+    """Return the next queued item, or None as soon as ``cancelled`` is set."""
+    get_item = asyncio.ensure_future(queue.get())
+    cancel_wait = asyncio.ensure_future(cancelled.wait())
+    try:
+        await asyncio.wait({get_item, cancel_wait}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        cancel_wait.cancel()
+        if not get_item.done():
+            get_item.cancel()
+    return get_item.result() if get_item.done() and not get_item.cancelled() else None
+
+@app.post("/api/summarize/stream")
+async def summarize_pdf_stream(request: Request, file: UploadFile = File(...), start_page: int = 1,
+                               end_page: Optional[int] = None, use_cache: bool = True):
+    """Summarize a PDF as Server-Sent Events.
+    
+    Emits ``started`` (with the stream id), ``progress`` as each page is
+    extracted and each chunk is summarized, ``token`` as the final summary is
+    generated, then ``done`` with the full SummaryResponse (or ``error`` /
+    ``cancelled``). Disconnecting, or DELETE /api/summarize/stream/{stream_id}, stops the
+    generation early; closing the Ollama stream frees the model.
+    """
+    try:
+        job_queue.check_capacity()
+        check_file_type(file.filename, settings.ALLOWED_FILE_TYPES)
+        upload = await save_upload(file, settings.UPLOAD_DIR, settings.MAX_FILE_SIZE)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    user_id = request_user(request)
+    stream_id = str(uuid.uuid4())
+    cancelled = asyncio.Event()
+    active_streams[stream_id] = cancelled
+    
+    async def events():
+        try:
+            yield format_sse("started", {"stream_id": stream_id, "filename": upload.filename})
+            document = await remember_upload(upload, user_id)
+            stored = await stored_summary(upload, start_page, end_page, use_cache)
+            if stored is not None:
+                await record_summary(document, stored, [], start_page, end_page)
+                yield format_sse("done", stored.model_dump())
+                return
+            
+            # Extraction (0-30% progress), one event per page as it finishes
+            pages, page_timings = [], []
+            async for page, progress in extract_with_progress(upload, start_page, end_page):
+                pages.append((page.page_no, page.text))
+                page_timings.append(PageTiming(page=page.page_no, seconds=page.seconds))
+                yield format_sse("progress", {"stage": "extracting", "page": page.page_no, "seconds": page.seconds,
+                                              "progress": progress})
+                if cancelled.is_set():
+                    yield format_sse("cancelled", {"stream_id": stream_id})
+                    return
+            
+            # Summarization (30-100% progress), relaying the final summary's tokens. The stream runs in
+            # its own task so a cancel or a client disconnect can stop it at any point.
+            queue = asyncio.Queue()
+            producer = asyncio.create_task(relay_events(stream_summary_async(pages, use_cache=use_cache), queue))
+            try:
+                while True:
+                    item = await get_unless_cancelled(queue, cancelled)
+                    if cancelled.is_set():
+                        yield format_sse("cancelled", {"stream_id": stream_id})
+                        return
+                    if item is None:
+                        break
+                    event, data = item
+                    progress = summary_progress(event, data)
+                    if progress is not None:
+                        data["progress"] = progress
+                    if event == "done":
+                        response = build_summary_response(data["result"], page_timings)
+                        await record_summary(document, response, pages, start_page, end_page)
+                        yield format_sse("done", response.model_dump())
+                    else:
+                        yield format_sse(event, data)
+            finally:
+                producer.cancel()
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+        finally:
+            active_streams.pop(stream_id, None)
+            if os.path.exists(upload.path):
+                os.remove(upload.path)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.delete("/api/summarize/stream/{stream_id}")
+async def cancel_summary_stream(stream_id: str):
+    """Cancel an in-flight summary stream, freeing the model."""
+    cancelled = active_streams.get(stream_id)
+    if cancelled is None:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    cancelled.set()
+    return {"stream_id": stream_id, "status": "cancelled"}
+
+async def run_summary_job(job: AnalysisJob, upload: StoredUpload, user_id: str, start_page: int,
+                          end_page: Optional[int], use_cache: bool) -> dict:
+    """Summarize a stored upload, reporting progress on the job and recording the result in the history."""
+    document = await remember_upload(upload, user_id)
+    try:
+        response = await stored_summary(upload, start_page, end_page, use_cache)
+        pages = []
+        if response is None:
+            response = await summarize_job_upload(job, upload, pages, start_page, end_page, use_cache)
+    except Exception as e:
+        if document is not None:
+            await asyncio.to_thread(history_store.record_analysis, "summarize", "error", analysis_id=job.analysis_id,
+                                    user_id=user_id, file_id=document["file_id"], sha256=upload.sha256,
+                                    filename=upload.filename, error=str(e))
+        raise
+    await record_summary(document, response, pages, start_page, end_page, analysis_id=job.analysis_id)
+    return response.model_dump()
+
+async def summarize_job_upload(job: AnalysisJob, upload: StoredUpload, pages: List[Tuple[int, str]],
+                               start_page: int, end_page: Optional[int], use_cache: bool) -> SummaryResponse:
+    """Extract and summarize an upload, appending extracted pages to ``pages``."""
+    job.update(stage="extracting")
+    page_timings = []
+    async for page, progress in extract_with_progress(upload, start_page, end_page):
+        pages.append((page.page_no, page.text))
+        page_timings.append(PageTiming(page=page.page_no, seconds=page.seconds))
+        job.update(progress=progress)
+    
+    job.update(stage="analyzing")
+    async for event, data in stream_summary_async(pages, use_cache=use_cache):
+        job.update(progress=summary_progress(event, data))
+        if event == "done":
+            job.update(stage="finalizing")
+            return build_summary_response(data["result"], page_timings)
+    raise Exception("Summarization ended without a result")
+
+@app.post("/api/analyze/summarize", status_code=202)
+async def submit_summary(request: Request, file: UploadFile = File(...), priority: int = 0, start_page: int = 1,
+                         end_page: Optional[int] = None, use_cache: bool = True):
+    """Queue a PDF summary; poll GET /api/analysis/{analysis_id} for the result.
+    
+    Lower ``priority`` values run first. Returns 429 when the backlog is full.
+    """
+    try:
+        job_queue.check_capacity()
+        check_file_type(file.filename, settings.ALLOWED_FILE_TYPES)
+        upload = await save_upload(file, settings.UPLOAD_DIR, settings.MAX_FILE_SIZE)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    user_id = request_user(request)
+    
+    def remove_upload():
+        if os.path.exists(upload.path):
+            os.remove(upload.path)
+    
+    try:
+        job = job_queue.submit(
+            "summarize",
+            lambda job: run_summary_job(job, upload, user_id, start_page, end_page, use_cache),
+            model=ollama_client.model_for("summary"),
+            priority=priority,
+            on_finish=remove_upload,
+            user_id=user_id
+        )
+    except QueueFull as e:
+        remove_upload()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    return {
+        "success": True,
+        "data": {
+            "analysis_id": job.analysis_id,
+            "status": job.status,
+            "filename": upload.filename
+        }
+    }
+
+def require_history():
+    """The history store, or a 503 when HISTORY_ENABLED is off."""
+    if history_store is None:
+        raise HTTPException(status_code=503, detail="Analysis history is disabled")
+    return history_store
+
+def pagination(total: int, limit: int, offset: int) -> dict:
+    return {"total": total, "limit": limit, "offset": offset}
+
+# Declared before /api/analysis/{analysis_id} so "history" is not taken for an id
+@app.get("/api/analysis/history")
+async def analysis_history(request: Request, type: Optional[str] = None, file_id: Optional[str] = None,
+                           limit: int = Query(20, ge=1, le=200), offset: int = Query(0, ge=0)):
+    """The caller's past analyses, newest first, with a brief summary of each."""
+    store = require_history()
+    items, total = await asyncio.to_thread(store.list_analyses, request_user(request), type, file_id, limit, offset)
+    return {"success": True, "data": items, "pagination": pagination(total, limit, offset)}
+
+@app.get("/api/analysis/{analysis_id}")
+async def get_analysis(request: Request, analysis_id: str):
+    """Status, progress and (once completed) results of an analysis.
+    
+    Queued and recent jobs are answered from the job queue, older ones from
+    the history; either only to the user who ran them.
+    """
+    user_id = request_user(request)
+    job = job_queue.get(analysis_id, user_id)
+    if job is not None:
+        return {"success": True, "data": job.to_dict()}
+    analysis = (await asyncio.to_thread(history_store.get_analysis, analysis_id, user_id)
+                if history_store else None)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return {"success": True, "data": analysis}
+
+@app.get("/api/pdfs")
+async def list_pdfs(request: Request, limit: int = Query(20, ge=1, le=200), offset: int = Query(0, ge=0)):
+    """The caller's uploaded documents, most recent first."""
+    store = require_history()
+    items, total = await asyncio.to_thread(store.list_documents, request_user(request), limit, offset)
+    return {"success": True, "data": items, "pagination": pagination(total, limit, offset)}
+
+@app.get("/api/pdfs/{file_id}")
+async def get_pdf(request: Request, file_id: str):
+    """A document with its stored extracted text."""
+    store = require_history()
+    document = await asyncio.to_thread(store.get_document, file_id, request_user(request))
+    if document is None:
+        raise HTTPException(status_code=404, detail="PDF not found")
+    pages = await asyncio.to_thread(store.get_pages, document["sha256"])
+    return {
+        "success": True,
+        "data": {
+            "file_id": document["file_id"],
+            "filename": document["filename"],
+            "content": "\n\n".join(text for _, text in pages),
+            "metadata": {
+                "pages": document["pages"],
+                "size": document["size"],
+                "extracted_pages": [page_no for page_no, _ in pages],
+                "extracted_at": document["extracted_at"]
+            }
+        }
+    }
+
+@app.delete("/api/pdfs/{file_id}")
+async def delete_pdf(request: Request, file_id: str):
+    """Delete a document; its text and stored summaries go once no one else has the same file."""
+    store = require_history()
+    if not await asyncio.to_thread(store.delete_document, file_id, request_user(request)):
+        raise HTTPException(status_code=404, detail="PDF not found")
+    return {"success": True, "message": "PDF deleted successfully"}
+
+@app.get("/api/search")
+async def search_pdfs(request: Request, q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=200),
+                      offset: int = Query(0, ge=0)):
+    """Full-text search over the extracted text of the caller's documents, best match first."""
+    store = require_history()
+    results = await asyncio.to_thread(store.search, q, request_user(request), limit, offset)
+    return {"success": True, "data": results}
+
+@app.get("/api/queue")
+async def queue_stats():
+    """Background job queue depth and counters, and load on each Ollama endpoint."""
+    return {
+        "queue": job_queue.stats(),
+        "ollama_endpoints": ollama_pool.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The synthetic PDF writer lives with the benchmarks
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "benchmarks"))
+from synthetic_pdf import write_pdf  # noqa: E402
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Write a synthetic text PDF with the given page count and return its path."""
+    def make(pages: int, name: str = "document.pdf") -> str:
+        return write_pdf(str(tmp_path / name), pages)
+    return make
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from app.services.analysis_service import COMPLETED, ERROR, JobQueue, ModelLimiter, QueueFull
+
+
+def test_limiter_caps_calls_per_model():
+    limiter = ModelLimiter({"big": 1}, default_concurrency=2)
+    peak = {"big": 0, "small": 0}
+    active = {"big": 0, "small": 0}
+
+    async def call(model):
+        async with limiter.slot(model):
+            active[model] += 1
+            peak[model] = max(peak[model], active[model])
+            await asyncio.sleep(0.01)
+            active[model] -= 1
+
+    async def main():
+        await asyncio.gather(*[call("big") for _ in range(4)], *[call("small") for _ in range(6)])
+
+    asyncio.run(main())
+    assert peak == {"big": 1, "small": 2}
+    assert limiter.waiting == 0
+
+
+def test_limiter_counts_waiting_calls():
+    limiter = ModelLimiter(default_concurrency=1)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def call():
+            async with limiter.slot("gemma3"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(call()) for _ in range(3)]
+        await asyncio.sleep(0)
+        waiting, stats = limiter.waiting, limiter.stats()
+        release.set()
+        await asyncio.gather(*tasks)
+        return waiting, stats
+
+    waiting, stats = asyncio.run(main())
+    assert waiting == 2
+    assert stats["gemma3"] == {"limit": 1, "active": 1, "waiting": 2}
+
+
+def test_sync_slots_use_the_same_limits():
+    limiter = ModelLimiter({"gemma3": 1})
+    with limiter.slot_sync("gemma3"):
+        assert limiter.stats()["gemma3"]["active"] == 1
+    assert limiter.stats()["gemma3"]["active"] == 0
+
+
+def test_jobs_run_by_priority_and_record_results():
+    async def main():
+        queue = JobQueue(workers=1)
+        queue.start()
+        order = []
+
+        async def run(job):
+            order.append(job.priority)
+            if job.priority == 3:
+                raise ValueError("boom")
+            return {"priority": job.priority}
+
+        # Submitted before the worker gets to run, so they all start queued
+        jobs = [queue.submit("test", run, model="gemma3", priority=priority) for priority in (5, 3, 1)]
+        await queue._queue.join()
+        await queue.stop()
+        return order, jobs, queue.stats()
+
+    order, jobs, stats = asyncio.run(main())
+    assert order == [1, 3, 5]
+    assert [job.status for job in jobs] == [COMPLETED, ERROR, COMPLETED]
+    assert jobs[1].error == "boom" and jobs[2].result == {"priority": 1}
+    assert (stats["completed"], stats["failed"]) == (2, 1)
+
+
+def test_full_backlog_is_rejected_with_retry_after():
+    async def main():
+        queue = JobQueue(workers=1, max_backlog=2)
+        queue.start()
+        release = asyncio.Event()
+
+        async def run(job):
+            await release.wait()
+            return {}
+
+        queue.submit("test", run, model="gemma3")
+        await asyncio.sleep(0)  # the worker takes the first job
+        queue.submit("test", run, model="gemma3")
+        queue.submit("test", run, model="gemma3")
+        with pytest.raises(QueueFull) as rejected:
+            queue.submit("test", run, model="gemma3")
+        release.set()
+        await queue._queue.join()
+        await queue.stop()
+        return rejected.value, queue.stats()
+
+    error, stats = asyncio.run(main())
+    assert error.backlog == 2 and error.retry_after >= 1
+    assert stats["rejected"] == 1 and stats["completed"] == 3
+
+
+def test_calls_waiting_for_a_model_count_towards_the_backlog():
+    async def main():
+        limiter = ModelLimiter(default_concurrency=1)
+        queue = JobQueue(workers=1, max_backlog=2, limiter=limiter)
+        release = asyncio.Event()
+
+        async def call():
+            async with limiter.slot("gemma3"):
+                await release.wait()
+
+        calls = [asyncio.create_task(call()) for _ in range(3)]
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull):
+            queue.check_capacity()
+        release.set()
+        await asyncio.gather(*calls)
+        queue.check_capacity()
+
+    asyncio.run(main())
+
+
+def test_jobs_are_only_returned_to_the_user_who_submitted_them():
+    async def main():
+        queue = JobQueue(workers=1)
+        queue.start()
+
+        async def run(job):
+            return {}
+
+        job = queue.submit("test", run, model="gemma3", user_id="alice")
+        anonymous = queue.submit("test", run, model="gemma3", user_id="")
+        await queue._queue.join()
+        await queue.stop()
+        return queue, job, anonymous
+
+    queue, job, anonymous = asyncio.run(main())
+    assert queue.get(job.analysis_id, "alice") is job
+    assert queue.get(job.analysis_id, "bob") is None
+    assert queue.get(job.analysis_id, "") is None
+    assert queue.get(anonymous.analysis_id, "") is anonymous
+    assert queue.get(job.analysis_id) is job
@@ -0,0 +1,132 @@
+import csv
+import json
+
+import pytest
+
+from app.services.batch_ranking import (DocumentProfile, ProfileBuilder, rank_documents, rank_pairs,
+                                        write_result)
+from app.services.history_store import HistoryStore
+from app.services.keyword_extractor import KeywordIndex
+from app.services.text_cache import TextCache
+
+
+def read(path):
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+class Extractor:
+    """Keywords are the comma-separated words of the document."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text, kind):
+        self.calls.append((text, kind))
+        return [word.strip() for word in text.split(",") if word.strip()]
+
+
+@pytest.fixture
+def documents(tmp_path):
+    def write(name, text):
+        path = tmp_path / name
+        path.write_text(text, encoding="utf-8")
+        return str(path)
+    return write
+
+
+def profile(path, keywords, kind="cv"):
+    return DocumentProfile(path, kind, path, ",".join(keywords), keywords)
+
+
+def test_identical_documents_are_profiled_once(documents):
+    extract = Extractor()
+    index = KeywordIndex()
+    first = documents("alice.txt", "python, docker")
+    copy = documents("alice-copy.txt", "python, docker")
+    job = documents("job.txt", "python, docker")
+    profiles = ProfileBuilder(read, extract, "v1", index=index).build_all([(first, "cv"), (copy, "cv"), (job, "job")])
+    assert [p.path for p in profiles] == [first, copy, job]
+    assert [p.cached for p in profiles] == [False, True, False]
+    assert profiles[1].keywords == ["python", "docker"]
+    assert [kind for _, kind in extract.calls] == ["cv", "job"]  # same content, different kind: profiled twice
+    assert index.lookup("docker") == {first, copy, job}
+
+
+def test_profiles_come_from_the_store_then_the_cache(documents, tmp_path):
+    path = documents("alice.txt", "python, docker")
+    cache = TextCache(str(tmp_path / "cache.sqlite3"))
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+
+    extract = Extractor()
+    ProfileBuilder(read, extract, "v1", cache=cache).build(path, "cv")
+    assert len(extract.calls) == 1
+
+    # A cache hit is copied into the store, and later runs are answered from the store
+    built = ProfileBuilder(read, extract, "v1", cache=cache, store=store).build(path, "cv")
+    assert built.cached and len(extract.calls) == 1
+    cache.clear()
+    built = ProfileBuilder(read, extract, "v1", cache=cache, store=store).build(path, "cv")
+    assert built.cached and built.keywords == ["python", "docker"] and len(extract.calls) == 1
+
+    # Another extractor version is a miss everywhere
+    built = ProfileBuilder(read, extract, "v2", cache=cache, store=store).build(path, "cv")
+    assert not built.cached and len(extract.calls) == 2
+
+
+def test_empty_profiles_are_not_cached(documents, tmp_path):
+    path = documents("blank.txt", "")
+    cache = TextCache(str(tmp_path / "cache.sqlite3"))
+    extract = Extractor()
+    builder = ProfileBuilder(read, extract, "v1", cache=cache)
+    assert builder.build(path, "cv").keywords == []
+    assert extract.calls == [] and cache.stats()["entries"] == 0
+
+
+def test_pairs_rank_by_semantic_then_exact_score_then_path():
+    jobs = [profile("job-b", ["python", "docker", "aws"], "job"), profile("job-a", ["python", "docker", "aws"], "job")]
+    cvs = [profile("cv-weak", ["python"]), profile("cv-strong", ["python", "docker", "aws"]),
+           profile("cv-blank", [])]
+    cvs[2].text = ""
+    pairs = rank_pairs(cvs, jobs)
+    assert [(pair.rank, pair.cv.path, pair.job.path) for pair in pairs] == [
+        (1, "cv-strong", "job-a"), (2, "cv-strong", "job-b"), (3, "cv-weak", "job-a"), (4, "cv-weak", "job-b")]
+    assert pairs[0].score == pytest.approx(100.0) and pairs[0].missing == []
+    assert pairs[2].matching == ["python"] and pairs[2].missing == ["aws", "docker"]
+    assert all(earlier.semantic_score >= later.semantic_score for earlier, later in zip(pairs, pairs[1:]))
+
+
+def test_only_the_top_k_pairs_are_analysed(documents):
+    cvs = [documents(f"cv{index}.txt", ", ".join(["python", "docker", "aws", "sql"][:index + 1])) for index in range(4)]
+    jobs = [documents("job.txt", "python, docker, aws, sql")]
+    analysed = []
+
+    def analyze(pair):
+        analysed.append(pair.cv.name)
+        return {"match_analysis": f"{pair.cv.name} ok", "priority_additions": pair.missing[:1]}
+
+    result = rank_documents(cvs, jobs, ProfileBuilder(read, Extractor(), "v1"), analyze=analyze, top_k=2)
+    assert sorted(analysed) == ["cv2.txt", "cv3.txt"]
+    assert [pair.analysis is not None for pair in result.pairs] == [True, True, False, False]
+    assert set(result.timings) == {"profiling", "scoring", "analysis", "total"}
+    assert rank_documents(cvs, jobs, ProfileBuilder(read, Extractor(), "v1"), analyze=analyze, top_k=0) \
+        .timings.keys() == {"profiling", "scoring", "total"}
+
+
+def test_writers(documents, tmp_path):
+    cvs = [documents("cv.txt", "python, docker")]
+    jobs = [documents("job.txt", "python, docker, aws")]
+    result = rank_documents(cvs, jobs, ProfileBuilder(read, Extractor(), "v1"),
+                            analyze=lambda pair: {"match_analysis": "good", "priority_additions": ["aws"]})
+
+    write_result(result, str(tmp_path / "ranking.csv"))
+    with open(tmp_path / "ranking.csv", newline="", encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    assert rows == [{"rank": "1", "cv": cvs[0], "job": jobs[0], "semantic_score": rows[0]["semantic_score"],
+                     "score": "66.7", "matching": "2", "job_keywords": "3", "missing_keywords": "aws",
+                     "match_analysis": "good", "priority_additions": "aws"}]
+
+    write_result(result, str(tmp_path / "ranking.json"))
+    data = json.loads((tmp_path / "ranking.json").read_text())
+    assert data["cvs"] == cvs and data["jobs"] == jobs
+    assert data["ranking"][0]["missing"] == ["aws"] and data["ranking"][0]["analysis"]["match_analysis"] == "good"
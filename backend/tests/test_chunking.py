@@ -0,0 +1,49 @@
+from app.services.chunking import chunk_pages, estimate_tokens, iter_paragraphs
+
+
+def _pages(count, paragraphs=6, words=40):
+    return [(page_no, "\n\n".join(" ".join(f"p{page_no}w{index}" for index in range(words))
+                                  for _ in range(paragraphs)))
+            for page_no in range(1, count + 1)]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a") == 2  # one word, 1.3 tokens rounded up
+    assert estimate_tokens("word " * 100) == 130  # words dominate short tokens
+    assert estimate_tokens("x" * 400) == 100  # characters dominate long tokens
+
+
+def test_chunks_respect_the_budget():
+    chunks = list(chunk_pages(_pages(5), max_tokens=300, overlap_tokens=0))
+    assert len(chunks) > 1
+    assert all(chunk.tokens <= 300 for chunk in chunks)
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+
+
+def test_chunks_cover_pages_in_order_without_overlap():
+    pages = _pages(4)
+    chunks = list(chunk_pages(pages, max_tokens=250, overlap_tokens=0))
+    paragraphs = [paragraph for chunk in chunks for paragraph in chunk.text.split("\n\n")]
+    assert paragraphs == [paragraph for _, paragraph in iter_paragraphs(pages, 250)]
+    assert chunks[0].first_page == 1 and chunks[-1].last_page == 4
+    assert all(a.last_page <= b.first_page for a, b in zip(chunks, chunks[1:]))
+
+
+def test_overlap_repeats_trailing_paragraphs():
+    chunks = list(chunk_pages(_pages(3), max_tokens=300, overlap_tokens=100))
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.text.split("\n\n")[0] == previous.text.split("\n\n")[-1]
+        assert chunk.tokens <= 300
+
+
+def test_oversized_paragraphs_are_split():
+    text = " ".join(f"word{index}." for index in range(1000))
+    chunks = list(chunk_pages(text, max_tokens=100, overlap_tokens=0))
+    assert all(chunk.tokens <= 100 for chunk in chunks)
+    assert " ".join(chunk.text for chunk in chunks).split() == text.split()
+
+
+def test_empty_input_yields_no_chunks():
+    assert list(chunk_pages("")) == []
+    assert list(chunk_pages([(1, "\n\n  \n")])) == []
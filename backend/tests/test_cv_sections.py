@@ -0,0 +1,113 @@
+import pytest
+
+from app.services.cv_sections import build_section_profile, diff_sections, fingerprint_sections, match_delta
+
+CV = """Jane Doe
+jane@example.com
+
+Skills
+Python, Kubernetes, Terraform
+
+Experience
+Built data pipelines in Python at Acme.
+
+Education
+BSc Computer Science
+
+Hobbies
+Chess and hiking
+"""
+
+KEYWORDS = {
+    "(top)": [],
+    "skills": ["python", "kubernetes", "terraform"],
+    "experience": ["python", "data pipelines"],
+    "education": ["computer science"],
+}
+
+
+class Store(dict):
+    def lookup(self, digest):
+        return self.get(digest)
+
+    def store(self, digest, keywords):
+        self[digest] = keywords
+
+
+def extract(section):
+    return list(KEYWORDS[section.key])
+
+
+def test_sections_are_fingerprinted_ignoring_reflow():
+    keys = [section.key for section in fingerprint_sections(CV)]
+    assert keys == ["(top)", "skills", "experience", "education", "hobbies"]
+    reflowed = CV.replace("Built data pipelines in", "Built data\npipelines   in")
+    assert [s.digest for s in fingerprint_sections(reflowed)] == [s.digest for s in fingerprint_sections(CV)]
+
+
+def test_low_value_sections_are_not_profiled():
+    profile = build_section_profile(CV, extract)
+    assert profile.extracted == ["(top)", "skills", "experience", "education"]
+    assert profile.merged_keywords == ["python", "kubernetes", "terraform", "data pipelines", "computer science"]
+
+
+def test_unchanged_sections_are_reused_and_empty_results_cached():
+    store = Store()
+    build_section_profile(CV, extract, store.lookup, store.store)
+    assert [] in store.values()
+
+    edited = CV.replace("at Acme.", "at Acme, using Airflow.")
+    calls = []
+    profile = build_section_profile(edited, lambda section: calls.append(section.key) or extract(section),
+                                    store.lookup, store.store)
+    assert calls == ["experience"]
+    assert profile.reused == ["(top)", "skills", "education"]
+
+
+def test_failed_extraction_is_not_stored():
+    store = Store()
+    profile = build_section_profile(CV, lambda section: None if section.key == "skills" else extract(section),
+                                    store.lookup, store.store)
+    assert profile.keywords["skills"] == []
+    assert len(store) == 3
+
+
+def test_first_run_extracts_the_whole_cv_once():
+    store, whole_calls = Store(), []
+
+    def extract_all(text):
+        whole_calls.append(text)
+        return ["python", "terraform", "computer science", "leadership"]
+
+    profile = build_section_profile(CV, pytest.fail, store.lookup, store.store, extract_all=extract_all)
+    assert whole_calls == [CV] and profile.whole
+    assert profile.keywords["skills"] == ["python", "terraform", "leadership"]
+    assert profile.keywords["education"] == ["computer science"]
+    assert set(profile.merged_keywords) == {"python", "terraform", "computer science", "leadership"}
+
+    calls = []
+    edited = CV.replace("at Acme.", "at Acme, using Airflow.")
+    profile = build_section_profile(edited, lambda section: calls.append(section.key) or extract(section),
+                                    store.lookup, store.store, extract_all=extract_all)
+    assert calls == ["experience"] and not profile.whole and len(whole_calls) == 1
+
+
+def test_a_cv_over_the_prompt_budget_is_extracted_by_section():
+    store, calls = Store(), []
+    profile = build_section_profile(CV, lambda section: calls.append(section.key) or extract(section),
+                                    store.lookup, store.store, extract_all=pytest.fail, max_tokens=20)
+    assert not profile.whole and calls == ["(top)", "skills", "experience", "education"]
+    assert profile.keywords["education"] == ["computer science"]
+    assert build_section_profile(CV, pytest.fail, extract_all=lambda text: ["python"], max_tokens=1000).whole
+
+
+def test_diff_and_match_delta():
+    before = build_section_profile(CV, extract)
+    edited = CV.replace("BSc Computer Science", "MSc Data Science").replace("Hobbies\nChess and hiking\n", "")
+    changes = diff_sections(before.fingerprints(), fingerprint_sections(edited))
+    assert (changes.changed, changes.removed, changes.added) == (["education"], ["hobbies"], [])
+
+    delta = match_delta(["python"], ["python", "terraform"], ["python", "terraform", "aws", "docker"])
+    assert (delta.previous_score, delta.score, delta.change) == (25.0, 50.0, 25.0)
+    assert delta.newly_matched == ["terraform"]
+    assert match_delta(None, ["python"], ["python"]).change is None
@@ -0,0 +1,55 @@
+import pytest
+
+from app.services.history_store import HistoryStore, fts_query
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.add_document("sha-a", "alice.pdf", 100, 2, user_id="alice")
+    store.put_pages("sha-a", [(1, "Python developer with Kubernetes"), (2, "Terraform and AWS experience")])
+    store.add_document("sha-b", "bob.pdf", 100, 1, user_id="bob")
+    store.put_pages("sha-b", [(1, "Python data analyst, pandas and SQL")])
+    return store
+
+
+def test_fts_query_quotes_terms():
+    assert fts_query('c++ "node" data*') == '"c++" """node""" "data"*'
+    assert fts_query("   ") == ""
+
+
+def test_search_ranks_pages_and_highlights(store):
+    hits = store.search("python")
+    assert {(hit["filename"], hit["page"]) for hit in hits} == {("alice.pdf", 1), ("bob.pdf", 1)}
+    assert all("[python]" in hit["snippet"].lower() for hit in hits)
+    assert [hit["page"] for hit in store.search("terraform aws")] == [2]
+    assert store.search("kube*")[0]["filename"] == "alice.pdf"
+
+
+def test_search_is_scoped_to_the_user(store):
+    assert [hit["filename"] for hit in store.search("python", user_id="bob")] == ["bob.pdf"]
+    assert store.search("terraform", user_id="bob") == []
+
+
+def test_replacing_pages_updates_the_index(store):
+    store.put_pages("sha-b", [(1, "Rust systems programmer")])
+    assert store.search("pandas") == []
+    assert [hit["filename"] for hit in store.search("rust")] == ["bob.pdf"]
+
+
+def test_syntax_characters_do_not_break_search(store):
+    assert store.search('AND OR "( NEAR') == []
+
+
+def test_analysis_lookup_is_scoped_to_the_user(store):
+    analysis_id = store.record_analysis("summary", "completed", {"summary": "ok"}, user_id="alice")
+    assert store.get_analysis(analysis_id)["results"] == {"summary": "ok"}
+    assert store.get_analysis(analysis_id, "alice")["user_id"] == "alice"
+    assert store.get_analysis(analysis_id, "bob") is None
+    assert store.get_analysis("missing") is None
+
+
+def test_documents_are_per_user(store):
+    assert store.get_document(store.list_documents("alice")[0][0]["file_id"], "bob") is None
+    items, total = store.list_documents("bob")
+    assert total == 1 and items[0]["filename"] == "bob.pdf"
@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+
+import pytest
+
+from app.services.ingest_pipeline import (COMPARE, SUMMARIZE, Checkpoint, ItemPlanner, ManifestError, Pipeline,
+                                          Stage, read_manifest, scan_directory, watch_directory)
+
+
+def test_items_flow_through_every_stage():
+    out = []
+    pipeline = Pipeline([Stage("double", lambda x: x * 2, 3), Stage("inc", lambda x: x + 1, 2),
+                         Stage("collect", lambda x: out.append(x) or x)])
+    stats = pipeline.run(range(20))
+    assert sorted(out) == [x * 2 + 1 for x in range(20)]
+    assert (stats.fed, stats.completed, stats.failed, stats.skipped) == (20, 20, 0, 0)
+
+
+def test_failures_and_drops_are_counted_and_reported():
+    errors = []
+
+    def check(x):
+        if x == 3:
+            raise ValueError("bad item")
+        return None if x % 2 else x
+
+    pipeline = Pipeline([Stage("check", check, 2), Stage("keep", lambda x: x)],
+                        on_error=lambda stage, item, error: errors.append((stage, item, str(error))))
+    stats = pipeline.run(range(6))
+    assert errors == [("check", 3, "bad item")]
+    assert (stats.completed, stats.failed, stats.skipped) == (3, 1, 2)
+
+
+def test_bounded_queues_hold_back_the_upstream_stage():
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def fast(x):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        return x
+
+    def slow(x):
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return x
+
+    stats = Pipeline([Stage("fast", fast), Stage("slow", slow)], queue_size=2).run(range(20))
+    assert stats.completed == 20
+    # At most: a full queue, one item being handed over and one being worked on
+    assert peak[0] <= 4
+    assert stats.stages[0].blocked_seconds > 0
+
+
+def test_stop_ends_the_run_early():
+    stop = threading.Event()
+
+    def work(x):
+        if x == 2:
+            stop.set()
+        return x
+
+    stats = Pipeline([Stage("work", work)], queue_size=1).run(iter(range(1000)), stop)
+    assert stats.interrupted
+    assert stats.fed < 1000 and stats.completed <= stats.fed
+
+
+def test_checkpoint_resumes_and_ignores_a_truncated_line(tmp_path):
+    path = tmp_path / "out" / ".checkpoint.jsonl"
+    checkpoint = Checkpoint(str(path))
+    checkpoint.record("a", output="a.json")
+    checkpoint.record("b", status="failed", error="boom")
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('{"key": "c", "stat')
+
+    resumed = Checkpoint(str(path))
+    assert resumed.is_done("a") and not resumed.is_done("b") and not resumed.is_done("c")
+    assert len(resumed) == 1
+    resumed.record("c")
+    assert Checkpoint(str(path)).is_done("c")
+
+
+def test_planner_pairs_cvs_with_jobs_as_they_arrive():
+    planner = ItemPlanner(COMPARE, ["jobs/backend.txt"])
+    items = planner.plan(["cvs/alice.pdf", "cvs/bob.pdf"])
+    assert [(item.pdf, item.job) for item in items] == [("cvs/alice.pdf", "jobs/backend.txt"),
+                                                        ("cvs/bob.pdf", "jobs/backend.txt")]
+    items = planner.plan(["jobs/data.md"])
+    assert [item.name for item in items] == ["alice__data", "bob__data"]
+    assert [item.output_name() for item in ItemPlanner(SUMMARIZE).plan(["a.pdf", "notes.txt"])] == \
+        ["a.summarize.json"]
+    with pytest.raises(ValueError):
+        ItemPlanner("translate")
+
+
+def test_read_manifest(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text('{"pdf": "a.pdf"}\n\n{"pdf": "cv.pdf", "job": "job.txt", "name": "cv-vs-job"}\n')
+    items = read_manifest(str(manifest))
+    assert [(item.task, item.name) for item in items] == [(SUMMARIZE, "a"), (COMPARE, "cv-vs-job")]
+    assert items[1].job == str(tmp_path / "job.txt")
+
+    manifest.write_text(json.dumps([{"pdf": "a.pdf", "task": "compare"}]))
+    with pytest.raises(ManifestError):
+        read_manifest(str(manifest))
+    manifest.write_text("[{")
+    with pytest.raises(ManifestError):
+        read_manifest(str(manifest))
+
+
+def test_watch_yields_files_once_they_stop_changing(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"%PDF")
+    (tmp_path / ".hidden.pdf").write_bytes(b"%PDF")
+    assert scan_directory(str(tmp_path)) == [str(tmp_path / "a.pdf")]
+    batches = list(watch_directory(str(tmp_path), threading.Event(), interval=0.01, idle_seconds=0.05))
+    assert batches == [[str(tmp_path / "a.pdf")]]
@@ -0,0 +1,54 @@
+import pytest
+
+from app.services.keyword_extractor import (KeywordIndex, _TOKEN, extract_keywords, normalize,
+                                            rank_missing)
+
+
+def test_tokens_keep_dots_and_symbols():
+    assert _TOKEN.findall("c#, c++, node.js and asp.net") == ["c#", "c++", "node.js", "and", "asp.net"]
+
+
+@pytest.mark.parametrize("text", [
+    "Built services in .NET and C#.",
+    "Built services in dotnet and C#.",
+    "Built services on .NET Core and C#.",
+    "Built services on NET Core and C#.",
+])
+def test_dotnet_spellings_match(text):
+    keywords = extract_keywords(text)
+    assert keywords[:2] == [".net", "c#"]
+    assert "core" not in keywords and "net" not in keywords
+
+
+def test_normalize_maps_synonyms():
+    assert normalize("K8s") == "kubernetes"
+    assert normalize("Amazon-Web  Services") == "aws"
+    assert normalize("ReactJS") == "react"
+    assert normalize(".NET Core") == ".net"
+
+
+def test_lexicon_skills_outrank_free_text():
+    keywords = extract_keywords("Widget widget widget tooling. We use Python and Docker.")
+    assert keywords[:2] == ["docker", "python"] or keywords[:2] == ["python", "docker"]
+    assert "widget" in keywords
+
+
+def test_stopwords_and_single_multiword_phrases_are_dropped():
+    keywords = extract_keywords("The team will support customer onboarding")
+    assert "the" not in keywords and "customer onboarding" not in keywords
+
+
+def test_rank_missing_puts_lexicon_skills_first():
+    missing = rank_missing(["customer onboarding", "kubernetes", "python", "terraform"], ["Python", "k8s"])
+    assert missing == ["terraform", "customer onboarding"]
+
+
+def test_index_search_and_idf():
+    index = KeywordIndex()
+    index.add("a", ["python", "docker"])
+    index.add("b", ["python"])
+    assert index.lookup("python") == {"a", "b"}
+    assert index.search(["python", "docker"], match_all=True) == {"a": 2}
+    assert index.idf("docker") > index.idf("python")
+    index.remove("a")
+    assert index.lookup("docker") == set()
@@ -0,0 +1,87 @@
+import asyncio
+import itertools
+
+import pytest
+
+from app.services import llm_cache
+from app.services.llm_cache import LLMCache, fingerprint
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.time for the cache module."""
+    now = {"value": 1000.0}
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now["value"])
+    return now
+
+
+def test_fingerprint_covers_model_options_and_format():
+    base = fingerprint("gemma3", "prompt")
+    assert fingerprint("gemma3", "prompt", {}) == base
+    assert fingerprint("llama3", "prompt") != base
+    assert fingerprint("gemma3", "prompt", {"temperature": 0}) != base
+    assert fingerprint("gemma3", "prompt", format="json") != base
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=60)
+    cache.put("key", "gemma3", "answer")
+    clock["value"] += 59
+    assert cache.get("key") == "answer"
+    clock["value"] += 2
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_evicts_least_recently_used_past_max_entries(tmp_path, monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(ticks)))
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), max_entries=2)
+    cache.put("a", "gemma3", "1")
+    cache.put("b", "gemma3", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "gemma3", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_get_or_generate_caches_non_empty_responses(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"))
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return "answer" if len(calls) > 1 else ""
+
+    assert cache.get_or_generate("gemma3", "prompt", None, generate) == ""
+    assert cache.get_or_generate("gemma3", "prompt", None, generate) == "answer"
+    assert cache.get_or_generate("gemma3", "prompt", None, generate) == "answer"
+    assert len(calls) == 2
+    assert cache.get_or_generate("gemma3", "prompt", None, generate, use_cache=False) == "answer"
+    assert len(calls) == 3 and cache.stats()["bypasses"] == 1
+
+
+def test_async_variant_shares_entries(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"))
+    cache.get_or_generate("gemma3", "prompt", None, lambda: "sync answer")
+
+    async def generate():
+        raise AssertionError("should be answered from the cache")
+
+    assert asyncio.run(cache.get_or_generate_async("gemma3", "prompt", None, generate)) == "sync answer"
+
+
+def test_async_variant_keys_on_format(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"))
+    cache.get_or_generate("gemma3", "prompt", None, lambda: "{}", format="json")
+
+    async def generate():
+        return "plain answer"
+
+    async def main():
+        plain = await cache.get_or_generate_async("gemma3", "prompt", None, generate)
+        constrained = await cache.get_or_generate_async("gemma3", "prompt", None, generate, format="json")
+        return plain, constrained
+
+    assert asyncio.run(main()) == ("plain answer", "{}")
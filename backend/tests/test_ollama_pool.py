@@ -0,0 +1,103 @@
+import pytest
+
+from app.utils import ollama_pool
+from app.utils.ai_client import OllamaError
+from app.utils.metrics import MetricsRegistry
+from app.utils.ollama_pool import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, EndpointPool, PooledOllamaClient
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ollama_pool.time, "monotonic", lambda: now[0])
+    return now
+
+
+class FakeClient:
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.calls = 0
+
+    def generate(self, prompt, model=None, options=None, format=None):
+        self.calls += 1
+        if isinstance(self.outcome, BaseException):
+            raise self.outcome
+        return self.outcome
+
+
+def pooled(*outcomes, **pool_kwargs):
+    urls = [f"http://ollama-{index}" for index in range(len(outcomes))]
+    pool = EndpointPool(urls, registry=MetricsRegistry(), **pool_kwargs)
+    client = PooledOllamaClient(pool)
+    client.clients = {url: FakeClient(outcome) for url, outcome in zip(urls, outcomes)}
+    return client
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.available()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.available()
+
+
+def test_breaker_half_open_allows_one_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.available() and breaker.state == HALF_OPEN
+    breaker.acquired()
+    assert not breaker.available()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.available()
+    clock[0] += 10
+    assert breaker.available()
+    breaker.acquired()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_abandoned_trial_lets_the_next_request_try(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.available()
+    breaker.acquired()
+    breaker.abandoned()
+    assert breaker.state == HALF_OPEN and breaker.available()
+
+
+def test_requests_go_to_the_least_loaded_endpoint():
+    pool = EndpointPool(["http://a", "http://b"], registry=MetricsRegistry())
+    first = pool.acquire("gemma3")
+    second = pool.acquire("gemma3")
+    assert {first.url, second.url} == {"http://a", "http://b"}
+    pool.release(first, 0.1)
+    assert pool.acquire("gemma3") is first
+
+
+def test_generate_fails_over_and_opens_the_circuit(clock):
+    client = pooled(OllamaError("down", kind="unreachable"), "answer", failure_threshold=1)
+    assert client.generate("prompt") == "answer"
+    states = {endpoint["url"]: endpoint["state"] for endpoint in client.pool.stats()}
+    assert states == {"http://ollama-0": OPEN, "http://ollama-1": CLOSED}
+    assert client.generate("prompt") == "answer"
+    assert client.clients["http://ollama-0"].calls == 1
+
+
+def test_bad_requests_do_not_fail_over():
+    client = pooled(OllamaError("bad request", kind="http", status=400), "answer")
+    with pytest.raises(OllamaError):
+        client.generate("prompt")
+    assert client.pool.stats()[0]["state"] == CLOSED
+
+
+@pytest.mark.parametrize("error", [RuntimeError("bug"), KeyboardInterrupt()])
+def test_unexpected_errors_release_the_endpoint(error):
+    client = pooled(error)
+    with pytest.raises(type(error)):
+        client.generate("prompt")
+    endpoint = client.pool.stats()[0]
+    assert endpoint["outstanding"] == 0 and endpoint["state"] == CLOSED and endpoint["errors"] == 0
@@ -0,0 +1,138 @@
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import pytest
+
+from app.services.pdf_engines import (ENGINES, Engine, EngineDocument, ExtractionPolicy, calibrate,
+                                      installed_engines, load_calibrated_engine, save_calibration)
+from app.services.pdf_service import count_pages, iter_page_results
+
+
+class FakeDocument(EngineDocument):
+    def __init__(self, pages, delay):
+        self.pages = pages
+        self.page_count = len(pages)
+        self.delay = delay
+
+    def text(self, index):
+        time.sleep(self.delay)
+        if self.pages[index] is None:
+            raise ValueError(f"cannot decode page {index + 1}")
+        return self.pages[index]
+
+
+@dataclass(frozen=True)
+class FakeEngine(Engine):
+    """Serves fixed page texts; a page of None fails, and pages=None fails to open the file."""
+    pages: Optional[Tuple[Optional[str], ...]] = ()
+    delay: float = 0.0
+
+    def available(self):
+        return True
+
+    def open(self, pdf_path):
+        if self.pages is None:
+            raise ValueError("cannot parse file")
+        return FakeDocument(self.pages, self.delay)
+
+
+@pytest.fixture
+def fake_engine(monkeypatch):
+    def register(name, pages, delay=0.0):
+        monkeypatch.setitem(ENGINES, name, FakeEngine(name, name, name, pages=pages, delay=delay))
+        return name
+    return register
+
+
+def test_every_installed_engine_reads_the_synthetic_pdf(make_pdf):
+    path = make_pdf(3)
+    for name in installed_engines():
+        with ExtractionPolicy((name,)).open(path) as document:
+            assert document.page_count == 3
+            text, engine = document.extract(1)
+            assert engine == name and text.strip()
+
+
+def test_policy_from_config(tmp_path):
+    installed = installed_engines()
+    policy = ExtractionPolicy.from_config("pypdf2", ["pypdf2", "pypdfium2", "pypdfium2", "not-an-engine"],
+                                          str(tmp_path / "none.json"))
+    assert policy.engines == ("pypdf2", "pypdfium2")
+    assert ExtractionPolicy.from_config("auto", None, str(tmp_path / "none.json")).engines == tuple(installed)
+    assert ExtractionPolicy.from_config("pypdf2", [], str(tmp_path / "none.json")).engines == ("pypdf2",)
+    with pytest.raises(ValueError, match="Unknown PDF engine"):
+        ExtractionPolicy.from_config("acrobat")
+
+
+def test_auto_uses_the_saved_calibration(make_pdf, tmp_path):
+    path = str(tmp_path / "calibration.json")
+    calibration = calibrate([make_pdf(2)], engines=["pypdf2", "pypdfium2"])
+    calibration.engine = "pypdfium2"
+    save_calibration(calibration, path)
+    assert load_calibrated_engine(path) == "pypdfium2"
+    assert ExtractionPolicy.from_config("auto", [], path).engines == ("pypdfium2",)
+    assert load_calibrated_engine(str(tmp_path / "missing.json")) is None
+
+
+def test_policy_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("PDF_ENGINE", "pypdf")
+    monkeypatch.setenv("PDF_ENGINE_CALIBRATION_PATH", str(tmp_path / "none.json"))
+    monkeypatch.setenv("PDF_FALLBACK_ENGINES", "[]")
+    assert ExtractionPolicy.from_env().engines == ("pypdf",)
+    monkeypatch.setenv("PDF_FALLBACK_ENGINES", '["pdfminer"]')
+    assert ExtractionPolicy.from_env().engines == ("pypdf", "pdfminer")
+    monkeypatch.setenv("PDF_FALLBACK_ENGINES", "not json")
+    assert ExtractionPolicy.from_env().engines == ("pypdf", *[name for name in installed_engines() if name != "pypdf"])
+
+
+def test_pages_fall_back_one_at_a_time(fake_engine):
+    primary = fake_engine("primary", ("one", "  ", None, ""))
+    broken = fake_engine("broken", None)
+    short = fake_engine("short", ("uno", "dos"))
+    full = fake_engine("full", ("un", "deux", "trois", ""))
+    with ExtractionPolicy((primary, broken, short, full)).open("doc.pdf") as document:
+        assert document.engine == primary and document.page_count == 4
+        assert document.extract(0) == ("one", primary)
+        assert document.extract(1) == ("dos", short)
+        assert document.extract(2) == ("trois", full)  # "short" has no third page
+        assert document.extract(3) == ("", primary)
+
+
+def test_a_failed_page_raises_when_no_engine_has_text(fake_engine):
+    primary = fake_engine("primary", (None,))
+    with ExtractionPolicy((primary, fake_engine("empty", ("",)))).open("doc.pdf") as document:
+        with pytest.raises(ValueError, match="cannot decode page 1"):
+            document.extract(0)
+
+
+def test_documents_the_primary_cannot_open_use_the_next_engine(fake_engine):
+    policy = ExtractionPolicy((fake_engine("primary", None), fake_engine("fallback", ("one", "two"))))
+    assert count_pages("doc.pdf", policy) == 2
+    pages = list(iter_page_results("doc.pdf", workers=1, policy=policy))
+    assert [(page.text, page.engine) for page in pages] == [("one", "fallback"), ("two", "fallback")]
+    with pytest.raises(ValueError, match="cannot parse file"):
+        count_pages("doc.pdf", ExtractionPolicy((fake_engine("primary", None), fake_engine("also", None))))
+
+
+def test_calibrate_picks_the_fastest_engine_with_enough_text(fake_engine):
+    full = fake_engine("full", ("aaaa bbbb", "cccc dddd"), delay=0.01)
+    half = fake_engine("half", ("aaaa", "cccc"))
+    broken = fake_engine("broken", None)
+    calibration = calibrate(["a.pdf", "b.pdf"], engines=[full, half, broken])
+    results = {result.engine: result for result in calibration.results}
+    assert calibration.engine == full
+    assert results[full].text_yield == 1.0 and results[full].pages == 4
+    assert results[half].text_yield == 0.5 and results[half].pages_per_second > results[full].pages_per_second
+    assert (results[broken].errors, results[broken].text_yield) == (2, 0.0)
+    assert calibrate(["a.pdf"], engines=[full, half], min_yield=0.5).engine == half
+    assert calibrate(["a.pdf"], engines=[half, broken], min_yield=0.99).engine == half
+
+
+def test_calibration_on_real_pdfs(make_pdf, tmp_path):
+    calibration = calibrate([make_pdf(2, "a.pdf"), make_pdf(3, "b.pdf")], engines=installed_engines())
+    assert calibration.engine in installed_engines()
+    assert {result.engine: result.pages for result in calibration.results} == {
+        name: 5 for name in installed_engines()}
+    chosen = next(result for result in calibration.results if result.engine == calibration.engine)
+    assert chosen.text_yield >= calibration.min_yield
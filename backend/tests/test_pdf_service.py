@@ -0,0 +1,35 @@
+import pytest
+
+from app.services.pdf_service import extract_pages, iter_page_results, plan_shards
+
+
+@pytest.mark.parametrize("page_count, workers, min_pages, expected", [
+    (0, 4, 8, []),
+    (5, 4, 8, [(0, 5)]),
+    (20, 2, 8, [(0, 10), (10, 20)]),
+    (20, 4, 8, [(0, 8), (8, 16), (16, 20)]),
+    (9, 0, 1, [(0, 9)]),
+])
+def test_plan_shards(page_count, workers, min_pages, expected):
+    assert plan_shards(page_count, workers, min_pages) == expected
+
+
+def test_plan_shards_cover_every_page_once():
+    for page_count in range(1, 60):
+        shards = plan_shards(page_count, 3, 4)
+        pages = [page for start, end in shards for page in range(start, end)]
+        assert pages == list(range(page_count))
+
+
+def test_sharded_extraction_keeps_page_order(make_pdf):
+    path = make_pdf(12)
+    sequential = extract_pages(path, workers=1)
+    sharded = extract_pages(path, workers=3, min_pages_per_shard=2)
+    assert [page.page_no for page in sharded.pages] == list(range(1, 13))
+    assert [page.text for page in sharded.pages] == [page.text for page in sequential.pages]
+
+
+def test_iter_page_results_range(make_pdf):
+    path = make_pdf(6)
+    pages = list(iter_page_results(path, start=2, end=4, workers=2, min_pages_per_shard=1))
+    assert [page.page_no for page in pages] == [2, 3, 4]
@@ -0,0 +1,76 @@
+import pytest
+
+from app.services.semantic_index import DEFAULT_THRESHOLD, VectorIndex, embed, semantic_match
+
+
+def similarity(left, right):
+    return float((embed([left]) @ embed([right]).T)[0, 0])
+
+
+@pytest.mark.parametrize("job, cv", [
+    ("data analysis", "data analyst"),
+    ("postgresql", "postgres sql"),
+    ("react", "react native"),
+    ("stakeholder management", "managing stakeholders"),
+    ("unit testing", "unit tests"),
+    ("leadership", "team leadership"),
+])
+def test_near_matches_get_partial_credit(job, cv):
+    result = semantic_match([cv], [job])
+    assert [(match[0], match[1]) for match in result.similar] == [(job, cv)]
+    assert DEFAULT_THRESHOLD <= result.similar[0][2] < 1
+    assert result.score == pytest.approx(result.similar[0][2] * 100, abs=0.1)
+
+
+@pytest.mark.parametrize("left, right", [
+    ("data analyst", "data engineer"),
+    ("java", "javascript"),
+    ("software engineer", "software architect"),
+    ("sql", "nosql"),
+    ("react", "redux"),
+])
+def test_different_terms_sharing_a_word_do_not_match(left, right):
+    assert similarity(left, right) < DEFAULT_THRESHOLD
+    assert semantic_match([left], [right]).missing == [right]
+
+
+def test_spellings_of_one_term_count_as_exact():
+    result = semantic_match(["k8s", "python"], ["kubernetes", "python", "docker"])
+    assert result.exact == ["python"]
+    assert [match[:2] for match in result.similar] == [("kubernetes", "k8s")]
+    assert result.missing == ["docker"]
+    assert result.score == pytest.approx(200 / 3)
+
+
+def test_threshold_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv("SEMANTIC_MATCH_THRESHOLD", "0.99")
+    assert semantic_match(["data analyst"], ["data analysis"]).missing == ["data analysis"]
+
+
+def test_empty_inputs():
+    assert semantic_match(["python"], []).score == 0.0
+    assert semantic_match([], ["python"]).missing == ["python"]
+    assert embed([]).shape == (0, embed(["python"]).shape[1])
+    index = VectorIndex()
+    assert index.match_scores(["python"]) == {}
+    index.add("empty", [])
+    index.add("cv", ["python"])
+    assert len(index) == 1
+    assert index.match_scores([]) == {"cv": 0.0}
+
+
+def test_index_scores_agree_with_semantic_match():
+    jobs = {
+        "data": ["data analysis", "sql", "python", "stakeholder management"],
+        "web": ["react", "javascript", "css", "postgresql"],
+        "ops": ["kubernetes", "docker", "aws", "ci/cd", "python"],
+    }
+    cv = ["data analyst", "python", "react native", "postgres sql", "managing stakeholders", "k8s"]
+    index = VectorIndex()
+    for name, keywords in jobs.items():
+        index.add(name, keywords)
+    for threshold in (None, 0.3, 0.9):
+        scores = index.match_scores(cv, threshold=threshold)
+        assert scores.keys() == jobs.keys()
+        for name, keywords in jobs.items():
+            assert scores[name] == pytest.approx(semantic_match(cv, keywords, threshold=threshold).score, abs=1e-3)
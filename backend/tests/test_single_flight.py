@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.single_flight import AsyncSingleFlight, SingleFlight, StreamFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, "key", work)
+        assert started.wait(5)
+        followers = [pool.submit(flight.do, "key", work) for _ in range(3)]
+        while flight.coalesced < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result(5)] + [f.result(5) for f in followers]
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"executed": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_exception_reaches_every_caller_and_is_not_remembered():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: 42) == 42
+    assert flight.stats()["executed"] == 2
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats() == {"executed": 2, "coalesced": 0, "in_flight": 0}
+
+
+def test_async_calls_share_one_execution():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_async_cancelling_one_caller_keeps_the_shared_work():
+    flight = AsyncSingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(main()) == ("result", True)
+
+
+def test_async_work_is_cancelled_when_every_caller_leaves():
+    flight = AsyncSingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        caller = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flight.stats()["in_flight"]
+
+    assert asyncio.run(main()) == 0
+    assert cancelled == [True]
+
+
+def pages(count, produced, gate=None):
+    def stream():
+        for page in range(1, count + 1):
+            if gate is not None:
+                gate.wait(5)
+            produced.append(page)
+            yield page
+    return stream
+
+
+def test_concurrent_streams_replay_the_first_one():
+    flight, produced, gate = StreamFlight(), [], threading.Event()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(list, flight.stream("doc", pages(5, produced, gate)))
+        while flight.stats()["in_flight"] == 0:
+            time.sleep(0.001)
+        follower = pool.submit(list, flight.stream("doc", pages(5, produced)))
+        while flight.coalesced == 0:
+            time.sleep(0.001)
+        gate.set()
+        results = [leader, follower]
+        assert [result.result(5) for result in results] == [[1, 2, 3, 4, 5]] * 2
+    assert produced == [1, 2, 3, 4, 5]
+    assert flight.stats() == {"executed": 1, "coalesced": 1, "in_flight": 0}
+
+
+def test_followers_get_items_before_the_stream_ends():
+    flight, produced = StreamFlight(), []
+    leader = flight.stream("doc", pages(3, produced))
+    follower = flight.stream("doc", pages(3, produced))
+    assert next(leader) == 1
+    assert next(follower) == 1 and produced == [1]
+    assert list(leader) == [2, 3] and list(follower) == [2, 3]
+
+
+def test_follower_carries_on_when_the_first_stream_stops_early():
+    flight, produced = StreamFlight(), []
+    leader = flight.stream("doc", pages(4, produced))
+    follower = flight.stream("doc", pages(4, produced))
+    assert next(leader) == 1
+    assert next(follower) == 1
+    leader.close()
+    assert list(follower) == [2, 3, 4]
+    assert produced == [1, 1, 2, 3, 4]
+
+
+def test_stream_errors_reach_followers():
+    flight = StreamFlight()
+
+    def broken():
+        yield 1
+        raise ValueError("corrupt page")
+
+    leader = flight.stream("doc", broken)
+    follower = flight.stream("doc", broken)
+    assert next(leader) == 1
+    assert next(follower) == 1
+    with pytest.raises(ValueError):
+        next(leader)
+    with pytest.raises(ValueError, match="corrupt page"):
+        next(follower)
+    assert flight.stats()["executed"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_finished_streams_are_not_replayed():
+    flight, produced = StreamFlight(), []
+    assert list(flight.stream("doc", pages(2, produced))) == [1, 2]
+    assert list(flight.stream("doc", pages(2, produced))) == [1, 2]
+    flight.stream("doc", pages(2, produced))  # never started, so never in flight
+    assert flight.stats() == {"executed": 2, "coalesced": 0, "in_flight": 0}
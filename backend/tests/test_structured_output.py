@@ -0,0 +1,66 @@
+import pytest
+from pydantic import BaseModel
+
+from app.services.structured_output import (StructuredOutputError, StructuredOutputStats, extract_json,
+                                            generate_structured, output_format)
+
+
+class Verdict(BaseModel):
+    score: int
+    reasons: list
+
+
+@pytest.mark.parametrize("text, expected, repaired", [
+    ('{"score": 3}', {"score": 3}, False),
+    ('```json\n{"score": 3}\n```', {"score": 3}, True),
+    ('Here you go: {"score": 3} Hope that helps!', {"score": 3}, True),
+    ('{"score": 3, "reasons": ["a", "b",],}', {"score": 3, "reasons": ["a", "b"]}, True),
+    ('{"score": 3, "reasons": ["a", "b', {"score": 3, "reasons": ["a", "b"]}, True),
+    ('{"score": 3, "reasons": ["a"], "note":', {"score": 3, "reasons": ["a"]}, True),
+    ('[1, 2, {"a": "}"}]', [1, 2, {"a": "}"}], False),
+])
+def test_extract_json_repairs(text, expected, repaired):
+    assert extract_json(text) == (expected, repaired)
+
+
+def test_extract_json_without_json_raises():
+    with pytest.raises(ValueError):
+        extract_json("I could not find anything to say.")
+
+
+@pytest.mark.parametrize("mode, expected", [("json", "json"), ("none", None)])
+def test_output_format_modes(monkeypatch, mode, expected):
+    monkeypatch.setenv("STRUCTURED_OUTPUT_FORMAT", mode)
+    assert output_format(Verdict) == expected
+
+
+def test_output_format_defaults_to_schema(monkeypatch):
+    monkeypatch.delenv("STRUCTURED_OUTPUT_FORMAT", raising=False)
+    assert output_format(Verdict) == Verdict.model_json_schema()
+
+
+def test_invalid_reply_is_retried_and_reported():
+    replies = iter(['{"score": "high"}', '{"score": 4, "reasons": []}'])
+    prompts, invalid = [], []
+
+    def generate(prompt, format):
+        prompts.append(prompt)
+        return next(replies)
+
+    stats = StructuredOutputStats()
+    result = generate_structured(generate, "Rate it", Verdict, retries=1, stats=stats,
+                                 on_invalid=lambda prompt, format: invalid.append(prompt))
+    assert result == Verdict(score=4, reasons=[])
+    assert invalid == ["Rate it"]
+    assert prompts[1].startswith("Rate it\n\nYour previous reply could not be used")
+    assert (stats.attempts, stats.parse_failures, stats.retries, stats.clean) == (2, 1, 1, 1)
+
+
+def test_retry_budget_and_empty_reply():
+    stats = StructuredOutputStats()
+    with pytest.raises(StructuredOutputError):
+        generate_structured(lambda prompt, format: "nope", "Rate it", Verdict, retries=2, stats=stats)
+    assert (stats.attempts, stats.failures) == (3, 1)
+    with pytest.raises(StructuredOutputError):
+        generate_structured(lambda prompt, format: "", "Rate it", Verdict, retries=2, stats=stats)
+    assert stats.attempts == 3
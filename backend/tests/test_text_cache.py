@@ -0,0 +1,58 @@
+import itertools
+
+import pytest
+
+from app.services import text_cache
+from app.services.text_cache import TextCache, hash_file
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A time.time that ticks one second per call, so access order is unambiguous."""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(text_cache.time, "time", lambda: float(next(ticks)))
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = TextCache(str(tmp_path / "cache.sqlite3"))
+    key = TextCache.make_key("abc", "v1")
+    assert cache.get(key) is None
+    cache.put(key, ["page one", "", "page three"])
+    assert cache.get(key) == ["page one", "", "page three"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_put_replaces_pages(tmp_path):
+    cache = TextCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("key", ["a", "b", "c"])
+    cache.put("key", ["d"])
+    assert cache.get("key") == ["d"]
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = TextCache(str(tmp_path / "cache.sqlite3"), max_bytes=20)
+    cache.put("first", ["x" * 8])
+    cache.put("second", ["y" * 8])
+    assert cache.get("first") is not None  # now more recent than "second"
+    cache.put("third", ["z" * 8])
+    assert cache.get("second") is None
+    assert cache.get("first") == ["x" * 8]
+    assert cache.get("third") == ["z" * 8]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_skips_documents_larger_than_the_cache(tmp_path):
+    cache = TextCache(str(tmp_path / "cache.sqlite3"), max_bytes=4)
+    cache.put("big", ["too large"])
+    assert cache.get("big") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_hash_file_depends_on_content_only(tmp_path):
+    first, second = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    first.write_bytes(b"same bytes")
+    second.write_bytes(b"same bytes")
+    assert hash_file(str(first)) == hash_file(str(second))
+    second.write_bytes(b"other bytes")
+    assert hash_file(str(first)) != hash_file(str(second))
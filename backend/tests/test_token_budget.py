@@ -0,0 +1,85 @@
+import pytest
+
+from app.services.chunking import estimate_tokens
+from app.services.token_budget import (MIN_PARTIAL_TOKENS, select_keywords, select_text, split_sections,
+                                       truncate_to_tokens)
+
+
+def words(label: str, count: int) -> str:
+    return " ".join(f"{label}{index}" for index in range(count))
+
+
+CV = f"""Jane Doe
+
+Hobbies
+{words("hobby", 60)}
+
+Skills:
+{words("skill", 40)}
+
+Experience
+{words("job", 80)}
+"""
+
+
+def test_split_sections_at_headings():
+    sections = split_sections(CV)
+    assert [(section.heading, section.weight) for section in sections] == \
+        [("", 1.0), ("hobbies", 0.2), ("skills", 3.0), ("experience", 2.0)]
+    assert sections[0].text == "Jane Doe"
+    assert all(section.tokens == estimate_tokens(section.text) for section in sections)
+
+
+def test_inline_all_caps_headings_split_run_together_text():
+    text = "Jane Doe TECHNICAL SKILLS Python, SQL WORK EXPERIENCE Acme 2019-2023 skills mentioned in prose"
+    sections = split_sections(text)
+    assert [section.heading for section in sections] == ["", "technical skills", "work experience"]
+    assert sections[2].text.endswith("skills mentioned in prose")
+
+
+def test_text_within_budget_is_returned_unchanged():
+    budgeted = select_text(CV, 10_000)
+    assert budgeted.text == CV and not budgeted.truncated and budgeted.sections == []
+
+
+@pytest.mark.parametrize("budget", [60, 120, 150, 200])
+def test_budget_is_respected_and_order_kept(budget):
+    budgeted = select_text(CV, budget)
+    assert budgeted.tokens <= budget and budgeted.truncated
+    positions = [CV.index(span.split()[0]) for span in budgeted.text.split("\n\n")]
+    assert positions == sorted(positions)
+
+
+def test_highest_value_sections_are_chosen_first():
+    budgeted = select_text(CV, 150)
+    assert budgeted.sections[0] == "skills"
+    assert "hobbies" not in budgeted.sections
+    assert words("skill", 40) in budgeted.text
+
+
+def test_partial_sections_only_above_the_minimum():
+    skills_tokens = split_sections(CV)[2].tokens
+    budgeted = select_text(CV, skills_tokens + MIN_PARTIAL_TOKENS)
+    assert budgeted.sections == ["skills", "experience"]
+    assert "job0" in budgeted.text and "job79" not in budgeted.text
+
+    budgeted = select_text(CV, skills_tokens + MIN_PARTIAL_TOKENS - 1)
+    assert "skills" in budgeted.sections and "experience" not in budgeted.sections
+
+
+def test_weights_override_the_defaults():
+    budgeted = select_text(CV, 100, weights={"hobbies": 5.0})
+    assert "hobbies" in budgeted.sections and "skills" not in budgeted.sections
+
+
+def test_truncate_to_tokens_cuts_on_words():
+    text = words("word", 100)
+    cut = truncate_to_tokens(text, 50)
+    assert estimate_tokens(cut) <= 50 and text.startswith(cut) and cut.endswith(tuple("0123456789"))
+
+
+def test_select_keywords_keeps_leading_ones_that_fit():
+    keywords = ["python", "machine learning", "kubernetes", "terraform"]
+    assert select_keywords(keywords, 1000) == keywords
+    assert select_keywords(keywords, 3) == ["python"]
+    assert select_keywords(keywords, 0) == []
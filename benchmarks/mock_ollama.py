@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the Ollama API, for benchmarking without a model.
+
+Serves ``/api/generate`` (streamed or not) and ``/api/tags``. Each response
+waits ``latency`` seconds before the first token and then produces tokens
+at ``token_rate`` per second, so timings behave like a real model's.
+Requests with a ``format`` get a JSON object matching the CV analysis
+schema; keyword prompts get a comma-separated list of words from the
+prompt; everything else gets filler text. With ``load_seconds`` the first
+request for each model also waits that long, as a model load does, and a
+request without a prompt only loads the model.
+
+Usage: python benchmarks/mock_ollama.py --port 11500 --latency 0.05 --token-rate 200 [--load-seconds 2]
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 11500
+FILLER = ("The document describes experience with Python, data pipelines and cloud platforms, "
+          "highlights leadership of cross-functional teams and summarizes key outcomes").split()
+
+
+class MockConfig:
+    def __init__(self, latency: float = 0.05, token_rate: float = 200.0, response_tokens: int = 60,
+                 load_seconds: float = 0.0):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.response_tokens = response_tokens
+        self.load_seconds = load_seconds
+        self.requests = 0
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def count(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def load(self, model: str) -> None:
+        """Wait for ``model`` to load: ``load_seconds`` for the first request, concurrent ones wait along."""
+        with self._lock:
+            loaded = self._loaded.get(model)
+            first = loaded is None
+            if first:
+                loaded = self._loaded[model] = threading.Event()
+        if first:
+            time.sleep(self.load_seconds)
+            loaded.set()
+        loaded.wait()
+
+
+def _response_tokens(request: dict, config: MockConfig) -> list:
+    prompt = request.get("prompt", "")
+    if request.get("format"):
+        body = json.dumps({
+            "match_analysis": "Solid overlap on core skills with some gaps in tooling.",
+            "missing_critical": ["kubernetes", "terraform"],
+            "recommendations": ["Add cloud certifications", "Quantify delivery outcomes"],
+            "synonym_matches": ["k8s ~ kubernetes"],
+            "priority_additions": ["kubernetes", "terraform", "aws"]
+        })
+        return [body[index:index + 4] for index in range(0, len(body), 4)]
+    if "comma-separated list of keywords" in prompt:
+        words = sorted(set(re.findall(r"[a-z]{5,}", prompt.split("Text to analyze:")[-1].lower())))
+        return [f"{word}, " for word in words[:config.response_tokens]]
+    return [f"{FILLER[index % len(FILLER)]} " for index in range(config.response_tokens)]
+
+
+def make_handler(config: MockConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, body: dict, status: int = 200) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/api/tags":
+                self._send_json({"models": [{"name": "gemma3"}]})
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/api/generate":
+                self._send_json({"error": "not found"}, status=404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            config.count()
+            config.load(request.get("model", ""))
+            if "prompt" not in request:
+                self._send_json({"model": request.get("model"), "response": "", "done": True, "done_reason": "load"})
+                return
+            tokens = _response_tokens(request, config)
+            time.sleep(config.latency)
+            if not request.get("stream", True):
+                time.sleep(len(tokens) / config.token_rate)
+                self._send_json({"model": request.get("model"), "response": "".join(tokens), "done": True})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for token in tokens + [None]:
+                    if token is not None:
+                        time.sleep(1 / config.token_rate)
+                    line = json.dumps({"response": token or "", "done": token is None}).encode() + b"\n"
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client stopped reading, as a cancelled stream does
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, config: MockConfig = None) -> ThreadingHTTPServer:
+    """Start the mock server on a background thread and return it."""
+    server = ThreadingHTTPServer((host, port), make_handler(config or MockConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Tokens per second")
+    parser.add_argument("--response-tokens", type=int, default=60, help="Tokens per text response")
+    parser.add_argument("--load-seconds", type=float, default=0.0, help="Model load time, paid by the first request")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port,
+                   MockConfig(args.latency, args.token_rate, args.response_tokens, args.load_seconds))
+    print(f"Mock Ollama listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for DeepDFScan.
+
+Starts the mock Ollama server (benchmarks/mock_ollama.py), generates
+synthetic PDFs next to the bundled CV.pdf / sample2.pdf / sample3.pdf and
+measures, under concurrent load:
+
+- PDF extraction (pages/sec, text cache disabled)
+- the CLI functions: summarize_text, extract_keywords_ai (fast and ai
+  modes) and ai_keyword_analysis, with the response cache bypassed
+- the FastAPI app, run under uvicorn: /api/summarize,
+  /api/summarize/stream (time to first token) and /api/health while the
+  summaries are running
+
+Each scenario reports p50/p95/p99 latency and throughput, plus peak RSS of
+the benchmark process and the API server, as the median over several
+rounds. Results are compared against a stored baseline recorded with the
+same workload, and the run fails (exit code 1) when a p50/p95 latency,
+throughput or memory figure is worse than the tolerance allows. p99 is
+reported but not gated: with a few dozen samples it is one slow request.
+
+Usage:
+    python benchmarks/run_benchmarks.py --quick
+    python benchmarks/run_benchmarks.py --save-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+BUNDLED_PDFS = ["CV.pdf", "sample2.pdf", "sample3.pdf"]
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_TOLERANCE = 0.2
+LATENCY_NOISE_MS = 10.0  # latency changes smaller than this are never reported as regressions
+WORKLOAD_KEYS = ("quick", "concurrency", "rounds", "pages", "latency", "token_rate")
+
+sys.path.insert(0, str(BENCH_DIR))
+from synthetic_pdf import write_pdf  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline DeepDFScan benchmarks against a mock Ollama server")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations and smaller documents")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent requests/calls (default: 4)")
+    parser.add_argument("--rounds", type=int,
+                        help="Repeat every scenario and report the median of each metric (default: 3, 1 with --quick)")
+    parser.add_argument("--pages", type=int, nargs="+", help="Synthetic PDF page counts (default: 1 5 20 50)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock time to first token in seconds")
+    parser.add_argument("--token-rate", type=float, default=400.0, help="Mock tokens per second")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a metric counts as a regression (default: 0.2)")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    parser.add_argument("--skip-api", action="store_true", help="Skip the FastAPI scenarios")
+    return parser.parse_args(argv)
+
+
+# ---------------------------------------------------------------------------
+# Measurement helpers
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=30.0):
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = fraction * (len(ordered) - 1)
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+
+def summarize_latencies(seconds, elapsed, prefix=""):
+    """p50/p95/p99 in milliseconds and operations per second."""
+    milliseconds = [value * 1000 for value in seconds]
+    return {
+        f"{prefix}p50_ms": round(percentile(milliseconds, 0.50), 2),
+        f"{prefix}p95_ms": round(percentile(milliseconds, 0.95), 2),
+        f"{prefix}p99_ms": round(percentile(milliseconds, 0.99), 2),
+        f"{prefix}ops_per_sec": round(len(seconds) / elapsed, 2) if elapsed else 0.0
+    }
+
+
+def run_concurrently(func, items, concurrency):
+    """Run func over items on a thread pool; return per-item latencies and total wall time."""
+    def timed(item):
+        started = time.perf_counter()
+        func(item)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, items))
+    return latencies, time.perf_counter() - started
+
+
+def median_of_rounds(rounds):
+    """Merge per-round results into the median of each metric, which keeps one noisy round from deciding."""
+    return {
+        scenario: {metric: round(statistics.median(run[scenario][metric] for run in rounds), 2)
+                   for metric in metrics}
+        for scenario, metrics in rounds[0].items()
+    }
+
+
+def process_peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def child_peak_rss_mb(pid):
+    """Peak RSS of another process (Linux only; None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+
+def bench_extraction(pdfs, iterations):
+    from app.services.pdf_service import extract_pages
+    latencies, pages = [], 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for path in pdfs:
+            result = extract_pages(str(path), cache=None)
+            latencies.append(result.total_seconds)
+            pages += result.page_count
+    elapsed = time.perf_counter() - started
+    metrics = summarize_latencies(latencies, elapsed)
+    metrics["pages_per_sec"] = round(pages / elapsed, 1)
+    return metrics
+
+
+def bench_cli(cli, texts, concurrency, iterations):
+    """The CLI's model-backed functions, with the response cache bypassed so every call reaches the mock."""
+    items = texts * iterations
+    cv_text, job_text = texts[0], texts[-1]
+    scenarios = {
+        "cli_keywords_fast": lambda text: cli.extract_keywords_ai(text, mode="fast"),
+        "cli_keywords_ai": lambda text: cli.extract_keywords_ai(text, use_cache=False, mode="ai"),
+        "cli_summarize": lambda text: cli.summarize_text(text, use_cache=False),
+    }
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, func in scenarios.items():
+            latencies, elapsed = run_concurrently(func, items, concurrency)
+            results[name] = summarize_latencies(latencies, elapsed)
+
+        cv_keywords = cli.extract_keywords_ai(cv_text, mode="fast")
+        job_keywords = cli.extract_keywords_ai(job_text, mode="fast")
+        latencies, elapsed = run_concurrently(
+            lambda _: cli.ai_keyword_analysis(cv_keywords, job_keywords, cv_text, job_text, use_cache=False),
+            range(len(items)), concurrency)
+        results["cli_analysis"] = summarize_latencies(latencies, elapsed)
+    results["cli_analysis"]["parse_failure_rate"] = cli.structured_stats.stats()["parse_failure_rate"]
+    return results
+
+
+def bench_api(base_url, pdfs, concurrency, iterations):
+    import httpx
+
+    health_latencies = []
+    stop_polling = [False]
+
+    def poll_health():
+        with httpx.Client(timeout=30.0) as client:
+            while not stop_polling[0]:
+                started = time.perf_counter()
+                client.get(f"{base_url}/api/health")
+                health_latencies.append(time.perf_counter() - started)
+                time.sleep(0.02)
+
+    def summarize(path):
+        with open(path, "rb") as file, httpx.Client(timeout=300.0) as client:
+            response = client.post(f"{base_url}/api/summarize", params={"use_cache": "false"},
+                                   files={"file": (path.name, file, "application/pdf")})
+        response.raise_for_status()
+
+    first_token = []
+
+    def stream(path):
+        started = time.perf_counter()
+        with open(path, "rb") as file, httpx.Client(timeout=300.0) as client:
+            with client.stream("POST", f"{base_url}/api/summarize/stream", params={"use_cache": "false"},
+                               files={"file": (path.name, file, "application/pdf")}) as response:
+                response.raise_for_status()
+                seen_token = False
+                for line in response.iter_lines():
+                    if line == "event: token" and not seen_token:
+                        first_token.append(time.perf_counter() - started)
+                        seen_token = True
+                    elif line == "event: error":
+                        raise RuntimeError("Summary stream reported an error")
+
+    items = list(pdfs) * iterations
+    results = {}
+    with ThreadPoolExecutor(max_workers=1) as poller:
+        polling = poller.submit(poll_health)
+        latencies, elapsed = run_concurrently(summarize, items, concurrency)
+        results["api_summarize"] = summarize_latencies(latencies, elapsed)
+        latencies, elapsed = run_concurrently(stream, items, concurrency)
+        results["api_stream"] = summarize_latencies(latencies, elapsed)
+        results["api_stream"].update(
+            {key: value for key, value in summarize_latencies(first_token, elapsed, "ttft_").items()
+             if not key.endswith("ops_per_sec")})
+        stop_polling[0] = True
+        polling.result()
+    results["api_health_under_load"] = summarize_latencies(health_latencies, 0)
+    del results["api_health_under_load"]["ops_per_sec"]
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Baseline comparison
+
+def higher_is_worse(metric):
+    return metric.endswith("_ms") or metric.endswith("_mb") or metric.endswith("_rate")
+
+
+def compare(results, baseline, tolerance):
+    """List (scenario, metric, baseline, current) for every metric that got worse than the tolerance allows."""
+    regressions = []
+    for scenario, metrics in baseline.get("results", {}).items():
+        for metric, expected in metrics.items():
+            current = results.get(scenario, {}).get(metric)
+            if current is None or expected is None or "p99" in metric:
+                continue
+            if higher_is_worse(metric):
+                limit = expected * (1 + tolerance)
+                if metric.endswith("_ms"):
+                    limit = max(limit, expected + LATENCY_NOISE_MS)
+                worse = current > limit
+            else:
+                worse = current < expected * (1 - tolerance)
+            if worse:
+                regressions.append((scenario, metric, expected, current))
+    return regressions
+
+
+def print_report(results):
+    for scenario, metrics in results.items():
+        print(f"\n{scenario}")
+        for metric, value in metrics.items():
+            print(f"  {metric:<22} {value}")
+
+
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    args = parse_args(argv)
+    pages = args.pages or ([1, 5, 10] if args.quick else [1, 5, 20, 50])
+    iterations = 1 if args.quick else 3
+    rounds = args.rounds or (1 if args.quick else 3)
+    workdir = Path(tempfile.mkdtemp(prefix="deepdfscan-bench-"))
+
+    mock_port = free_port()
+    mock = subprocess.Popen([sys.executable, str(BENCH_DIR / "mock_ollama.py"), "--port", str(mock_port),
+                             "--latency", str(args.latency), "--token-rate", str(args.token_rate)],
+                            stdout=subprocess.DEVNULL)
+    server = None
+    try:
+        # Fresh caches and history in a scratch directory, and every model call goes to the mock
+        os.environ.update({
+            "OLLAMA_BASE_URL": f"http://127.0.0.1:{mock_port}",
+            "OLLAMA_RETRIES": "0",
+            "TEXT_CACHE_PATH": str(workdir / "text_cache.sqlite3"),
+            "LLM_CACHE_PATH": str(workdir / "llm_cache.sqlite3"),
+            "HISTORY_DB_PATH": str(workdir / "history.sqlite3"),
+            "PDF_ENGINE_CALIBRATION_PATH": str(workdir / "extraction_engine.json"),
+            "UPLOAD_DIR": str(workdir / "uploads"),
+        })
+        wait_for(f"http://127.0.0.1:{mock_port}/api/tags")
+
+        pdfs = [ROOT_DIR / name for name in BUNDLED_PDFS if (ROOT_DIR / name).exists()]
+        pdfs += [Path(write_pdf(str(workdir / f"synthetic_{count}p.pdf"), count)) for count in pages]
+
+        sys.path.insert(0, str(ROOT_DIR))
+        import deepdfscan as cli
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            texts = [text for text in (cli.parse_pdf(str(path), verbose=False) for path in pdfs) if text]
+        runs = []
+        for _ in range(rounds):
+            run = {"extraction": bench_extraction(pdfs, iterations)}
+            run.update(bench_cli(cli, texts, args.concurrency, iterations))
+            runs.append(run)
+        results = median_of_rounds(runs)
+        results["cli_process"] = {"peak_rss_mb": process_peak_rss_mb()}
+
+        if not args.skip_api:
+            api_port = free_port()
+            # The backend has its own deepdfscan module, so the app runs in its own process
+            server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(api_port),
+                                       "--log-level", "warning"], cwd=BACKEND_DIR, env=os.environ.copy())
+            base_url = f"http://127.0.0.1:{api_port}"
+            wait_for(f"{base_url}/api/health")
+            results.update(median_of_rounds([bench_api(base_url, pdfs, args.concurrency, iterations)
+                                             for _ in range(rounds)]))
+            results["api_process"] = {"peak_rss_mb": child_peak_rss_mb(server.pid)}
+    finally:
+        for process in (server, mock):
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results)
+    report = {
+        "config": {"quick": args.quick, "concurrency": args.concurrency, "rounds": rounds, "pages": pages,
+                   "latency": args.latency, "token_rate": args.token_rate, "python": sys.version.split()[0]},
+        "results": results
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if not Path(args.baseline).exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    baseline = json.loads(Path(args.baseline).read_text())
+    differing = [key for key in WORKLOAD_KEYS if baseline.get("config", {}).get(key) != report["config"][key]]
+    if differing:
+        print(f"\n⚠️  Baseline was recorded with a different workload ({', '.join(differing)}); not comparing")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"\n✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        return 0
+    print(f"\n❌ {len(regressions)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%}):")
+    for scenario, metric, expected, current in regressions:
+        print(f"  {scenario}.{metric}: {expected} -> {current}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
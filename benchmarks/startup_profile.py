@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Start-up profile for DeepDFScan.
+
+Measures what a fresh process pays before it does useful work:
+
+- import time of the CLI (``import deepdfscan`` from the project root)
+  and the API (``import main`` from backend/), from ``python -X
+  importtime``, as the median of several runs, with the packages that
+  cost the most
+- the API server under uvicorn, against the mock Ollama server with a
+  model load delay, with the start-up warm-up off and on: time until it
+  answers ``/``, until ``/api/health`` reports ready, and the latency of
+  the first summary
+
+Usage:
+    python benchmarks/startup_profile.py
+    python benchmarks/startup_profile.py --runs 10 --load-seconds 3 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from run_benchmarks import BACKEND_DIR, BENCH_DIR, ROOT_DIR, free_port, wait_for
+from synthetic_pdf import write_pdf
+
+IMPORTS = {
+    "cli": (ROOT_DIR, "import deepdfscan"),
+    "api": (BACKEND_DIR, "import main"),
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import time and server start-up profile")
+    parser.add_argument("--runs", type=int, default=5, help="Import time runs per entry point (default: 5)")
+    parser.add_argument("--top", type=int, default=8, help="Packages listed per entry point (default: 8)")
+    parser.add_argument("--load-seconds", type=float, default=2.0, help="Mock model load time (default: 2)")
+    parser.add_argument("--skip-server", action="store_true", help="Only measure import time")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+# ---------------------------------------------------------------------------
+# Import time
+
+def import_profile(cwd, statement):
+    """Self time per imported module, in microseconds, from one ``-X importtime`` run."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=cwd,
+                            capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(self_us)
+    return modules
+
+
+def bench_imports(runs, top):
+    results = {}
+    for entry, (cwd, statement) in IMPORTS.items():
+        profiles = [import_profile(cwd, statement) for _ in range(runs)]
+        totals = [sum(profile.values()) / 1000 for profile in profiles]
+        packages = defaultdict(list)
+        for profile in profiles:
+            per_package = defaultdict(int)
+            for name, self_us in profile.items():
+                per_package[name.split(".")[0]] += self_us
+            for package, self_us in per_package.items():
+                packages[package].append(self_us / 1000)
+        ranked = sorted(((package, statistics.median(times)) for package, times in packages.items()),
+                        key=lambda item: -item[1])
+        results[entry] = {
+            "import_ms": round(statistics.median(totals), 1),
+            "modules": len(profiles[0]),
+            "top_packages_ms": {package: round(ms, 1) for package, ms in ranked[:top]},
+        }
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Server start-up
+
+def wait_until_ready(url, timeout=60.0):
+    """Poll the readiness check until it returns 200 (it is 503 while warming up)."""
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=5.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"{url} was not ready within {timeout:.0f}s")
+
+
+def bench_server(warmup, pdf, load_seconds, workdir):
+    import httpx
+
+    mock_port, api_port = free_port(), free_port()
+    mock = subprocess.Popen([sys.executable, str(BENCH_DIR / "mock_ollama.py"), "--port", str(mock_port),
+                             "--load-seconds", str(load_seconds)], stdout=subprocess.DEVNULL)
+    server = None
+    try:
+        wait_for(f"http://127.0.0.1:{mock_port}/api/tags")
+        scratch = workdir / ("warmup" if warmup else "cold")
+        env = dict(os.environ, **{
+            "OLLAMA_BASE_URL": f"http://127.0.0.1:{mock_port}",
+            "OLLAMA_RETRIES": "0",
+            "WARMUP_ENABLED": str(warmup).lower(),
+            "TEXT_CACHE_PATH": str(scratch / "text_cache.sqlite3"),
+            "LLM_CACHE_PATH": str(scratch / "llm_cache.sqlite3"),
+            "HISTORY_DB_PATH": str(scratch / "history.sqlite3"),
+            "PDF_ENGINE_CALIBRATION_PATH": str(scratch / "extraction_engine.json"),
+            "UPLOAD_DIR": str(scratch / "uploads"),
+        })
+        base_url = f"http://127.0.0.1:{api_port}"
+        started = time.perf_counter()
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(api_port),
+                                   "--log-level", "warning"], cwd=BACKEND_DIR, env=env)
+        wait_for(f"{base_url}/", timeout=60.0)
+        listening = time.perf_counter() - started
+        wait_until_ready(f"{base_url}/api/health")
+        ready = time.perf_counter() - started
+
+        first_request = time.perf_counter()
+        with open(pdf, "rb") as file:
+            response = httpx.post(f"{base_url}/api/summarize", params={"use_cache": "false"},
+                                  files={"file": (pdf.name, file, "application/pdf")}, timeout=300.0)
+        response.raise_for_status()
+        first_summary = time.perf_counter() - first_request
+    finally:
+        for process in (server, mock):
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+    return {
+        "listening_ms": round(listening * 1000, 1),
+        "ready_ms": round(ready * 1000, 1),
+        "first_summary_ms": round(first_summary * 1000, 1),
+        "ready_to_first_summary_ms": round((ready + first_summary) * 1000, 1),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {"imports": bench_imports(args.runs, args.top)}
+    for entry, profile in results["imports"].items():
+        print(f"\n⏱️  {entry} import: {profile['import_ms']} ms ({profile['modules']} modules)")
+        for package, ms in profile["top_packages_ms"].items():
+            print(f"   {package:<28} {ms:>8.1f} ms")
+
+    if not args.skip_server:
+        workdir = Path(tempfile.mkdtemp(prefix="deepdfscan-startup-"))
+        try:
+            pdf = Path(write_pdf(str(workdir / "synthetic_5p.pdf"), 5))
+            results["server"] = {("warmup" if warmup else "cold"): bench_server(warmup, pdf, args.load_seconds,
+                                                                                 workdir)
+                                 for warmup in (False, True)}
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(f"\n🚀 API server start-up (model load {args.load_seconds:.1f}s)")
+        print(f"   {'':<8} {'listening':>10} {'ready':>10} {'1st summary':>12} {'ready+1st':>10}")
+        for mode, timings in results["server"].items():
+            print(f"   {mode:<8} {timings['listening_ms']:>10.0f} {timings['ready_ms']:>10.0f} "
+                  f"{timings['first_summary_ms']:>12.0f} {timings['ready_to_first_summary_ms']:>10.0f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
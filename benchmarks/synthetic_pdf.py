@@ -0,0 +1,68 @@
+"""
+Synthetic text PDFs for benchmarks.
+
+Writes minimal single-font PDFs by hand, so no PDF-writing library is
+needed. The text is CV-like (headings, skills, experience bullets) and
+seeded, so the same arguments always produce the same file.
+"""
+
+import random
+from typing import List
+
+HEADINGS = ["PROFILE", "EXPERIENCE", "SKILLS", "EDUCATION", "PROJECTS", "CERTIFICATIONS"]
+SKILLS = ["python", "java", "typescript", "react", "docker", "kubernetes", "aws", "azure", "sql", "postgresql",
+          "terraform", "agile", "scrum", "machine learning", "data analysis", "project management",
+          "stakeholder management", "ci/cd", "git", "linux", "leadership", "communication"]
+WORDS = ["delivered", "designed", "built", "led", "migrated", "improved", "platform", "service", "pipeline",
+         "customers", "reporting", "latency", "reliability", "team", "roadmap", "analytics", "integration",
+         "automation", "budget", "quarterly", "stakeholders", "release", "quality", "metrics", "workflow"]
+LINES_PER_PAGE = 45
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(rng: random.Random, page_no: int) -> List[str]:
+    lines = []
+    while len(lines) < LINES_PER_PAGE:
+        heading = HEADINGS[(page_no + len(lines)) % len(HEADINGS)]
+        lines.append(heading)
+        for _ in range(rng.randint(4, 9)):
+            words = rng.sample(WORDS, 6) + rng.sample(SKILLS, 2)
+            rng.shuffle(words)
+            lines.append("- " + " ".join(words).capitalize() + ".")
+        lines.append("")
+    return lines[:LINES_PER_PAGE]
+
+
+def write_pdf(path: str, pages: int, seed: int = 0) -> str:
+    """Write a ``pages``-page text PDF to ``path`` and return the path."""
+    rng = random.Random(seed * 7919 + pages)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_no in range(1, pages + 1):
+        lines = _page_lines(rng, page_no)
+        text = "\n".join(f"({_escape(line)}) Tj T*" for line in lines)
+        stream = f"BT /F1 10 Tf 14 TL 50 760 Td\n{text}\nET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as file:
+        file.write(output)
+    return path
@@ -1,25 +1,95 @@
 import os
 import sys
 from pathlib import Path
-import PyPDF2
-import subprocess
-import json
+import argparse
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def parse_pdf(pdf_path):
-    """Extract text from PDF using PyPDF2."""
+# Shared services live in the backend package
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from app.services.pdf_service import default_policy, extract_pages, join_pages
+from app.services.pdf_engines import (DEFAULT_CALIBRATION_PATH, DEFAULT_MIN_YIELD, calibrate, installed_engines,
+                                      save_calibration)
+from app.services.batch_ranking import ProfileBuilder, list_documents, rank_documents, write_result
+from app.services.ingest_pipeline import (CHECKPOINT_NAME, COMPARE, DEFAULT_POLL_SECONDS, DEFAULT_QUEUE_SIZE, SUMMARIZE,
+                                          Checkpoint, ItemPlanner, ManifestError, Pipeline, Stage, read_manifest,
+                                          scan_directory, watch_directory, write_json_atomic)
+from app.services.text_cache import default_text_cache, hash_file
+from app.services.history_store import default_history_store
+from app.services.llm_cache import default_llm_cache, fingerprint
+from app.services.summarization import SummaryConfig, summarize_map_reduce
+from app.services.chunking import estimate_tokens
+from app.services.cv_sections import SECTIONS_VERSION, build_section_profile, diff_sections, match_delta
+from app.services.keyword_extractor import (EXTRACTOR_VERSION, KeywordIndex, extract_keywords, keyword_mode, normalize,
+                                            rank_missing)
+from app.services.semantic_index import semantic_match
+from app.services.single_flight import SingleFlight
+from app.services.structured_output import StructuredOutputError, StructuredOutputStats, generate_structured
+from app.services.token_budget import analysis_prompt_tokens, keyword_prompt_tokens, select_keywords, select_text
+from app.utils.ai_client import OllamaError
+from app.utils.ollama_pool import default_pool_client
+from app.utils.lazy_import import lazy_import
+from app.utils.metrics import PIPELINE_STAGES, span, stage_totals
+
+# Only the CV/job analysis needs pydantic
+analysis_models = lazy_import("app.models.analysis_models")
+
+# Extracted text and model response caches (configured via TEXT_CACHE_* / LLM_CACHE_* environment variables)
+text_cache = default_text_cache()
+llm_cache = default_llm_cache()
+
+# Concurrent extractions of the same PDF content (a CV compared with several job adverts) run once
+extraction_flights = SingleFlight()
+
+# Documents, summaries and comparison results kept across runs (configured via HISTORY_* environment
+# variables); HISTORY_USER separates the records of people sharing one history database
+history_store = default_history_store()
+history_user = os.environ.get("HISTORY_USER", "")
+
+# Pooled keep-alive clients to one or more Ollama endpoints, with per-task models (configured via
+# OLLAMA_* environment variables); falls back to `ollama run` only when no endpoint is reachable
+ollama_client = default_pool_client(subprocess_fallback=True)
+
+# Keywords -> documents, for every document profiled in this process
+keyword_index = KeywordIndex()
+
+# Parse/repair/retry counters for JSON answers from the model
+structured_stats = StructuredOutputStats()
+
+# Approximate prompt tokens actually sent to the model (cache hits excluded)
+prompt_usage = {"calls": 0, "tokens": 0}
+_usage_lock = threading.Lock()
+
+def parse_pdf(pdf_path, workers=None, verbose=True, digest=None):
+    """Extract text from PDF using the shared page-sharded extraction engine.
+    
+    With verbose=False only errors are printed, so parsing can run in the
+    background while the console is used for input. digest is the file's
+    SHA-256, when already known; concurrent parses of the same content
+    share one extraction.
+    """
     try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            
+        if verbose:
             print(f"Parsing PDF: {pdf_path}")
-            print(f"Number of pages: {len(pdf_reader.pages)}")
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                print(f"Processing page {page_num + 1}...")
-                text += page.extract_text() + "\n"
-            
-            return text.strip()
+        digest = digest or hash_file(pdf_path)
+        result = extraction_flights.do(digest, lambda: extract_pages(pdf_path, workers=workers, cache=text_cache,
+                                                                     digest=digest))
+        
+        if verbose:
+            print(f"Number of pages: {result.page_count}")
+            if result.cached:
+                print(f"✓ Loaded extracted text from cache in {result.total_seconds:.2f}s")
+            else:
+                print(f"Extracted in {result.total_seconds:.2f}s using {result.workers} worker(s)")
+                for page in result.pages:
+                    print(f"Processed page {page.page_no} in {page.seconds:.3f}s")
+        
+        return result.text.strip()
     except FileNotFoundError:
         print(f"Error: PDF file '{pdf_path}' not found.")
         return ""
@@ -27,28 +97,75 @@ def parse_pdf(pdf_path):
         print(f"Error reading PDF: {e}")
         return ""
 
-def call_gemma3(prompt):
-    """Call Gemma3 AI model with a given prompt."""
+def call_gemma3(prompt, use_cache=True, format=None, task=None):
+    """Call Gemma3 AI model with a given prompt, answering repeated prompts from the response cache.
+    
+    format ("json" or a JSON schema) constrains the answer to JSON. task
+    (keywords, summary, analysis) picks the model from OLLAMA_TASK_MODELS.
+    """
+    model = ollama_client.model_for(task)
+    if llm_cache is None:
+        return _run_gemma3(prompt, model, format)
+    return llm_cache.get_or_generate(model, prompt, None, lambda: _run_gemma3(prompt, model, format),
+                                     use_cache=use_cache, format=format)
+
+def discard_cached_response(prompt, format=None, task=None):
+    """Forget a cached answer that turned out to be unusable."""
+    if llm_cache is not None:
+        llm_cache.discard(fingerprint(ollama_client.model_for(task), prompt, None, format))
+
+def _run_gemma3(prompt, model, format=None):
+    """Run a model through the shared Ollama endpoint pool."""
+    with _usage_lock:
+        prompt_usage["calls"] += 1
+        prompt_usage["tokens"] += estimate_tokens(prompt)
     try:
-        process = subprocess.Popen(
-            ['ollama', 'run', 'gemma3'],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        process.stdin.write(prompt.encode())
-        stdout, stderr = process.communicate()
-        
-        if stderr:
-            print(f"Warning: {stderr.decode()}")
-        
-        return stdout.decode().strip()
-    except Exception as e:
+        return ollama_client.generate(prompt, model=model, format=format).strip()
+    except OllamaError as e:
         print(f"Error calling Gemma3: {e}")
         return ""
 
-def extract_keywords_ai(text, context="professional"):
-    """Extract keywords using AI (Gemma3) for better context understanding."""
+def extract_keywords_ai(text, context="professional", use_cache=True, mode=None, strict=False, verbose=True):
+    """Extract keywords using AI (Gemma3) for better context understanding.
+    
+    Accepts text or a page stream from iter_pages(). The highest-value
+    sections (skills, experience, requirements, ...) are packed into the
+    KEYWORD_PROMPT_TOKENS budget rather than cutting the text off at a
+    fixed length.
+    
+    mode (default: KEYWORD_MODE, else "ai") picks the extractor: "fast" uses
+    the local lexicon/TF-IDF extractor with no model call, "hybrid" merges
+    the model's keywords (normalized) with locally found skills and falls
+    back to the local ones if the model returns nothing.
+    
+    With strict, "ai" mode returns None rather than [] when the model gave no
+    answer, so a failed call is not mistaken for a text without keywords.
+    verbose=False drops the progress lines.
+    """
+    mode = keyword_mode(mode)
+    text = join_pages(text)
+    if mode == "fast":
+        keywords = extract_keywords(text)
+        if verbose:
+            print(f"⚡ {context}: {len(keywords)} keywords extracted locally")
+        return keywords
+    
+    ai_keywords = _extract_keywords_model(text, context, use_cache, verbose)
+    if mode == "ai":
+        return ai_keywords if ai_keywords is not None or strict else []
+    local_keywords = extract_keywords(text)
+    if not ai_keywords:
+        if verbose:
+            print(f"⚡ {context}: no keywords from the model, using {len(local_keywords)} local ones")
+        return local_keywords
+    return list(dict.fromkeys([normalize(kw) for kw in ai_keywords] + local_keywords))
+
+def _extract_keywords_model(text, context, use_cache, verbose=True):
+    """Ask the model for a comma-separated keyword list; None when it gives no answer."""
+    with span("prompt_build"):
+        budget = select_text(text, keyword_prompt_tokens())
+    if verbose:
+        print(f"📏 {context}: sending ~{budget.tokens} of ~{budget.source_tokens} tokens")
     prompt = f"""
 Please analyze the following {context} text and extract the most important keywords and skills. 
 Focus on:
@@ -62,15 +179,15 @@ Focus on:
 Return only a comma-separated list of keywords, no explanations:
 
 Text to analyze:
-{text[:3000]}  # Limit text length for AI processing
+{budget.text}
 """
     
-    response = call_gemma3(prompt)
+    response = call_gemma3(prompt, use_cache=use_cache, task="keywords")
     if response:
         # Parse comma-separated keywords
         keywords = [kw.strip().lower() for kw in response.split(',') if kw.strip()]
         return [kw for kw in keywords if len(kw) > 2 and kw.replace(' ', '').isalpha()]
-    return []
+    return None
 
 def get_job_advert_text():
     """Get job advert text from user input via console."""
@@ -107,8 +224,21 @@ def get_job_advert_text():
     print(f"\n✓ Job advert captured: {len(job_text)} characters")
     return job_text
 
-def ai_keyword_analysis(cv_keywords, job_keywords, cv_text, job_text):
-    """Use AI to provide intelligent analysis of keyword matching."""
+def ai_keyword_analysis(cv_keywords, job_keywords, cv_text, job_text, use_cache=True, verbose=True):
+    """Use AI to provide intelligent analysis of keyword matching.
+    
+    A quarter of the ANALYSIS_PROMPT_TOKENS budget goes to the keyword
+    lists; the rest is shared by the job advert and the CV, with the CV
+    getting whatever the advert leaves unused.
+    """
+    budget = analysis_prompt_tokens()
+    keyword_budget = budget // 8
+    with span("prompt_build"):
+        cv_keyword_list = select_keywords(cv_keywords, keyword_budget)
+        job_keyword_list = select_keywords(job_keywords, keyword_budget)
+        job_budget = select_text(job_text, (budget - 2 * keyword_budget) // 2)
+        cv_budget = select_text(cv_text, budget - 2 * keyword_budget - job_budget.tokens)
+    
     prompt = f"""
 Analyze this CV and job advert for keyword optimization. Provide a JSON response with the following structure:
 
@@ -120,66 +250,275 @@ Analyze this CV and job advert for keyword optimization. Provide a JSON response
     "priority_additions": ["top", "3", "keywords", "to", "add", "immediately"]
 }}
 
-CV Keywords: {', '.join(cv_keywords[:50])}
-Job Keywords: {', '.join(job_keywords[:50])}
+CV Keywords: {', '.join(cv_keyword_list)}
+Job Keywords: {', '.join(job_keyword_list)}
 
 Job Requirements Summary:
-{job_text[:1000]}
+{job_budget.text}
 
 CV Summary:
-{cv_text[:1000]}
+{cv_budget.text}
 """
+    if verbose:
+        print(f"📏 Analysis: sending ~{estimate_tokens(prompt)} tokens "
+              f"(job ~{job_budget.tokens}/{job_budget.source_tokens}, cv ~{cv_budget.tokens}/{cv_budget.source_tokens})")
     
-    response = call_gemma3(prompt)
-    
-    # Try to parse JSON response, fallback to basic analysis if parsing fails
+    # JSON is requested from the model, repaired if need be and validated; only an
+    # unusable answer is re-prompted (STRUCTURED_OUTPUT_RETRIES times at most)
     try:
-        import json
-        analysis = json.loads(response)
-        return analysis
-    except:
-        # Fallback to basic analysis
+        analysis = generate_structured(
+            lambda attempt, format: call_gemma3(attempt, use_cache, format=format, task="analysis"),
+            prompt, analysis_models.KeywordAnalysis, stats=structured_stats,
+            on_invalid=lambda attempt, format: discard_cached_response(attempt, format, task="analysis"))
+        return analysis.model_dump()
+    except StructuredOutputError as e:
+        print(f"⚠️  {e}")
+        # Fallback to a local comparison: missing skills ranked lexicon-first, similar concepts by vector match
+        missing = rank_missing(job_keywords, cv_keywords)
         return {
             "match_analysis": "AI analysis temporarily unavailable, using basic comparison",
-            "missing_critical": list(set(job_keywords) - set(cv_keywords))[:5],
+            "missing_critical": missing[:5],
             "recommendations": ["Add missing keywords to your CV", "Focus on relevant experience"],
-            "synonym_matches": [],
-            "priority_additions": list(set(job_keywords) - set(cv_keywords))[:3]
+            "synonym_matches": semantic_match(cv_keywords, job_keywords).synonym_matches(),
+            "priority_additions": missing[:3]
         }
 
-def compare_cv_with_job(cv_pdf_path):
+def _timed(timings, label, func, *args, **kwargs):
+    """Call func and record its wall-clock duration in timings[label]."""
+    with span(label, timings):
+        return func(*args, **kwargs)
+
+def print_stage_metrics():
+    """Print call counts and average durations of the instrumented pipeline stages."""
+    totals = stage_totals()
+    for stage in PIPELINE_STAGES:
+        if stage in totals:
+            count, seconds = totals[stage]
+            print(f"   • {stage}: {count} × {seconds / count:.3f}s avg ({seconds:.2f}s total)")
+
+def keyword_version(mode):
+    """Identifies the keyword extractor, so keywords from another model or prompt budget are not reused."""
+    if mode == "fast":
+        return f"fast/{EXTRACTOR_VERSION}"
+    return f"{mode}/{ollama_client.model_for('keywords')}/{keyword_prompt_tokens()}/{EXTRACTOR_VERSION}"
+
+def remember_document(path, text=None):
+    """Record a document and its page text in the history.
+    
+    text is given for a pasted job advert, which has no file; path then only
+    names it. Plain-text documents are stored as a single page. Returns the
+    document record, or None when history is disabled or recording failed.
+    """
+    if history_store is None:
+        return None
+    try:
+        if text is not None:
+            data = text.encode("utf-8")
+            digest, size = hashlib.sha256(data).hexdigest(), len(data)
+        else:
+            digest, size = hash_file(path), os.path.getsize(path)
+        is_pdf = text is None and path.lower().endswith(".pdf")
+        page_count = None
+        if not history_store.has_pages(digest):
+            if is_pdf:
+                pages = [(page.page_no, page.text) for page in extract_pages(path, cache=text_cache).pages]
+            else:
+                pages = [(1, text if text is not None else load_document_text(path))]
+            history_store.put_pages(digest, pages)
+            page_count = len(pages)
+        return history_store.add_document(digest, os.path.basename(path), size, page_count, user_id=history_user,
+                                          kind="pdf" if is_pdf else "text")
+    except Exception as e:
+        print(f"⚠️  Could not record {path} in the history: {e}")
+        return None
+
+def stored_keywords(document, kind, mode, use_cache, extract, verbose=True):
+    """Keywords of a recorded document ("cv" or "job"): stored ones when present, else extract() and store."""
+    version = keyword_version(mode)
+    if document is not None and use_cache:
+        keywords = history_store.get_artifact(document["sha256"], f"keywords-{kind}", version)
+        if keywords:
+            if verbose:
+                print(f"✓ {document['filename']}: reusing {len(keywords)} stored keywords")
+            return keywords
+    keywords = extract()
+    if document is not None and keywords:
+        history_store.put_artifact(document["sha256"], f"keywords-{kind}", version, keywords)
+    return keywords
+
+def cv_section_profile(cv_text, mode, use_cache, verbose=True):
+    """Per-section keywords of a CV; sections unchanged since an earlier run reuse their stored keywords.
+    
+    A CV none of whose sections have been seen before is extracted whole, in
+    one model call, rather than section by section, if it fits the keyword
+    prompt budget.
+    """
+    version = f"{keyword_version(mode)}/{SECTIONS_VERSION}"
+    lookup = store = None
+    if history_store is not None:
+        if use_cache:
+            lookup = lambda digest: history_store.get_artifact(digest, "keywords-section", version)
+        store = lambda digest, keywords: history_store.put_artifact(digest, "keywords-section", version, keywords)
+    profile = build_section_profile(
+        cv_text,
+        lambda section: extract_keywords_ai(section.text, f"CV {section.key}", use_cache=use_cache, mode=mode,
+                                            strict=True, verbose=verbose),
+        lookup, store,
+        extract_all=lambda text: extract_keywords_ai(text, "CV", use_cache=use_cache, mode=mode, strict=True,
+                                                     verbose=verbose),
+        max_tokens=None if keyword_mode(mode) == "fast" else keyword_prompt_tokens())
+    if verbose and profile.whole:
+        print(f"✓ CV: analysed whole, keywords split over {len(profile.extracted)} section(s)")
+    elif verbose:
+        print(f"✓ CV: {len(profile.extracted)} section(s) analysed, {len(profile.reused)} unchanged and reused")
+    return profile
+
+def previous_comparison(cv_document, job_document, mode):
+    """Result of the latest comparison of a CV with the same file name against the same job advert.
+    
+    Only runs with the same keyword extractor count, so the delta reflects the edit.
+    """
+    if history_store is None or cv_document is None or job_document is None:
+        return None
+    analyses, _ = history_store.list_analyses(user_id=history_user, type="cv_comparison",
+                                              filename=cv_document["filename"], limit=20)
+    for analysis in analyses:
+        result = (history_store.get_analysis(analysis["analysis_id"]) or {}).get("results") or {}
+        if result.get("job_file_id") == job_document["file_id"] and "cv_keywords" in result \
+                and result.get("keyword_version") == keyword_version(mode):
+            return result
+    return None
+
+def record_analysis(type, document, result, summary=None):
+    """Record a completed analysis of document in the history; returns its id."""
+    if history_store is None or document is None:
+        return None
+    return history_store.record_analysis(type, "completed", result, user_id=history_user,
+                                         file_id=document["file_id"], sha256=document["sha256"],
+                                         filename=document["filename"], summary=summary)
+
+def compare_cv_with_job(cv_pdf_path, use_cache=True, mode=None):
     """Compare CV PDF with job advert text using AI analysis."""
     print("\n" + "="*60)
     print("🎯 AI-POWERED CV & JOB ADVERT ANALYSIS")
     print("="*60)
     
-    # Extract text from CV PDF
-    print("\n📄 Processing CV PDF...")
-    cv_text = parse_pdf(cv_pdf_path)
+    started = time.perf_counter()
+    timings = {}
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Extract text from CV PDF in the background while the job advert is pasted
+        print("\n📄 Processing CV PDF in the background...")
+        cv_future = executor.submit(_timed, timings, "CV parsing", parse_pdf, cv_pdf_path, verbose=False)
+        
+        # Get job advert text from console
+        job_text = get_job_advert_text()
+        
+        cv_text = cv_future.result()
     if not cv_text:
         print("❌ Failed to extract text from CV PDF.")
         return
-    
-    # Get job advert text from console
-    job_text = get_job_advert_text()
     if not job_text:
         print("❌ No job advert text provided.")
         return
     
-    print("\n🤖 Analyzing CV with Gemma3 AI...")
-    cv_keywords = extract_keywords_ai(cv_text, "CV")
+    result = analyse_cv_against_job(cv_pdf_path, cv_text, job_text, use_cache=use_cache, mode=mode, timings=timings)
+    timings["End-to-end"] = time.perf_counter() - started
+    print_comparison(result, timings)
+    return result
+
+def analyse_cv_against_job(cv_path, cv_text, job_text, job_path=None, use_cache=True, mode=None, timings=None,
+                           verbose=True):
+    """Keyword-match a CV against a job advert and run the AI analysis; returns the result recorded in the history.
+    
+    job_path names a saved job advert; without it job_text counts as pasted.
+    The result also carries the change since the latest comparison of the
+    same CV file against the same advert, when there is one. verbose=False
+    drops the progress lines, for unattended runs.
+    """
+    timings = {} if timings is None else timings
     
-    print("🤖 Analyzing job advert with Gemma3 AI...")
-    job_keywords = extract_keywords_ai(job_text, "job advert")
+    # Keywords stored by an earlier analysis of the same advert, or of the same CV sections, are reused
+    mode = keyword_mode(mode)
+    cv_document = remember_document(cv_path)
+    job_document = remember_document(job_path) if job_path else remember_document("job advert (pasted)", text=job_text)
+    previous = previous_comparison(cv_document, job_document, mode)
     
-    print("🧠 Performing intelligent keyword analysis...")
-    ai_analysis = ai_keyword_analysis(cv_keywords, job_keywords, cv_text, job_text)
+    # The two keyword extractions are independent, so run them concurrently
+    if verbose:
+        print("\n🤖 Analyzing CV and job advert with Gemma3 AI...")
+    keywords_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        cv_profile_future = executor.submit(_timed, timings, "CV keywords", cv_section_profile, cv_text, mode,
+                                            use_cache, verbose)
+        job_keywords_future = executor.submit(
+            _timed, timings, "Job keywords", stored_keywords, job_document, "job", mode, use_cache,
+            lambda: extract_keywords_ai(job_text, "job advert", use_cache=use_cache, mode=mode, verbose=verbose),
+            verbose)
+        cv_profile = cv_profile_future.result()
+        cv_keywords = cv_profile.merged_keywords
+        job_keywords = job_keywords_future.result()
+    timings["Keyword extraction (wall-clock)"] = time.perf_counter() - keywords_started
+    
+    if previous is not None and use_cache and set(previous["cv_keywords"]) == set(cv_keywords) \
+            and previous.get("ai_analysis"):
+        # The edit changed no keywords, so the last run's analysis still applies
+        if verbose:
+            print("✓ CV keywords unchanged since the last run; reusing its AI analysis")
+        ai_analysis = previous["ai_analysis"]
+    else:
+        if verbose:
+            print("🧠 Performing intelligent keyword analysis...")
+        ai_analysis = _timed(timings, "AI analysis", ai_keyword_analysis,
+                             cv_keywords, job_keywords, cv_text, job_text, use_cache=use_cache, verbose=verbose)
     
-    # Calculate basic statistics
     cv_keywords_set = set(cv_keywords)
     job_keywords_set = set(job_keywords)
     matching_keywords = cv_keywords_set.intersection(job_keywords_set)
     missing_keywords = job_keywords_set - cv_keywords_set
+    semantic = semantic_match(cv_keywords, job_keywords)
+    
+    # Before/after the latest edit, against the same job advert
+    since_last_run = None
+    if previous is not None:
+        changes = diff_sections(previous.get("cv_sections", []), cv_profile.sections)
+        delta = match_delta(previous["cv_keywords"], cv_keywords, job_keywords)
+        since_last_run = {
+            "changed_sections": changes.changed,
+            "added_sections": changes.added,
+            "removed_sections": changes.removed,
+            "previous_score": delta.previous_score,
+            "score": delta.score,
+            "newly_matched": delta.newly_matched,
+            "no_longer_matched": delta.no_longer_matched,
+            "added_keywords": delta.added_keywords,
+            "removed_keywords": delta.removed_keywords
+        }
+    
+    result = {
+        "job_file_id": job_document["file_id"] if job_document else None,
+        "match_percentage": (len(matching_keywords) / len(job_keywords_set) * 100) if job_keywords_set else None,
+        "semantic_score": semantic.score,
+        "matching_keywords": sorted(matching_keywords),
+        "missing_keywords": sorted(missing_keywords),
+        "similar_concepts": semantic.synonym_matches(),
+        "cv_keywords": cv_keywords,
+        "job_keywords": job_keywords,
+        "keyword_version": keyword_version(mode),
+        "cv_sections": cv_profile.fingerprints(),
+        "since_last_run": since_last_run,
+        "ai_analysis": ai_analysis
+    }
+    record_analysis("cv_comparison", cv_document, result, summary=ai_analysis.get("match_analysis"))
+    return result
+
+def print_comparison(result, timings):
+    """Print the report of a CV/job advert comparison."""
+    cv_keywords = result["cv_keywords"]
+    job_keywords = result["job_keywords"]
+    matching_keywords = result["matching_keywords"]
+    missing_keywords = result["missing_keywords"]
+    ai_analysis = result["ai_analysis"]
     
     # Display results
     print("\n" + "="*60)
@@ -191,10 +530,13 @@ def compare_cv_with_job(cv_pdf_path):
     print(f"   • AI-extracted job keywords: {len(job_keywords)}")
     print(f"   • Direct keyword matches: {len(matching_keywords)}")
     print(f"   • Missing keywords: {len(missing_keywords)}")
+    print(f"   • Prompt tokens sent: ~{prompt_usage['tokens']} over {prompt_usage['calls']} model call(s)")
+    print(f"   • JSON parse failures: {structured_stats.parse_failures}/{structured_stats.attempts} "
+          f"({structured_stats.parse_failure_rate:.0%}), {structured_stats.retries} retry(ies)")
     
     # Calculate match percentage
-    if job_keywords_set:
-        match_percentage = (len(matching_keywords) / len(job_keywords_set)) * 100
+    match_percentage = result["match_percentage"]
+    if match_percentage is not None:
         print(f"\n🎯 AI KEYWORD MATCH SCORE: {match_percentage:.1f}%")
         
         if match_percentage < 30:
@@ -205,6 +547,28 @@ def compare_cv_with_job(cv_pdf_path):
             print("   👍 GOOD - Strong keyword alignment")
         else:
             print("   🎉 EXCELLENT - Outstanding keyword coverage!")
+        print(f"   🧭 Semantic match score (near matches count): {result['semantic_score']:.1f}%")
+    
+    # Before/after the latest edit, against the same job advert
+    since = result["since_last_run"]
+    if since is not None:
+        print("\n📊 SINCE THE LAST RUN:")
+        sections = (("Changed", since["changed_sections"]), ("Added", since["added_sections"]),
+                    ("Removed", since["removed_sections"]))
+        if any(keys for _, keys in sections):
+            for label, keys in sections:
+                if keys:
+                    print(f"   • {label} sections: {', '.join(keys)}")
+        else:
+            print("   • No section changed")
+        if since["previous_score"] is not None and since["score"] is not None:
+            print(f"   • Match score: {since['previous_score']:.1f}% → {since['score']:.1f}% "
+                  f"({since['score'] - since['previous_score']:+.1f})")
+        if since["newly_matched"]:
+            print(f"   • Now matched: {', '.join(since['newly_matched'])}")
+        if since["no_longer_matched"]:
+            print(f"   • No longer matched: {', '.join(since['no_longer_matched'])}")
+        print(f"   • CV keywords: +{len(since['added_keywords'])} / -{len(since['removed_keywords'])}")
     
     # AI Analysis Results
     print(f"\n🧠 AI ANALYSIS:")
@@ -212,10 +576,9 @@ def compare_cv_with_job(cv_pdf_path):
     
     if matching_keywords:
         print(f"\n✅ MATCHING KEYWORDS ({len(matching_keywords)}):")
-        matching_sorted = sorted(matching_keywords)
         # Display in columns for better readability
-        for i in range(0, len(matching_sorted), 4):
-            row_keywords = matching_sorted[i:i+4]
+        for i in range(0, len(matching_keywords), 4):
+            row_keywords = matching_keywords[i:i+4]
             print("   " + " | ".join(f"{kw:<15}" for kw in row_keywords))
     
     # AI-identified critical missing keywords
@@ -225,11 +588,16 @@ def compare_cv_with_job(cv_pdf_path):
         for i, keyword in enumerate(critical_missing[:10], 1):
             print(f"   {i:2d}. {keyword}")
     
-    # AI-detected synonym matches
-    synonym_matches = ai_analysis.get('synonym_matches', [])
-    if synonym_matches:
+    # Vector-matched similar concepts, then any the AI detected on top
+    if result["similar_concepts"]:
+        print(f"\n🔄 SIMILAR CONCEPTS (job ~ CV):")
+        for keyword in result["similar_concepts"][:5]:
+            print(f"   • {keyword}")
+    
+    ai_synonyms = ai_analysis.get('synonym_matches', [])
+    if ai_synonyms:
         print(f"\n🔄 AI-DETECTED SIMILAR CONCEPTS:")
-        for keyword in synonym_matches[:5]:
+        for keyword in ai_synonyms[:5]:
             print(f"   • {keyword}")
     
     # AI Recommendations
@@ -245,21 +613,356 @@ def compare_cv_with_job(cv_pdf_path):
         print(f"\n🎯 IMMEDIATE PRIORITY ADDITIONS:")
         print(f"   Add these keywords ASAP: {', '.join(priority_adds)}")
     
+    print(f"\n⏱️  TIMINGS:")
+    for stage, seconds in timings.items():
+        print(f"   • {stage}: {seconds:.2f}s")
+    print_stage_metrics()
+    
     print(f"\n🚀 NEXT STEPS:")
     print("   1. Add the priority keywords to your CV")
     print("   2. Incorporate missing keywords naturally into job descriptions")
     print("   3. Update your skills section with relevant technologies")
     print("   4. Use keyword variations to avoid over-repetition")
-    print("   5. Re-run this analysis after updates to track improvement")
+    print("   5. Re-run this analysis after updates to track improvement (only edited sections are re-analysed)")
     
     print("\n" + "="*60)
     print("✨ AI Analysis Complete! Your CV is now optimized for ATS!")
     print("="*60)
 
-def summarize_text(text):
-    """AI summarization using Ollama/Gemma3."""
-    prompt = f"Summarize the following text concisely and clearly:\n\n{text}"
-    return call_gemma3(prompt)
+def summarize_text(text, use_cache=True, verbose=True):
+    """AI summarization using Ollama/Gemma3. Accepts text or a page stream.
+    
+    Long documents are chunked, summarized in parallel and reduced
+    (see SUMMARY_* environment variables). verbose=False drops the timing line.
+    """
+    result = summarize_map_reduce(text, lambda prompt: call_gemma3(prompt, use_cache=use_cache, task="summary"),
+                                  SummaryConfig.from_env())
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result.timings.items())
+    if verbose:
+        print(f"⏱️  Summarized {result.chunks} chunk(s) in {result.reduce_levels} reduce level(s): {stages}")
+    return result.summary
+
+def summarize_pdf(pdf_path, text, use_cache=True, verbose=True):
+    """Summarize a parsed PDF, reusing the stored summary of the same content when there is one."""
+    document = remember_document(pdf_path)
+    version = SummaryConfig.from_env().version(ollama_client.model_for("summary"))
+    stored = history_store.get_artifact(document["sha256"], "summary", version) if document and use_cache else None
+    if stored:
+        if verbose:
+            print("✓ Reusing the stored summary of this document")
+        summary = stored["summary"]
+    else:
+        summary = summarize_text(text, use_cache=use_cache, verbose=verbose)
+        if document is not None:
+            history_store.put_artifact(document["sha256"], "summary", version, {"summary": summary, "status": "success"})
+    record_analysis("summarize", document, {"summary": summary}, summary=summary)
+    return summary
+
+def load_document_text(path):
+    """Text of a PDF, or of a plain-text document such as a saved job advert."""
+    if path.lower().endswith(".pdf"):
+        return parse_pdf(path, verbose=False)
+    try:
+        with open(path, encoding="utf-8", errors="replace") as file:
+            return file.read().strip()
+    except OSError as e:
+        print(f"Error reading {path}: {e}")
+        return ""
+
+def batch_rank(cv_path, jobs_path, top_k=5, workers=4, output=None, use_cache=True, mode=None, search=None):
+    """Rank CVs against job adverts; either side may be a single file or a directory.
+    
+    Each document is profiled once (profiles are cached alongside the
+    extracted text), every pair gets the keyword match score, and only the
+    top_k pairs get the AI analysis. The full ranking is written to output
+    as CSV or JSON, by extension. search lists the documents that mention
+    all of the given keywords.
+    """
+    mode = keyword_mode(mode)
+    cv_paths = list_documents(cv_path)
+    job_paths = list_documents(jobs_path)
+    if not cv_paths or not job_paths:
+        print("❌ Need at least one CV and one job advert.")
+        return None
+    
+    print(f"\n📦 Ranking {len(cv_paths)} CV(s) against {len(job_paths)} job advert(s)...")
+    contexts = {"cv": "CV", "job": "job advert"}
+    builder = ProfileBuilder(
+        load_text=load_document_text,
+        extract_keywords=lambda text, kind: extract_keywords_ai(text, contexts[kind], use_cache=use_cache, mode=mode),
+        version=keyword_version(mode),
+        cache=text_cache if use_cache else None,
+        index=keyword_index,
+        store=history_store if use_cache else None
+    )
+    result = rank_documents(
+        cv_paths, job_paths, builder,
+        analyze=lambda pair: ai_keyword_analysis(pair.cv.keywords, pair.job.keywords, pair.cv.text,
+                                                 pair.job.text, use_cache=use_cache),
+        top_k=top_k,
+        workers=workers
+    )
+    
+    cached = sum(profile.cached for profile in result.cvs + result.jobs)
+    print(f"\n🏆 TOP MATCHES ({len(result.pairs)} pairs scored, {cached} cached profile(s)):")
+    for pair in result.pairs[:max(top_k, 10)]:
+        print(f"   {pair.rank:3d}. {pair.semantic_score:5.1f}% ({pair.score:.1f}% exact)  "
+              f"{pair.cv.name}  ↔  {pair.job.name}")
+        if pair.analysis:
+            print(f"        {pair.analysis.get('match_analysis', '')}")
+    
+    print("\n⏱️  TIMINGS:")
+    for stage, seconds in result.timings.items():
+        print(f"   • {stage}: {seconds:.2f}s")
+    print_stage_metrics()
+    print(f"   • Prompt tokens sent: ~{prompt_usage['tokens']} over {prompt_usage['calls']} model call(s)")
+    if structured_stats.attempts:
+        print(f"   • JSON parse failures: {structured_stats.parse_failures}/{structured_stats.attempts} "
+              f"({structured_stats.parse_failure_rate:.0%}), {structured_stats.retries} retry(ies)")
+    
+    if search:
+        terms = [term.strip() for term in search.split(",") if term.strip()]
+        found = keyword_index.search(terms, match_all=True)
+        print(f"\n🔎 DOCUMENTS MENTIONING {', '.join(terms)} ({len(found)}):")
+        for doc_id in sorted(found):
+            print(f"   • {doc_id}")
+    
+    if history_store is not None:
+        documents = {profile.path: remember_document(profile.path) for profile in result.cvs + result.jobs}
+        for pair in result.pairs:
+            if pair.analysis:
+                record_analysis("cv_comparison", documents[pair.cv.path],
+                                dict(pair.to_dict(), job_file_id=(documents[pair.job.path] or {}).get("file_id")),
+                                summary=pair.analysis.get("match_analysis"))
+    
+    if output:
+        write_result(result, output)
+        print(f"\n💾 Ranking written to {output}")
+    return result
+
+def ingest(source, output="ingest-results", task=SUMMARIZE, jobs=None, watch=False, interval=DEFAULT_POLL_SECONDS,
+           idle_exit=None, hash_workers=2, extract_workers=2, ai_workers=2, queue_size=DEFAULT_QUEUE_SIZE,
+           use_cache=True, mode=None, resume=True):
+    """Run a folder or manifest of documents through the hash → extract → analyse → write pipeline, unattended.
+    
+    source is a directory (scanned once, or polled with watch), a .json or
+    .jsonl manifest, or a single PDF. With task="compare" every PDF is a
+    CV and is compared with every job advert (.txt/.md files in the
+    directory, plus jobs). Each result is written to output as JSON and
+    checkpointed, so a restarted run skips finished work. Each stage has
+    its own workers, and queue_size bounds the backlog between stages.
+    """
+    mode = keyword_mode(mode)
+    # Results depend on the extracted text too, so a new extractor invalidates the checkpoint
+    extraction = default_policy().version
+    versions = {
+        SUMMARIZE: f"{SummaryConfig.from_env().version(ollama_client.model_for('summary'))}/{extraction}",
+        COMPARE: f"{keyword_version(mode)}/{ollama_client.model_for('analysis')}/{extraction}"
+    }
+    checkpoint = Checkpoint(os.path.join(output, CHECKPOINT_NAME))
+    stop = threading.Event()
+    claimed = set()
+    claimed_lock = threading.Lock()
+    
+    try:
+        if os.path.isdir(source):
+            planner = ItemPlanner(task, list_documents(jobs) if jobs else ())
+            if watch:
+                items = (item for batch in watch_directory(source, stop, interval, idle_exit)
+                         for item in planner.plan(batch))
+            else:
+                items = planner.plan(scan_directory(source))
+        elif source.lower().endswith((".json", ".jsonl")):
+            items = read_manifest(source)
+        else:
+            items = ItemPlanner(task, list_documents(jobs) if jobs else ()).plan([source])
+    except (ManifestError, ValueError, OSError) as e:
+        print(f"❌ {e}")
+        return None
+    
+    def hash_stage(item):
+        item.pdf_digest = hash_file(item.pdf)
+        item.job_digest = hash_file(item.job) if item.job else None
+        item.key = f"{item.task}:{item.pdf_digest}:{item.job_digest or '-'}:{versions[item.task]}"
+        with claimed_lock:
+            if item.key in claimed or (resume and checkpoint.is_done(item.key)):
+                return None
+            claimed.add(item.key)
+        return item
+    
+    def extract_stage(item):
+        item.text = parse_pdf(item.pdf, verbose=False, digest=item.pdf_digest)
+        if not item.text:
+            raise ValueError("no text extracted")
+        if item.job:
+            item.job_text = load_document_text(item.job)
+            if not item.job_text:
+                raise ValueError(f"no text in job advert {item.job}")
+        return item
+    
+    def analyse_stage(item):
+        if item.task == COMPARE:
+            item.result = analyse_cv_against_job(item.pdf, item.text, item.job_text, job_path=item.job,
+                                                 use_cache=use_cache, mode=mode, verbose=False)
+        else:
+            summary = summarize_pdf(item.pdf, item.text, use_cache=use_cache, verbose=False)
+            if not summary:
+                raise ValueError("the model returned no summary")
+            item.result = {"summary": summary}
+        return item
+    
+    def write_stage(item):
+        path = os.path.join(output, item.output_name())
+        seconds = time.perf_counter() - item.started
+        write_json_atomic(path, {
+            "task": item.task,
+            "pdf": item.pdf,
+            "job": item.job,
+            "sha256": item.pdf_digest,
+            "job_sha256": item.job_digest,
+            "version": versions[item.task],
+            "seconds": round(seconds, 3),
+            "result": item.result
+        })
+        checkpoint.record(item.key, output=path, pdf=item.pdf, job=item.job)
+        print(f"✓ {item.label} → {path} ({seconds:.1f}s)")
+        item.text = item.job_text = ""
+        return item
+    
+    def failed(stage, item, error):
+        if item is None:
+            print(f"❌ Reading {source} failed: {error}")
+            return
+        print(f"❌ {item.label}: {stage} failed: {error}")
+        if item.key:
+            checkpoint.record(item.key, status="failed", stage=stage, error=str(error), pdf=item.pdf, job=item.job)
+            with claimed_lock:
+                claimed.discard(item.key)
+    
+    pipeline = Pipeline([
+        Stage("hash", hash_stage, hash_workers),
+        Stage("extract", extract_stage, extract_workers),
+        Stage("analyse", analyse_stage, ai_workers),
+        Stage("write", write_stage, 1)
+    ], queue_size=queue_size, on_error=failed)
+    
+    kind = "manifest" if isinstance(items, list) and source.lower().endswith((".json", ".jsonl")) else task
+    print(f"\n📥 Ingesting {source} → {output} ({kind}{', watching' if watch and os.path.isdir(source) else ''}; "
+          f"{len(checkpoint)} item(s) already done)")
+    if watch and os.path.isdir(source):
+        print("   Press Ctrl-C to stop; unfinished items are picked up on the next run.")
+    stats = pipeline.run(items, stop)
+    
+    print(f"\n📊 THROUGHPUT{' (interrupted)' if stats.interrupted else ''}:")
+    print(f"   • {stats.completed} completed, {stats.skipped} skipped (already done), {stats.failed} failed "
+          f"of {stats.fed} in {stats.seconds:.1f}s ({stats.throughput:.2f} items/s)")
+    print(f"\n   {'stage':<8} {'workers':>7} {'done':>5} {'failed':>6} {'avg s':>7} {'blocked s':>9} {'busy':>6}")
+    for stage in stats.stages:
+        row = stage.to_dict(stats.seconds)
+        print(f"   {stage.name:<8} {stage.workers:>7} {stage.processed:>5} {stage.failed:>6} {row['avg_seconds']:>7.2f} "
+              f"{row['blocked_seconds']:>9.2f} {row['utilisation']:>6.0%}")
+    print_stage_metrics()
+    print(f"   • Prompt tokens sent: ~{prompt_usage['tokens']} over {prompt_usage['calls']} model call(s)")
+    write_json_atomic(os.path.join(output, "ingest-summary.json"), stats.to_dict())
+    return stats
+
+def show_history(search=None, type=None, limit=20):
+    """Print recent analyses, or the stored documents whose text matches search."""
+    if history_store is None:
+        print("❌ History is disabled (HISTORY_ENABLED).")
+        return
+    if search:
+        results = history_store.search(search, user_id=history_user, limit=limit)
+        print(f"\n🔎 {len(results)} MATCH(ES) FOR '{search}':")
+        for result in results:
+            print(f"   • {result['filename']} p.{result['page']}: {' '.join(result['snippet'].split())}")
+        return
+    analyses, total = history_store.list_analyses(user_id=history_user, type=type, limit=limit)
+    print(f"\n🗂️  ANALYSIS HISTORY ({len(analyses)} of {total}):")
+    for analysis in analyses:
+        print(f"   • {analysis['created_at'][:19]}  {analysis['type']:<13} {analysis['filename']}")
+        if analysis["summary"]:
+            print(f"        {' '.join(analysis['summary'].split())}")
+
+def calibrate_engines(paths=None, min_yield=DEFAULT_MIN_YIELD, rounds=3, save=True):
+    """Time every installed extraction engine on sample PDFs and pick the fastest with enough text.
+
+    The choice is saved to PDF_ENGINE_CALIBRATION_PATH, where PDF_ENGINE=auto
+    (the default) reads it.
+    """
+    pdfs = [path for path in paths or [str(Path(__file__).resolve().parent)]
+            for path in list_documents(path) if path.lower().endswith(".pdf")]
+    if not pdfs:
+        print("❌ No PDFs to calibrate with.")
+        return None
+    print(f"\n⏱️  Calibrating {', '.join(installed_engines())} on {len(pdfs)} PDF(s)...")
+    calibration = calibrate(pdfs, min_yield=min_yield, rounds=rounds)
+    print(f"\n   {'engine':<10} {'version':<10} {'pages/s':>9} {'yield':>7} {'empty':>6} {'errors':>7}")
+    for result in sorted(calibration.results, key=lambda result: result.pages_per_second, reverse=True):
+        marker = "✓" if result.engine == calibration.engine else " "
+        print(f" {marker} {result.engine:<10} {result.version:<10} {result.pages_per_second:>9.1f} "
+              f"{result.text_yield:>7.1%} {result.empty_pages:>6} {result.errors:>7}")
+    print(f"\n🏁 Fastest engine with at least {min_yield:.0%} text yield: {calibration.engine}")
+    if save:
+        path = os.environ.get("PDF_ENGINE_CALIBRATION_PATH", DEFAULT_CALIBRATION_PATH)
+        save_calibration(calibration, path)
+        print(f"💾 Saved to {path} (used when PDF_ENGINE=auto)")
+    return calibration
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="PDF2AI - AI-Powered PDF Analysis and CV Optimization Tool")
+    commands = parser.add_subparsers(dest="command")
+    batch = commands.add_parser("batch", help="Rank CVs against job adverts")
+    batch.add_argument("--cv", required=True, help="CV PDF, or a directory of CVs")
+    batch.add_argument("--jobs", required=True, help="Job advert (PDF or text), or a directory of them")
+    batch.add_argument("--top-k", type=int, default=5, help="Pairs that get the AI analysis (default: 5)")
+    batch.add_argument("--workers", type=int, default=4, help="Parallel profiling/analysis calls (default: 4)")
+    batch.add_argument("--output", "-o", help="Write the full ranking to this .csv or .json file")
+    batch.add_argument("--mode", choices=["fast", "ai", "hybrid"],
+                       help="Keyword extractor: local (fast), model (ai) or both (default: KEYWORD_MODE, else ai)")
+    batch.add_argument("--search", help="Also list documents mentioning all of these comma-separated keywords")
+    batch.add_argument("--no-cache", action="store_true", help="Ignore cached profiles and model responses")
+    history = commands.add_parser("history", help="List past analyses or search stored documents")
+    history.add_argument("--search", "-s", help="Full-text search over the text of stored documents")
+    history.add_argument("--type", choices=["summarize", "cv_comparison"], help="Only analyses of this type")
+    history.add_argument("--limit", type=int, default=20, help="Entries to show (default: 20)")
+    ingestion = commands.add_parser("ingest", help="Summarize or compare a folder or manifest of documents, unattended")
+    ingestion.add_argument("source", help="Directory of PDFs (and job adverts), a .json/.jsonl manifest, or a PDF")
+    ingestion.add_argument("--output", "-o", default="ingest-results",
+                           help="Directory for the JSON results and checkpoint (default: ingest-results)")
+    ingestion.add_argument("--task", choices=[SUMMARIZE, COMPARE], default=SUMMARIZE,
+                           help="For a directory: summarize each PDF, or compare each PDF (a CV) with each job advert")
+    ingestion.add_argument("--jobs", help="Job advert, or a directory of them, besides the .txt/.md files in source")
+    ingestion.add_argument("--watch", action="store_true", help="Keep polling the directory for new or changed files")
+    ingestion.add_argument("--interval", type=float, default=DEFAULT_POLL_SECONDS,
+                           help=f"Seconds between polls when watching (default: {DEFAULT_POLL_SECONDS:g})")
+    ingestion.add_argument("--idle-exit", type=float, help="Stop watching after this many seconds with nothing new")
+    ingestion.add_argument("--hash-workers", type=int, default=2, help="Concurrent file hashes (default: 2)")
+    ingestion.add_argument("--extract-workers", type=int, default=2, help="Concurrent PDF extractions (default: 2)")
+    ingestion.add_argument("--ai-workers", type=int, default=2, help="Concurrent summaries/comparisons (default: 2)")
+    ingestion.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                           help=f"Items waiting between two stages before the earlier one blocks (default: {DEFAULT_QUEUE_SIZE})")
+    ingestion.add_argument("--mode", choices=["fast", "ai", "hybrid"],
+                           help="Keyword extractor: local (fast), model (ai) or both (default: KEYWORD_MODE, else ai)")
+    ingestion.add_argument("--no-cache", action="store_true", help="Ignore stored keywords, summaries and model responses")
+    ingestion.add_argument("--no-resume", action="store_true", help="Redo items the checkpoint lists as done")
+    calibration = commands.add_parser("calibrate", help="Pick the fastest installed PDF extraction engine")
+    calibration.add_argument("paths", nargs="*", help="Sample PDFs or directories (default: the bundled PDFs)")
+    calibration.add_argument("--min-yield", type=float, default=DEFAULT_MIN_YIELD,
+                             help=f"Text required, relative to the best engine (default: {DEFAULT_MIN_YIELD})")
+    calibration.add_argument("--rounds", type=int, default=3, help="Timed runs per engine and PDF (default: 3)")
+    calibration.add_argument("--no-save", action="store_true", help="Only print the results")
+    return parser.parse_args(argv)
+
+def preload_models(*tasks):
+    """Start loading the models for ``tasks`` in the background, while the user is still typing.
+
+    Best-effort: a model that fails to load here is loaded by its first request as before.
+    """
+    models = list(dict.fromkeys(ollama_client.model_for(task) for task in tasks))
+    thread = threading.Thread(target=ollama_client.preload, args=(models,), name="preload-models", daemon=True)
+    thread.start()
+    return thread
 
 def get_pdf_path():
     """Get PDF file path from user input with validation."""
@@ -309,7 +1012,27 @@ def get_user_choice():
             print("\n\n👋 Goodbye!")
             return "exit"
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "batch":
+        batch_rank(args.cv, args.jobs, top_k=args.top_k, workers=args.workers, output=args.output,
+                   use_cache=not args.no_cache, mode=args.mode, search=args.search)
+        return
+    if args.command == "history":
+        show_history(search=args.search, type=args.type, limit=args.limit)
+        return
+    if args.command == "ingest":
+        stats = ingest(args.source, output=args.output, task=args.task, jobs=args.jobs, watch=args.watch,
+                       interval=args.interval, idle_exit=args.idle_exit, hash_workers=args.hash_workers,
+                       extract_workers=args.extract_workers, ai_workers=args.ai_workers, queue_size=args.queue_size,
+                       use_cache=not args.no_cache, mode=args.mode, resume=not args.no_resume)
+        if stats is None or stats.failed:
+            sys.exit(1)
+        return
+    if args.command == "calibrate":
+        calibrate_engines(args.paths, min_yield=args.min_yield, rounds=args.rounds, save=not args.no_save)
+        return
+    
     # Interactive mode - ask user what they want to do
     choice = get_user_choice()
     
@@ -317,6 +1040,9 @@ def main():
         print("\n👋 Goodbye!")
         return
     
+    # Load the model(s) while the PDF path (and, for comparisons, the job advert) is entered
+    preload_models(*(["summary"] if choice == "summarise" else ["keywords", "analysis"]))
+    
     # Get PDF file path
     pdf_path = get_pdf_path()
     
@@ -326,7 +1052,7 @@ def main():
         text = parse_pdf(pdf_path)
         if text:
             print("\n🤖 Generating AI summary using Gemma3...")
-            summary = summarize_text(text)
+            summary = summarize_pdf(pdf_path, text)
             print("\n" + "="*50)
             print("📄 AI SUMMARY:")
             print("="*50)